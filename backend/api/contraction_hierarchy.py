@@ -0,0 +1,307 @@
+"""
+Krishiment contraction hierarchy (CH) for the landmark network.
+
+Preprocessing (build_contraction_hierarchy, run offline by
+`manage.py build_landmark_hierarchy`) contracts landmarks one at a time in
+order of importance. When a landmark is removed, a shortcut edge is added
+between two of its neighbours if the path through it is the only shortest
+path between them (no "witness" path of equal or smaller cost exists). Every
+landmark gets a rank. Each edge is kept only at its lower-ranked end, which
+gives the "upward" graph.
+
+A query (ContractionHierarchy.query) runs a small Dijkstra upward from both
+endpoints. The two searches meet at the highest-ranked node of the shortest
+path, so only a handful of nodes are settled even on a state-wide network.
+Shortcuts are then unpacked back into landmark-to-landmark hops.
+
+The graph is undirected (landmark distances are used both ways), so the
+same upward graph serves the forward and the backward search.
+
+The hierarchy is saved as one binary file with a header, the node ids and
+flat arrays. The header's fingerprint records which landmark data it was
+built from.
+"""
+import hashlib
+import heapq
+import os
+import struct
+from array import array
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .csr_graph import CSRGraph
+
+MAGIC = b'KRCH'
+FORMAT_VERSION = 1
+# magic, format version, fingerprint (hex sha1), nodes, upward edges, node id bytes
+HEADER = struct.Struct('<4sH40sIIQ')
+
+# Witness searches give up after settling this many nodes; a missed witness
+# only adds a redundant shortcut, never a wrong distance
+WITNESS_SETTLE_LIMIT = 60
+
+INF = float('inf')
+
+
+def graph_fingerprint(node_ids: Iterable[str], edges: Iterable[Tuple[str, str, float]]) -> str:
+    """sha1 over the sorted node ids and (from, to, weight) edges a hierarchy is built from."""
+    digest = hashlib.sha1()
+    for nid in sorted(node_ids):
+        digest.update(nid.encode())
+        digest.update(b'\n')
+    for a, b, w in sorted(edges):
+        digest.update(f"{a}|{b}|{w!r}\n".encode())
+    return digest.hexdigest()
+
+
+class ContractionHierarchy:
+    """
+    node_ids: string id of each node; rank[u]: contraction order.
+    Upward graph in CSR form: up_offsets/up_targets/up_weights, and
+    up_middles[k] is the contracted node a shortcut skips (-1 for a real edge).
+    """
+
+    def __init__(self, node_ids: List[str], rank: array, up_offsets: array, up_targets: array,
+                 up_weights: array, up_middles: array, fingerprint: str):
+        self.node_ids = node_ids
+        self.index = {nid: i for i, nid in enumerate(node_ids)}
+        self.rank = rank
+        self.up_offsets = up_offsets
+        self.up_targets = up_targets
+        self.up_weights = up_weights
+        self.up_middles = up_middles
+        self.fingerprint = fingerprint
+
+    def __len__(self) -> int:
+        return len(self.node_ids)
+
+    @property
+    def shortcut_count(self) -> int:
+        return sum(1 for m in self.up_middles if m != -1)
+
+    # --- Query
+
+    def query(self, start: str, end: str, stats: Optional[Dict[str, int]] = None) -> Tuple[List[str], float]:
+        """Shortest path between two landmarks: (path of node ids, cost), or ([], inf)."""
+        if start not in self.index or end not in self.index:
+            return [], INF
+        s, t = self.index[start], self.index[end]
+        offsets, targets, weights = self.up_offsets, self.up_targets, self.up_weights
+        dist = ({s: 0.0}, {t: 0.0})
+        prev = ({s: -1}, {t: -1})
+        heaps = ([(0.0, s)], [(0.0, t)])
+        best, meet = (0.0, s) if s == t else (INF, -1)
+        settled = 0
+        # Alternate the two upward searches; each stops once its queue cannot beat best
+        while True:
+            side = 0 if heaps[0] and (not heaps[1] or heaps[0][0][0] <= heaps[1][0][0]) else 1
+            heap = heaps[side]
+            if not heap or heap[0][0] >= best:
+                break
+            d, u = heapq.heappop(heap)
+            own = dist[side]
+            if d > own[u]:
+                continue
+            settled += 1
+            other = dist[1 - side].get(u)
+            if other is not None and d + other < best:
+                best, meet = d + other, u
+            # Stall on demand: u is reached more cheaply from a higher node, so its edges cannot help
+            if any(own.get(targets[k], INF) + weights[k] < d for k in range(offsets[u], offsets[u + 1])):
+                continue
+            for k in range(offsets[u], offsets[u + 1]):
+                v = targets[k]
+                alt = d + weights[k]
+                if alt < own.get(v, INF):
+                    own[v] = alt
+                    prev[side][v] = u
+                    heapq.heappush(heap, (alt, v))
+        if stats is not None:
+            stats['settled'] = settled
+        if meet == -1:
+            return [], INF
+        up_path = self._chain(prev[0], meet)
+        down_path = self._chain(prev[1], meet)
+        hops = up_path + list(reversed(down_path))[1:]
+        path = [hops[0]]
+        for a, b in zip(hops, hops[1:]):
+            path.extend(self._unpack(a, b)[1:])
+        return [self.node_ids[u] for u in path], best
+
+    def _chain(self, prev: Dict[int, int], end: int) -> List[int]:
+        chain = []
+        cur = end
+        while cur != -1:
+            chain.append(cur)
+            cur = prev[cur]
+        chain.reverse()
+        return chain
+
+    def _middle(self, a: int, b: int) -> int:
+        """Middle node of the upward edge between a and b (stored at the lower-ranked end)."""
+        low, high = (a, b) if self.rank[a] < self.rank[b] else (b, a)
+        best_k = -1
+        for k in range(self.up_offsets[low], self.up_offsets[low + 1]):
+            if self.up_targets[k] == high and (best_k == -1 or self.up_weights[k] < self.up_weights[best_k]):
+                best_k = k
+        return self.up_middles[best_k]
+
+    def _unpack(self, a: int, b: int) -> List[int]:
+        """Landmark hops of the edge a -> b, expanding shortcuts."""
+        stack = [(a, b)]
+        path = [a]
+        while stack:
+            u, v = stack.pop()
+            m = self._middle(u, v)
+            if m == -1:
+                path.append(v)
+            else:
+                stack.append((m, v))
+                stack.append((u, m))
+        return path
+
+    # --- Storage
+
+    def save(self, path: str) -> None:
+        """Write the hierarchy to path atomically (temp file + rename)."""
+        ids_blob = '\n'.join(self.node_ids).encode()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, FORMAT_VERSION, self.fingerprint.encode(),
+                                len(self.node_ids), len(self.up_targets), len(ids_blob)))
+            f.write(ids_blob)
+            for values in (self.rank, self.up_offsets, self.up_targets, self.up_weights, self.up_middles):
+                values.tofile(f)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> Optional['ContractionHierarchy']:
+        """Hierarchy stored at path, or None if the file is missing or not a hierarchy file."""
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            return None
+        if len(data) < HEADER.size:
+            return None
+        magic, version, fingerprint, n, m, ids_len = HEADER.unpack_from(data)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            return None
+        pos = HEADER.size
+        node_ids = data[pos:pos + ids_len].decode().split('\n') if n else []
+        pos += ids_len
+        arrays = []
+        for typecode, count in (('i', n), ('q', n + 1), ('i', m), ('d', m), ('i', m)):
+            values = array(typecode)
+            size = values.itemsize * count
+            values.frombytes(data[pos:pos + size])
+            pos += size
+            arrays.append(values)
+        return cls(node_ids, *arrays, fingerprint=fingerprint.decode())
+
+
+def build_contraction_hierarchy(graph: CSRGraph, fingerprint: str) -> ContractionHierarchy:
+    """
+    Contract every node of an undirected graph, least important first.
+    Importance is the edge difference (shortcuts added minus edges removed)
+    plus the number of already contracted neighbours and the node's depth in
+    the hierarchy so far, re-evaluated lazily when a node reaches the front
+    of the queue.
+    """
+    n = len(graph)
+    # Remaining graph: adjacency[u] = {v: (weight, middle)}, keeping the cheapest parallel edge
+    adjacency: List[Dict[int, Tuple[float, int]]] = [dict() for _ in range(n)]
+    for u, v, w in graph.edges():
+        if u != v and w < adjacency[u].get(v, (INF, -1))[0]:
+            adjacency[u][v] = (w, -1)
+            adjacency[v][u] = (w, -1)
+
+    contracted = bytearray(n)
+    contracted_neighbours = [0] * n
+    depth = [0] * n
+    rank = array('i', [0]) * n
+    upward: List[List[Tuple[int, float, int]]] = [[] for _ in range(n)]
+
+    def shortcuts_for(u: int) -> List[Tuple[int, int, float]]:
+        """Shortcuts (v, x, weight) needed if u were contracted now."""
+        neighbours = list(adjacency[u].items())
+        needed = []
+        for i, (v, (w_vu, _)) in enumerate(neighbours):
+            targets = {x: w_vu + w_ux for x, (w_ux, _) in neighbours[i + 1:]}
+            if not targets:
+                continue
+            witness = _witness_distances(adjacency, v, u, set(targets), max(targets.values()))
+            for x, via_u in targets.items():
+                if witness.get(x, INF) > via_u:
+                    needed.append((v, x, via_u))
+        return needed
+
+    def priority(u: int) -> int:
+        return len(shortcuts_for(u)) - len(adjacency[u]) + contracted_neighbours[u] + depth[u]
+
+    heap = [(priority(u), u) for u in range(n)]
+    heapq.heapify(heap)
+    order = 0
+    while heap:
+        _, u = heapq.heappop(heap)
+        if contracted[u]:
+            continue
+        # Lazy update: re-queue if the node became more important than the next one
+        current = priority(u)
+        if heap and current > heap[0][0]:
+            heapq.heappush(heap, (current, u))
+            continue
+
+        for v, x, w in shortcuts_for(u):
+            if w < adjacency[v].get(x, (INF, -1))[0]:
+                adjacency[v][x] = (w, u)
+                adjacency[x][v] = (w, u)
+        for v, (w, middle) in adjacency[u].items():
+            upward[u].append((v, w, middle))
+            del adjacency[v][u]
+            contracted_neighbours[v] += 1
+            depth[v] = max(depth[v], depth[u] + 1)
+        adjacency[u] = {}
+        contracted[u] = 1
+        rank[u] = order
+        order += 1
+
+    up_offsets = array('q', [0]) * (n + 1)
+    up_targets = array('i')
+    up_weights = array('d')
+    up_middles = array('i')
+    for u in range(n):
+        for v, w, middle in upward[u]:
+            up_targets.append(v)
+            up_weights.append(w)
+            up_middles.append(middle)
+        up_offsets[u + 1] = len(up_targets)
+    return ContractionHierarchy(
+        list(graph.node_ids), rank, up_offsets, up_targets, up_weights, up_middles, fingerprint
+    )
+
+
+def _witness_distances(adjacency, source: int, skip: int, targets: set, limit: float) -> Dict[int, float]:
+    """Bounded Dijkstra from source avoiding skip; stops past limit, the settle cap or all targets."""
+    dist = {source: 0.0}
+    heap = [(0.0, source)]
+    settled = 0
+    remaining = set(targets)
+    while heap and remaining and settled < WITNESS_SETTLE_LIMIT:
+        d, u = heapq.heappop(heap)
+        if d > dist[u]:
+            continue
+        if d > limit:
+            break
+        settled += 1
+        remaining.discard(u)
+        for v, (w, _) in adjacency[u].items():
+            if v == skip:
+                continue
+            alt = d + w
+            if alt < dist.get(v, INF):
+                dist[v] = alt
+                heapq.heappush(heap, (alt, v))
+    return dist
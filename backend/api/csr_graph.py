@@ -0,0 +1,199 @@
+"""
+Krishiment routing graph in compressed sparse row (CSR) form.
+
+Nodes are integers 0..n-1; node_ids[i] is the string id ("origin",
+"labour_12", "landmark_3", ...) the rest of the code uses, and index maps it
+back. The out-edges of node u are targets[offsets[u]:offsets[u + 1]] with the
+matching weights, held in flat typed arrays instead of one list of tuples per
+node, so a graph costs a few bytes per edge and traversal does no string hashing.
+
+Graphs built with_metrics also keep each edge's distance (km) and travel time
+(minutes) in lengths/minutes, so a route's totals are summed from the values
+the edges were weighted with instead of being recomputed per leg.
+"""
+from array import array
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+
+class CSRGraph:
+    __slots__ = ('node_ids', 'index', 'offsets', 'targets', 'weights', 'lengths', 'minutes', 'symmetric', '_reverse')
+
+    def __init__(
+        self,
+        node_ids: List[str],
+        offsets: array,
+        targets: array,
+        weights: array,
+        symmetric: bool = False,
+        lengths: Optional[array] = None,
+        minutes: Optional[array] = None,
+    ):
+        self.node_ids = node_ids
+        self.index = {nid: i for i, nid in enumerate(node_ids)}
+        self.offsets = offsets
+        self.targets = targets
+        self.weights = weights
+        # Per-edge distance (km) and travel time (minutes), or None without metrics
+        self.lengths = lengths
+        self.minutes = minutes
+        # True when every edge u -> v has a v -> u twin of the same weight
+        self.symmetric = symmetric
+        self._reverse = None
+
+    @classmethod
+    def from_edges(
+        cls,
+        node_ids: List[str],
+        edges: Iterable[Tuple[int, int, float]],
+        undirected: bool = False,
+        symmetric: bool = False,
+        with_metrics: bool = False,
+    ) -> 'CSRGraph':
+        """
+        Graph from (u, v, weight) integer edges; undirected adds v -> u for each edge too.
+        symmetric marks edges that already come in both directions.
+        with_metrics: edges are (u, v, weight, distance_km, minutes).
+        """
+        sources = array('i')
+        dests = array('i')
+        costs = array('d')
+        kms = array('d') if with_metrics else None
+        mins = array('d') if with_metrics else None
+        for edge in edges:
+            u, v, w = edge[0], edge[1], edge[2]
+            sources.append(u)
+            dests.append(v)
+            costs.append(w)
+            if with_metrics:
+                kms.append(edge[3])
+                mins.append(edge[4])
+            if undirected:
+                sources.append(v)
+                dests.append(u)
+                costs.append(w)
+                if with_metrics:
+                    kms.append(edge[3])
+                    mins.append(edge[4])
+
+        # Counting sort of the edges by source node
+        n = len(node_ids)
+        degree = [0] * (n + 1)
+        for u in sources:
+            degree[u + 1] += 1
+        offsets = array('q', [0]) * (n + 1)
+        for u in range(n):
+            offsets[u + 1] = offsets[u] + degree[u + 1]
+        fill = list(offsets[:n])
+        targets = array('i', [0]) * len(sources)
+        weights = array('d', [0.0]) * len(sources)
+        lengths = array('d', [0.0]) * len(sources) if with_metrics else None
+        minutes = array('d', [0.0]) * len(sources) if with_metrics else None
+        for e, (u, v, w) in enumerate(zip(sources, dests, costs)):
+            k = fill[u]
+            targets[k] = v
+            weights[k] = w
+            if with_metrics:
+                lengths[k] = kms[e]
+                minutes[k] = mins[e]
+            fill[u] = k + 1
+        return cls(list(node_ids), offsets, targets, weights, symmetric=undirected or symmetric,
+                   lengths=lengths, minutes=minutes)
+
+    @classmethod
+    def from_adjacency(cls, adjacency: Dict[str, Sequence[Tuple[str, float]]]) -> 'CSRGraph':
+        """Graph from a {node_id: [(neighbor_id, weight), ...]} adjacency dict."""
+        node_ids = list(adjacency)
+        index = {nid: i for i, nid in enumerate(node_ids)}
+        for edges in adjacency.values():
+            for v, _ in edges:
+                if v not in index:
+                    index[v] = len(node_ids)
+                    node_ids.append(v)
+        return cls.from_edges(
+            node_ids,
+            ((index[u], index[v], w) for u, edges in adjacency.items() for v, w in edges),
+        )
+
+    def __len__(self) -> int:
+        return len(self.node_ids)
+
+    @property
+    def edge_count(self) -> int:
+        return len(self.targets)
+
+    def edges(self) -> Iterator[Tuple[int, int, float]]:
+        """All (u, v, weight) edges in CSR order."""
+        offsets, targets, weights = self.offsets, self.targets, self.weights
+        for u in range(len(self.node_ids)):
+            for k in range(offsets[u], offsets[u + 1]):
+                yield u, targets[k], weights[k]
+
+    @property
+    def has_metrics(self) -> bool:
+        return self.lengths is not None
+
+    def edges_with_metrics(self) -> Iterator[Tuple[int, int, float, float, float]]:
+        """All (u, v, weight, distance_km, minutes) edges in CSR order; needs has_metrics."""
+        offsets, targets, weights = self.offsets, self.targets, self.weights
+        lengths, minutes = self.lengths, self.minutes
+        for u in range(len(self.node_ids)):
+            for k in range(offsets[u], offsets[u + 1]):
+                yield u, targets[k], weights[k], lengths[k], minutes[k]
+
+    def edge_metrics(self, u: int, v: int) -> Optional[Tuple[float, float]]:
+        """(distance_km, minutes) of the cheapest edge u -> v, or None if there is none or no metrics."""
+        if self.lengths is None:
+            return None
+        best = -1
+        for k in range(self.offsets[u], self.offsets[u + 1]):
+            if self.targets[k] == v and (best == -1 or self.weights[k] < self.weights[best]):
+                best = k
+        if best == -1:
+            return None
+        return self.lengths[best], self.minutes[best]
+
+    def with_weights(self, weights: array, minutes: Optional[array] = None) -> 'CSRGraph':
+        """
+        The same nodes and edges with other weights (and travel times), one per
+        edge in CSR order. Node ids, offsets, targets and lengths are shared, not copied.
+        """
+        graph = CSRGraph.__new__(CSRGraph)
+        graph.node_ids = self.node_ids
+        graph.index = self.index
+        graph.offsets = self.offsets
+        graph.targets = self.targets
+        graph.weights = weights
+        graph.lengths = self.lengths
+        graph.minutes = self.minutes if minutes is None else minutes
+        graph.symmetric = self.symmetric
+        graph._reverse = None
+        return graph
+
+    def reverse(self) -> 'CSRGraph':
+        """Graph with every edge reversed (the graph itself when symmetric), for backward searches."""
+        if self.symmetric:
+            return self
+        if self._reverse is None:
+            if self.has_metrics:
+                edges = ((v, u, w, km, t) for u, v, w, km, t in self.edges_with_metrics())
+            else:
+                edges = ((v, u, w) for u, v, w in self.edges())
+            self._reverse = CSRGraph.from_edges(self.node_ids, edges, with_metrics=self.has_metrics)
+        return self._reverse
+
+    def neighbours(self, node_id: str) -> List[Tuple[str, float]]:
+        """[(neighbor_id, weight)] of a node, by string id."""
+        u = self.index[node_id]
+        return [
+            (self.node_ids[self.targets[k]], self.weights[k])
+            for k in range(self.offsets[u], self.offsets[u + 1])
+        ]
+
+    def to_adjacency(self) -> Dict[str, List[Tuple[str, float]]]:
+        return {nid: self.neighbours(nid) for nid in self.node_ids}
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes held by the offset/target/weight (and metric) arrays."""
+        arrays = (self.offsets, self.targets, self.weights, self.lengths, self.minutes)
+        return sum(a.itemsize * len(a) for a in arrays if a is not None)
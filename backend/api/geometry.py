@@ -0,0 +1,85 @@
+"""
+Krishiment geometry: great-circle (Haversine) distances shared by job matching and routing.
+
+- haversine_km: scalar distance between two points.
+- haversine_many: distances from one point to many points (vector).
+- haversine_matrix: distances between two point sets (matrix).
+- unit_vector: 3D unit vector of a point on the sphere; the dot product of two
+  unit vectors is the cosine of their central angle, which lets the database
+  rank by great-circle distance with plain arithmetic.
+
+The batched kernels use NumPy when it is installed and fall back to the scalar
+formula otherwise, so callers always get plain sequences they can index.
+"""
+import math
+from typing import Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; use the pure Python kernel
+    np = None
+
+EARTH_RADIUS_KM = 6371
+
+
+def haversine_km(lat1, lon1, lat2, lon2) -> float:
+    """Distance between two points in km (Haversine)."""
+    lat1_rad = math.radians(float(lat1))
+    lat2_rad = math.radians(float(lat2))
+    dlat = math.radians(float(lat2) - float(lat1))
+    dlon = math.radians(float(lon2) - float(lon1))
+    a = (
+        math.sin(dlat / 2) ** 2
+        + math.cos(lat1_rad) * math.cos(lat2_rad) * math.sin(dlon / 2) ** 2
+    )
+    c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
+    return EARTH_RADIUS_KM * c
+
+
+def unit_vector(lat, lon) -> Optional[Tuple[float, float, float]]:
+    """(x, y, z) of (lat, lon) on the unit sphere, or None if the point has no location."""
+    if lat is None or lon is None:
+        return None
+    lat_rad = math.radians(float(lat))
+    lon_rad = math.radians(float(lon))
+    return (
+        math.cos(lat_rad) * math.cos(lon_rad),
+        math.cos(lat_rad) * math.sin(lon_rad),
+        math.sin(lat_rad),
+    )
+
+
+def haversine_many(lat, lon, lats: Sequence, lons: Sequence):
+    """
+    Distances in km from (lat, lon) to every (lats[i], lons[i]).
+    Returns a NumPy array when NumPy is available, else a list.
+    """
+    if np is None:
+        return [haversine_km(lat, lon, la, lo) for la, lo in zip(lats, lons)]
+    lat_rad = math.radians(float(lat))
+    lon_rad = math.radians(float(lon))
+    lats_rad = np.radians(np.asarray(lats, dtype=float))
+    lons_rad = np.radians(np.asarray(lons, dtype=float))
+    a = (
+        np.sin((lats_rad - lat_rad) / 2) ** 2
+        + math.cos(lat_rad) * np.cos(lats_rad) * np.sin((lons_rad - lon_rad) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def haversine_matrix(lats_a: Sequence, lons_a: Sequence, lats_b: Sequence, lons_b: Sequence):
+    """
+    Pairwise distances in km: result[i][j] is the distance from point i of set A
+    to point j of set B. Returns a 2D NumPy array, or a list of lists without NumPy.
+    """
+    if np is None:
+        return [haversine_many(la, lo, lats_b, lons_b) for la, lo in zip(lats_a, lons_a)]
+    lats_a_rad = np.radians(np.asarray(lats_a, dtype=float))[:, None]
+    lons_a_rad = np.radians(np.asarray(lons_a, dtype=float))[:, None]
+    lats_b_rad = np.radians(np.asarray(lats_b, dtype=float))[None, :]
+    lons_b_rad = np.radians(np.asarray(lons_b, dtype=float))[None, :]
+    a = (
+        np.sin((lats_b_rad - lats_a_rad) / 2) ** 2
+        + np.cos(lats_a_rad) * np.cos(lats_b_rad) * np.sin((lons_b_rad - lons_a_rad) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
@@ -0,0 +1,191 @@
+"""
+Krishiment isochrones: every labour and landmark reachable from a point within
+a travel-time budget, from one bounded search instead of one route per candidate.
+
+- With an imported road network (api.road_network) the search runs over the
+  roads in driving minutes; each candidate snaps to its nearest road node and
+  adds the off-road leg at OFF_ROAD_SPEED_KMH, as routes do. Off-road travel
+  is otherwise limited to the snapping distance. No road is faster than
+  MAX_SPEED_KMH, so only candidates within isochrone_radius_km() are snapped.
+- Otherwise it runs over the graph routes use (origin, labours, landmarks)
+  with minutes as edge weights: the stored travel time of landmark distances
+  and travel_time_min() of local links. Local links longer than the budget
+  can cover are left out, so short budgets build small graphs.
+
+The polygon is a star-shaped approximation: around the origin, each of
+ISOCHRONE_SECTORS bearings reaches as far as the furthest reached point in
+that sector plus what the remaining time covers off-road.
+"""
+import math
+from typing import Any, Dict, List, Tuple
+
+from .csr_graph import CSRGraph
+from .geometry import haversine_km, haversine_many
+from .routing_service import distances_within, road_network, road_snap_max_km, travel_time_min
+from .spatial_index import KM_PER_DEG_LAT, pairs_within_radius
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; the radius filter falls back to a loop
+    np = None
+
+# Longest budget the API accepts
+ISOCHRONE_MAX_MINUTES = 240
+
+# Bearings the polygon is built from (one vertex per sector)
+ISOCHRONE_SECTORS = 36
+
+# Speed of travel with no road: the default of travel_time_min()
+OFF_ROAD_SPEED_KMH = 30.0
+
+INF = float("inf")
+
+# No route is faster than this, so candidates further than budget * speed are skipped
+MAX_SPEED_KMH = 80.0
+
+
+def isochrone_radius_km(minutes: float) -> float:
+    """Straight-line distance nothing reachable within minutes can exceed."""
+    return minutes / 60.0 * MAX_SPEED_KMH
+
+
+def off_road_minutes(distance_km: float) -> float:
+    return distance_km / OFF_ROAD_SPEED_KMH * 60.0
+
+
+def _within(origin_lat: float, origin_lon: float, lats, lons, radius_km: float) -> List[int]:
+    """Indexes of the points within radius_km of the origin (straight line)."""
+    distances = haversine_many(origin_lat, origin_lon, lats, lons)
+    if np is not None:
+        return np.flatnonzero(distances <= radius_km).tolist()
+    return [i for i, km in enumerate(distances) if km <= radius_km]
+
+
+def time_graph(
+    origin_lat: float,
+    origin_lon: float,
+    minutes: float,
+    labour_nodes: List[Dict[str, Any]],
+    landmark_graph,
+    connect_radius_km: float = 80.0,
+) -> Tuple[CSRGraph, List[float], List[float]]:
+    """
+    Undirected graph of origin ("origin"), labours and landmarks weighted in
+    minutes. Returns (graph, lats, lons) with node i at (lats[i], lons[i]).
+    """
+    node_ids = list(landmark_graph.node_ids) + ["origin"] + [n["id"] for n in labour_nodes]
+    lats = list(landmark_graph.lats) + [origin_lat] + [n["lat"] for n in labour_nodes]
+    lons = list(landmark_graph.lons) + [origin_lon] + [n["lon"] for n in labour_nodes]
+    index = {nid: i for i, nid in enumerate(node_ids)}
+    # A local link takes at least travel_time_min() of its length, so longer ones cannot fit the budget
+    radius_km = min(connect_radius_km, minutes / 60.0 * OFF_ROAD_SPEED_KMH)
+    edges = [(i, j, travel_time_min(d)) for i, j, d in pairs_within_radius(lats, lons, radius_km)]
+    edges.extend(
+        (index[fid], index[tid], float(t_min))
+        for fid, targets in landmark_graph.distances.items()
+        for tid, (_, t_min) in targets.items()
+        if fid in index and tid in index
+    )
+    return CSRGraph.from_edges(node_ids, edges, undirected=True), lats, lons
+
+
+def compute_isochrone(
+    origin_lat: float,
+    origin_lon: float,
+    minutes: float,
+    labour_nodes: List[Dict[str, Any]],
+    landmark_graph,
+) -> Dict[str, Any]:
+    """
+    Labours and landmarks reachable from the origin within minutes.
+    labour_nodes: [{"id": "labour_1", "lat", "lon", "label"}], as for routing.
+    Returns labours and landmarks as [{id, label, lat, lon, time_min}] (fastest
+    first), the polygon as [{lat, lon}], the number of nodes the search
+    reached and algorithm_used ("road" or "dijkstra").
+    """
+    origin_lat, origin_lon, minutes = float(origin_lat), float(origin_lon), float(minutes)
+    times = {}
+
+    network = road_network()
+    max_snap_km = road_snap_max_km()
+    start = network.nearest_node(origin_lat, origin_lon, max_snap_km) if network is not None else None
+    if start is not None:
+        # Only what the fastest road could reach is snapped
+        radius_km = isochrone_radius_km(minutes)
+        labour_nodes = [
+            labour_nodes[i] for i in _within(
+                origin_lat, origin_lon, [n["lat"] for n in labour_nodes], [n["lon"] for n in labour_nodes], radius_km,
+            )
+        ]
+        landmark_ids = [
+            landmark_graph.node_ids[i]
+            for i in _within(origin_lat, origin_lon, landmark_graph.lats, landmark_graph.lons, radius_km)
+        ]
+    else:
+        # Stored landmark travel times are not bounded by any speed: every landmark is a candidate
+        landmark_ids = landmark_graph.node_ids
+    candidates = [(n["id"], n["lat"], n["lon"], n.get("label", n["id"]), "labour") for n in labour_nodes] + [
+        (nid, landmark_graph.nodes[nid]["lat"], landmark_graph.nodes[nid]["lon"],
+         landmark_graph.nodes[nid].get("label", nid), "landmark")
+        for nid in landmark_ids
+    ]
+
+    if start is not None:
+        algo = "road"
+        base_km = min(max_snap_km, minutes / 60.0 * OFF_ROAD_SPEED_KMH)
+        node_minutes = network.minutes_within(start[0], minutes, off_road_minutes(start[1]))
+        reached = [(network.lats[u], network.lons[u], t) for u, t in node_minutes.items()]
+        for nid, lat, lon, _, _ in candidates:
+            direct_km = haversine_km(origin_lat, origin_lon, lat, lon)
+            best = off_road_minutes(direct_km) if direct_km <= max_snap_km else INF
+            snapped = network.nearest_node(lat, lon, max_snap_km)
+            if snapped is not None and snapped[0] in node_minutes:
+                best = min(best, node_minutes[snapped[0]] + off_road_minutes(snapped[1]))
+            times[nid] = best
+    else:
+        algo = "dijkstra"
+        base_km = minutes / 60.0 * OFF_ROAD_SPEED_KMH
+        graph, lats, lons = time_graph(origin_lat, origin_lon, minutes, labour_nodes, landmark_graph)
+        node_minutes = distances_within(graph, graph.index["origin"], minutes)
+        reached = [(lats[u], lons[u], t) for u, t in node_minutes.items()]
+        for u, t in node_minutes.items():
+            times[graph.node_ids[u]] = t
+
+    found = {"labour": [], "landmark": []}
+    for nid, lat, lon, label, kind in candidates:
+        if times.get(nid, INF) <= minutes:
+            found[kind].append(
+                {"id": nid, "label": label, "lat": lat, "lon": lon, "time_min": round(times[nid], 1)}
+            )
+    for entries in found.values():
+        entries.sort(key=lambda e: e["time_min"])
+    return {
+        "minutes": minutes,
+        "labours": found["labour"],
+        "landmarks": found["landmark"],
+        "polygon": isochrone_polygon(origin_lat, origin_lon, minutes, reached, base_km),
+        "reached_nodes": len(node_minutes),
+        "algorithm_used": algo,
+    }
+
+
+def isochrone_polygon(
+    origin_lat: float, origin_lon: float, minutes: float, reached: List[Tuple[float, float, float]],
+    base_km: float,
+) -> List[Dict[str, float]]:
+    """Polygon around the origin from reached (lat, lon, minutes) points, at least base_km out."""
+    reach = [base_km] * ISOCHRONE_SECTORS
+    cos_lat = max(math.cos(math.radians(origin_lat)), 1e-6)
+    for lat, lon, t in reached:
+        km = haversine_km(origin_lat, origin_lon, lat, lon) + (minutes - t) / 60.0 * OFF_ROAD_SPEED_KMH
+        bearing = math.atan2((lon - origin_lon) * cos_lat, lat - origin_lat)
+        sector = int((bearing % (2 * math.pi)) / (2 * math.pi) * ISOCHRONE_SECTORS) % ISOCHRONE_SECTORS
+        reach[sector] = max(reach[sector], km)
+    polygon = []
+    for sector, km in enumerate(reach):
+        bearing = (sector + 0.5) / ISOCHRONE_SECTORS * 2 * math.pi
+        polygon.append({
+            "lat": round(origin_lat + km * math.cos(bearing) / KM_PER_DEG_LAT, 6),
+            "lon": round(origin_lon + km * math.sin(bearing) / (KM_PER_DEG_LAT * cos_lat), 6),
+        })
+    return polygon
@@ -0,0 +1,224 @@
+"""
+Krishiment landmark distance generation: LandmarkDistance rows computed for
+every pair of landmarks, or for each landmark's k nearest neighbours, in a pool
+of worker processes (`manage.py generate_landmark_distances`).
+
+- Pairs: the union of every landmark's k nearest by great-circle distance
+  (DEFAULT_K unless asked otherwise), or all pairs. Every pair makes an edge of
+  the landmark graph, which each route request searches, so all pairs is only
+  worth it for small landmark sets. Each pair is stored once, lower landmark
+  id first; the landmark graph uses stored distances in both directions.
+- Distances: road distance and driving time over the imported road network
+  (api.road_network) when both landmarks snap to it, from one search tree per
+  source landmark; otherwise the great-circle distance and travel_time_min().
+- Rows are written in batches with bulk_create/bulk_update. Pairs already
+  stored in either direction (e.g. entered by hand) are skipped, unless
+  overwrite is asked for; even then only road-network distances replace them,
+  never great-circle estimates. Bulk writes skip the model signals, so
+  callers reload the landmark graph once they are done.
+- Incremental runs only compute pairs that touch a landmark with no stored
+  distances yet.
+"""
+import heapq
+from decimal import Decimal
+from multiprocessing import Pool
+from typing import Dict, Iterator, List, Optional, Sequence, Set, Tuple
+
+from django.db import transaction
+
+from .geometry import haversine_km, haversine_many
+from .road_network import RoadNetwork
+from .routing_service import travel_time_min
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; neighbours are then picked with heapq
+    np = None
+
+# Source landmarks handed to a worker process at a time
+SOURCES_PER_TASK = 16
+
+# Nearest landmarks each landmark is paired with by default
+DEFAULT_K = 8
+
+# (from_id, to_id, distance_km, travel_time_min, over the road network rather than great-circle)
+DistanceRow = Tuple[int, int, float, int, bool]
+
+
+# Models are imported where used: worker processes load this module without Django set up
+
+def load_landmarks() -> Tuple[List[int], List[float], List[float]]:
+    """Landmark ids (ascending) and coordinates."""
+    from .models import Landmark
+
+    ids, lats, lons = [], [], []
+    for pk, lat, lon in Landmark.objects.order_by('id').values_list('id', 'latitude', 'longitude'):
+        ids.append(pk)
+        lats.append(float(lat))
+        lons.append(float(lon))
+    return ids, lats, lons
+
+
+def landmarks_without_distances(ids: Sequence[int]) -> Set[int]:
+    """Landmarks that appear in no LandmarkDistance row."""
+    from .models import LandmarkDistance
+
+    linked = set(LandmarkDistance.objects.values_list('from_landmark_id', flat=True))
+    linked.update(LandmarkDistance.objects.values_list('to_landmark_id', flat=True))
+    return {pk for pk in ids if pk not in linked}
+
+
+def nearest_neighbour_pairs(lats: Sequence[float], lons: Sequence[float], k: int) -> Dict[int, Set[int]]:
+    """{i: {j > i}}: pairs where either landmark is among the other's k nearest."""
+    n = len(lats)
+    pairs: Dict[int, Set[int]] = {i: set() for i in range(n)}
+    k = min(k, n - 1)
+    if k <= 0:
+        return pairs
+    for i in range(n):
+        distances = haversine_many(lats[i], lons[i], lats, lons)
+        if np is not None:
+            distances[i] = np.inf
+            nearest = np.argpartition(distances, k - 1)[:k].tolist()
+        else:
+            nearest = heapq.nsmallest(k, (j for j in range(n) if j != i), key=distances.__getitem__)
+        for j in nearest:
+            pairs[min(i, j)].add(max(i, j))
+    return pairs
+
+
+def pair_tasks(
+    n: int,
+    lats: Sequence[float],
+    lons: Sequence[float],
+    k: Optional[int] = None,
+    only: Optional[Set[int]] = None,
+    skip: Optional[Set[Tuple[int, int]]] = None,
+) -> List[List[Tuple[int, List[int]]]]:
+    """
+    Work for the pool: lists of (source index, target indexes > source),
+    SOURCES_PER_TASK sources each; k None means all pairs. only (indexes)
+    keeps pairs touching one of them; skip drops (i, j) pairs, i < j.
+    """
+    if k is None:
+        sources = ((i, range(i + 1, n)) for i in range(n))
+    else:
+        sources = ((i, sorted(targets)) for i, targets in nearest_neighbour_pairs(lats, lons, k).items())
+    work = []
+    for i, targets in sources:
+        if only is not None and i not in only:
+            targets = [j for j in targets if j in only]
+        if skip:
+            targets = [j for j in targets if (i, j) not in skip]
+        # Otherwise all-pairs targets stay ranges, so the work list is O(n) rather than O(n^2)
+        if targets:
+            work.append((i, targets))
+    return [work[s:s + SOURCES_PER_TASK] for s in range(0, len(work), SOURCES_PER_TASK)]
+
+
+# --- Workers
+
+_worker_state = None
+
+
+def _init_worker(ids: List[int], lats: List[float], lons: List[float],
+                 road_path: Optional[str], snap_max_km: float) -> None:
+    global _worker_state
+    network = RoadNetwork.load(road_path) if road_path else None
+    # Each landmark is snapped once per worker, not once per pair
+    snapped = [network.nearest_node(lat, lon, snap_max_km) for lat, lon in zip(lats, lons)] if network else None
+    _worker_state = (ids, lats, lons, network, snapped)
+
+
+def _distance_rows(task: List[Tuple[int, List[int]]]) -> List[DistanceRow]:
+    """Distance rows for each (source, targets) of a task, in a worker process."""
+    ids, lats, lons, network, snapped = _worker_state
+    rows = []
+    for i, targets in task:
+        totals = [None] * len(targets)
+        if network is not None and snapped[i] is not None:
+            totals = network.tree_totals(snapped[i], [snapped[j] for j in targets])
+        for j, total in zip(targets, totals):
+            if total is not None:
+                rows.append((ids[i], ids[j], *total, True))
+            else:
+                km = haversine_km(lats[i], lons[i], lats[j], lons[j])
+                rows.append((ids[i], ids[j], round(km, 2), travel_time_min(km), False))
+    return rows
+
+
+def compute_landmark_distances(
+    ids: List[int],
+    lats: List[float],
+    lons: List[float],
+    tasks: List[List[Tuple[int, List[int]]]],
+    workers: Optional[int] = None,
+    road_path: Optional[str] = None,
+    snap_max_km: float = 5.0,
+) -> Iterator[List[DistanceRow]]:
+    """
+    Run tasks on a pool of worker processes (workers=1 computes in this
+    process) and yield their rows as they arrive, in no particular order.
+    road_path, if set, is the road network file the workers route over.
+    """
+    initargs = (ids, lats, lons, road_path, snap_max_km)
+    if workers == 1:
+        _init_worker(*initargs)
+        try:
+            yield from map(_distance_rows, tasks)
+        finally:
+            _init_worker([], [], [], None, snap_max_km)
+        return
+    with Pool(workers, initializer=_init_worker, initargs=initargs) as pool:
+        yield from pool.imap_unordered(_distance_rows, tasks)
+
+
+# --- Storage
+
+def stored_distances(ids: Optional[Sequence[int]] = None) -> Dict[Tuple[int, int], Tuple[int, Decimal, int]]:
+    """
+    {(lower id, higher id): (pk, distance_km, travel_time_min)} for every
+    stored row, or only rows touching the given landmarks.
+    """
+    from django.db.models import Q
+
+    from .models import LandmarkDistance
+
+    rows = LandmarkDistance.objects.all()
+    if ids is not None:
+        rows = rows.filter(Q(from_landmark_id__in=ids) | Q(to_landmark_id__in=ids))
+    return {
+        (min(a, b), max(a, b)): (pk, km, minutes)
+        for pk, a, b, km, minutes in rows.values_list(
+            'id', 'from_landmark_id', 'to_landmark_id', 'distance_km', 'travel_time_min'
+        )
+    }
+
+
+def save_distance_batch(
+    rows: List[DistanceRow], existing: Dict[Tuple[int, int], Tuple[int, Decimal, int]], overwrite: bool = False,
+) -> Tuple[int, int]:
+    """
+    Create missing pairs in one transaction; with overwrite, also update
+    stored pairs whose road-network distance changed. Returns (created, updated).
+    """
+    from .models import LandmarkDistance
+
+    to_create, to_update = [], []
+    for from_id, to_id, km, minutes, on_roads in rows:
+        km = Decimal(f"{km:.2f}")
+        minutes = max(1, int(minutes))
+        current = existing.get((from_id, to_id))
+        if current is None:
+            to_create.append(LandmarkDistance(
+                from_landmark_id=from_id, to_landmark_id=to_id, distance_km=km, travel_time_min=minutes,
+            ))
+        elif overwrite and on_roads and (current[1] != km or current[2] != minutes):
+            # A great-circle estimate never replaces a stored distance
+            to_update.append(LandmarkDistance(pk=current[0], distance_km=km, travel_time_min=minutes))
+    with transaction.atomic():
+        if to_create:
+            LandmarkDistance.objects.bulk_create(to_create, batch_size=1000)
+        if to_update:
+            LandmarkDistance.objects.bulk_update(to_update, ['distance_km', 'travel_time_min'], batch_size=1000)
+    return len(to_create), len(to_update)
@@ -0,0 +1,435 @@
+"""
+Krishiment landmark graph: the mandis, warehouses and markets (Landmark) and the
+precomputed road distances between them (LandmarkDistance), held in memory.
+
+- get_landmark_graph() returns a process-wide graph that is loaded from the
+  database once and shared by every route request (SLM and local Dijkstra).
+- The graph carries a version; the current version is published in the file at
+  settings.LANDMARK_GRAPH_VERSION_PATH, which every worker and management
+  command on the host reads. A worker whose graph is older than the published
+  version reloads it on its next request. Without a path the version is kept
+  per process.
+- ALT anchor distances (A* lower bounds for SLM searches) are computed once per
+  graph version, on the first search that needs them.
+- The all-pairs table (api.landmark_table), when built for the current
+  landmarks, is memory-mapped from settings.LANDMARK_TABLE_PATH and answers SLM
+  queries by lookup. It is only rebuilt by `manage.py build_landmark_table`.
+- The contraction hierarchy (api.contraction_hierarchy) is read from
+  settings.LANDMARK_HIERARCHY_PATH when its fingerprint matches the graph; SLM
+  falls back to ALT while it does not, never using a stale file. With
+  settings.LANDMARK_HIERARCHY_AUTO_REBUILD, every new graph version starts a
+  background rebuild, run by one process at a time (a lock file next to the
+  hierarchy) and repeated until it has caught up with the latest version.
+  Without it, `manage.py build_landmark_hierarchy` rebuilds the file and a
+  stale one is logged.
+- Signal handlers (api.signals) patch the changed landmark or distance into the
+  graph of the worker that saved it and publish a new version for the others.
+
+Graphs are never mutated once published: an update builds a new graph sharing
+the unchanged node and edge maps, so a request keeps a consistent snapshot.
+"""
+import atexit
+import logging
+import os
+import threading
+import time
+import uuid
+from array import array
+from typing import Any, Dict, Optional, Tuple
+
+from django.conf import settings
+from django.db import connection
+
+from .contraction_hierarchy import ContractionHierarchy, build_contraction_hierarchy, graph_fingerprint
+from .csr_graph import CSRGraph
+from .landmark_table import LandmarkTable, open_landmark_table
+from .routing_service import edge_weight_km, select_anchors
+
+logger = logging.getLogger(__name__)
+
+
+def landmark_node_id(landmark_id) -> str:
+    return f"landmark_{landmark_id}"
+
+
+class LandmarkGraph:
+    """
+    Landmark nodes and the distances between them.
+    nodes: {node_id: {lat, lon, label, type}}
+    distances: {from_id: {to_id: (distance_km, travel_time_min)}}, as stored (directed)
+    """
+
+    def __init__(self, nodes: Dict[str, Dict[str, Any]], distances: Dict[str, Dict[str, Tuple[float, int]]], version: str):
+        self.nodes = nodes
+        self.distances = distances
+        self.version = version
+        self._csr = None
+        self._anchors = None
+        # Per routing profile (api.routing_profiles): reweighted csr and its ALT anchors
+        self._profile_csr = {}
+        self._profile_anchors = {}
+        self._fingerprint = None
+        # None: not looked up yet; False: no matching hierarchy in the file with _hierarchy_key
+        self._hierarchy = None
+        self._hierarchy_key = None
+        self._table = None
+        self.node_ids = list(nodes)
+        self.lats = [nodes[nid]["lat"] for nid in self.node_ids]
+        self.lons = [nodes[nid]["lon"] for nid in self.node_ids]
+
+    def __len__(self):
+        return len(self.nodes)
+
+    @property
+    def csr(self) -> CSRGraph:
+        """
+        Undirected weighted graph for Dijkstra/ALT; node i is node_ids[i]. Each
+        stored distance is an edge in both directions, carrying its stored
+        distance and travel time as metrics.
+        """
+        if self._csr is None:
+            index = {nid: i for i, nid in enumerate(self.node_ids)}
+            edges = (
+                (index[fid], index[tid], edge_weight_km(d_km, t_min), d_km, t_min)
+                for fid, targets in self.distances.items()
+                for tid, (d_km, t_min) in targets.items()
+                if fid in index and tid in index
+            )
+            self._csr = CSRGraph.from_edges(self.node_ids, edges, undirected=True, with_metrics=True)
+        return self._csr
+
+    @property
+    def anchors(self) -> Dict[int, array]:
+        """ALT anchors and their distances to every landmark, computed on first use."""
+        if self._anchors is None:
+            self._anchors = select_anchors(self.csr)
+        return self._anchors
+
+    def profile_csr(self, profile) -> CSRGraph:
+        """csr weighted for a routing profile; shares csr's topology, computed on first use."""
+        if profile.is_default:
+            return self.csr
+        graph = self._profile_csr.get(profile.name)
+        if graph is None:
+            graph = self._profile_csr[profile.name] = profile.reweight(self.csr)
+        return graph
+
+    def profile_anchors(self, profile) -> Dict[int, array]:
+        """anchors for profile_csr(profile): ALT bounds only hold for the weights they came from."""
+        if profile.is_default:
+            return self.anchors
+        anchors = self._profile_anchors.get(profile.name)
+        if anchors is None:
+            anchors = self._profile_anchors[profile.name] = select_anchors(self.profile_csr(profile))
+        return anchors
+
+    @property
+    def fingerprint(self) -> str:
+        """Identifies the nodes and edge weights; a stored hierarchy is only used if it matches."""
+        if self._fingerprint is None:
+            csr = self.csr
+            self._fingerprint = graph_fingerprint(
+                self.node_ids,
+                ((csr.node_ids[u], csr.node_ids[v], w) for u, v, w in csr.edges()),
+            )
+        return self._fingerprint
+
+    @property
+    def hierarchy(self) -> Optional[ContractionHierarchy]:
+        """Contraction hierarchy for this exact graph, or None while there is none."""
+        if self._hierarchy is None or (self._hierarchy is False and self._hierarchy_key != hierarchy_file_key()):
+            # Looked up again whenever the file is replaced, e.g. by a rebuild in another process
+            self._hierarchy_key = hierarchy_file_key()
+            self._hierarchy = find_hierarchy(self) or False
+        return self._hierarchy or None
+
+    @property
+    def table(self) -> Optional[LandmarkTable]:
+        """All-pairs table for this exact graph, or None if none was built for it."""
+        if self._table is None:
+            self._table = find_table(self) or False
+        return self._table or None
+
+    def edge(self, a: str, b: str) -> Optional[Tuple[float, int]]:
+        """Stored (distance_km, travel_time_min) between two landmarks in either direction."""
+        return self.distances.get(a, {}).get(b) or self.distances.get(b, {}).get(a)
+
+    # --- Copy-on-write updates (return a new graph)
+
+    def with_landmark(self, landmark_id, node: Dict[str, Any], version: str) -> 'LandmarkGraph':
+        """Add or move a landmark; node is landmark_node(landmark)."""
+        nodes = dict(self.nodes)
+        nodes[landmark_node_id(landmark_id)] = node
+        return LandmarkGraph(nodes, self.distances, version)
+
+    def without_landmark(self, landmark_id, version: str) -> 'LandmarkGraph':
+        nid = landmark_node_id(landmark_id)
+        nodes = {k: v for k, v in self.nodes.items() if k != nid}
+        distances = {
+            fid: {tid: v for tid, v in targets.items() if tid != nid}
+            for fid, targets in self.distances.items()
+            if fid != nid
+        }
+        return LandmarkGraph(nodes, distances, version)
+
+    def with_distance(self, from_id, to_id, value: Optional[Tuple[float, int]], version: str) -> 'LandmarkGraph':
+        """Set (or with value None, remove) the stored distance from_id -> to_id."""
+        fid, tid = landmark_node_id(from_id), landmark_node_id(to_id)
+        distances = dict(self.distances)
+        targets = dict(distances.get(fid, {}))
+        if value is None:
+            targets.pop(tid, None)
+        else:
+            targets[tid] = value
+        distances[fid] = targets
+        return LandmarkGraph(self.nodes, distances, version)
+
+
+def landmark_node(landmark) -> Dict[str, Any]:
+    return {
+        "lat": float(landmark.latitude),
+        "lon": float(landmark.longitude),
+        "label": landmark.name,
+        "type": "landmark",
+    }
+
+
+def distance_value(landmark_distance) -> Tuple[float, int]:
+    return float(landmark_distance.distance_km), int(landmark_distance.travel_time_min)
+
+
+def load_landmark_graph(version: str) -> LandmarkGraph:
+    """Read every landmark and landmark distance from the database."""
+    from .models import Landmark, LandmarkDistance
+
+    nodes = {
+        landmark_node_id(lm.pk): landmark_node(lm)
+        for lm in Landmark.objects.only('id', 'name', 'latitude', 'longitude')
+    }
+    distances = {}
+    for fid, tid, d_km, t_min in LandmarkDistance.objects.values_list(
+        'from_landmark_id', 'to_landmark_id', 'distance_km', 'travel_time_min'
+    ):
+        distances.setdefault(landmark_node_id(fid), {})[landmark_node_id(tid)] = (float(d_km), int(t_min))
+    return LandmarkGraph(nodes, distances, version)
+
+
+# --- Process-wide cache
+
+_graph: Optional[LandmarkGraph] = None
+_lock = threading.Lock()
+# (stat key, version) of the version file last read; the version itself when there is no file
+_published: Tuple[Optional[Tuple[int, int]], Optional[str]] = (None, None)
+
+
+def version_path() -> Optional[str]:
+    return getattr(settings, 'LANDMARK_GRAPH_VERSION_PATH', None)
+
+
+def publish_version(version: str) -> None:
+    """Make version current for every process (renamed over the version file)."""
+    global _published
+    path = version_path()
+    if not path:
+        _published = (None, version)
+        return
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, 'w') as f:
+        f.write(version)
+    os.replace(tmp_path, path)
+
+
+def current_version() -> str:
+    """The published version; the file is re-read only when it has been replaced."""
+    global _published
+    path = version_path()
+    if not path:
+        if _published[1] is None:
+            _published = (None, uuid.uuid4().hex)
+        return _published[1]
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        # Nothing published yet (or the file was removed): publish a first version
+        publish_version(uuid.uuid4().hex)
+        stat = os.stat(path)
+    key = (stat.st_ino, stat.st_mtime_ns)
+    cached_key, version = _published
+    if cached_key != key:
+        with open(path) as f:
+            version = f.read().strip()
+        _published = (key, version)
+    return version
+
+
+def get_landmark_graph() -> LandmarkGraph:
+    """The shared landmark graph, reloaded only when another process published a change."""
+    global _graph
+    version = current_version()
+    graph = _graph
+    if graph is None or graph.version != version:
+        with _lock:
+            loaded = _graph is None or _graph.version != version
+            if loaded:
+                _graph = load_landmark_graph(version)
+            graph = _graph
+        if loaded:
+            schedule_hierarchy_rebuild(graph)
+    return graph
+
+
+def update_landmark_graph(change) -> None:
+    """
+    Apply change(graph, new_version) -> graph to this worker's graph and publish
+    the new version, so other workers reload on their next request.
+    """
+    global _graph
+    version = uuid.uuid4().hex
+    with _lock:
+        if _graph is not None and _graph.version == current_version():
+            _graph = change(_graph, version)
+        else:
+            # This worker's copy is already stale; drop it and load lazily
+            _graph = None
+        publish_version(version)
+        graph = _graph
+    if graph is not None:
+        schedule_hierarchy_rebuild(graph)
+
+
+def clear_landmark_graph() -> None:
+    """Forget this worker's graph and force every process to reload."""
+    global _graph
+    with _lock:
+        _graph = None
+        publish_version(uuid.uuid4().hex)
+
+
+# --- All-pairs table file
+
+def table_path() -> Optional[str]:
+    return getattr(settings, 'LANDMARK_TABLE_PATH', None)
+
+
+def find_table(graph: LandmarkGraph) -> Optional[LandmarkTable]:
+    path = table_path()
+    if not path or len(graph) < 2:
+        return None
+    table = open_landmark_table(path)
+    if table is not None and table.fingerprint == graph.fingerprint:
+        return table
+    return None
+
+
+# --- Contraction hierarchy file
+
+_rebuilding = set()
+_rebuild_lock = threading.Lock()
+# Graph versions this process is rebuilding the hierarchy for (at most one thread)
+# A lock file older than this was left by a rebuild that died; it is taken over
+REBUILD_LOCK_STALE_S = 60 * 60
+
+
+def hierarchy_path() -> Optional[str]:
+    return getattr(settings, 'LANDMARK_HIERARCHY_PATH', None)
+
+
+def hierarchy_file_key() -> Optional[Tuple[int, int]]:
+    """Identifies the current hierarchy file; changes when it is replaced."""
+    path = hierarchy_path()
+    try:
+        st = os.stat(path) if path else None
+    except FileNotFoundError:
+        return None
+    return (st.st_ino, st.st_mtime_ns) if st else None
+
+
+def find_hierarchy(graph: LandmarkGraph) -> Optional[ContractionHierarchy]:
+    """The stored hierarchy if it was built from this graph, else None (SLM uses ALT)."""
+    path = hierarchy_path()
+    if not path or len(graph) < 2:
+        return None
+    hierarchy = ContractionHierarchy.load(path)
+    if hierarchy is not None and hierarchy.fingerprint == graph.fingerprint:
+        return hierarchy
+    if getattr(settings, 'LANDMARK_HIERARCHY_AUTO_REBUILD', False):
+        # Normally already started by the version change; this covers one missed while locked
+        schedule_hierarchy_rebuild(graph)
+    else:
+        logger.warning(
+            "Landmark hierarchy %s is %s; SLM uses ALT until `manage.py build_landmark_hierarchy` runs",
+            path, 'missing' if hierarchy is None else 'stale',
+        )
+    return None
+
+
+def _acquire_rebuild_lock(lock_path: str) -> bool:
+    """Create lock_path unless another process holds it; True if this process now does."""
+    for _ in range(2):
+        try:
+            os.close(os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+            return True
+        except FileExistsError:
+            try:
+                if time.time() - os.stat(lock_path).st_mtime < REBUILD_LOCK_STALE_S:
+                    return False
+                os.remove(lock_path)
+            except FileNotFoundError:
+                pass
+    return False
+
+
+def schedule_hierarchy_rebuild(graph: LandmarkGraph) -> None:
+    """
+    With LANDMARK_HIERARCHY_AUTO_REBUILD, bring the stored hierarchy up to date
+    with graph in a background thread, unless this process is already doing so
+    or another process holds the lock (its rebuild catches up with this version).
+    """
+    path = hierarchy_path()
+    if not path or len(graph) < 2 or not getattr(settings, 'LANDMARK_HIERARCHY_AUTO_REBUILD', False):
+        return
+    with _rebuild_lock:
+        if _rebuilding:
+            return
+        _rebuilding.add(graph.version)
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    if not _acquire_rebuild_lock(f"{path}.lock"):
+        with _rebuild_lock:
+            _rebuilding.discard(graph.version)
+        return
+    # The thread dies with the process; do not leave other processes waiting on its lock
+    atexit.register(_release_rebuild_lock, path)
+    threading.Thread(target=_rebuild_hierarchy, args=(graph, path), daemon=True).start()
+
+
+def _release_rebuild_lock(path: str) -> None:
+    with _rebuild_lock:
+        if not _rebuilding:
+            return
+        _rebuilding.clear()
+    try:
+        os.remove(f"{path}.lock")
+    except FileNotFoundError:
+        pass
+    atexit.unregister(_release_rebuild_lock)
+
+
+def _rebuild_hierarchy(graph: LandmarkGraph, path: str) -> None:
+    try:
+        while True:
+            stored = ContractionHierarchy.load(path)
+            if stored is None or stored.fingerprint != graph.fingerprint:
+                start = time.perf_counter()
+                build_contraction_hierarchy(graph.csr, graph.fingerprint).save(path)
+                logger.info("Rebuilt landmark hierarchy %s in %.1fs", path, time.perf_counter() - start)
+            # Graphs in every process see the replaced file on their next query (hierarchy_file_key)
+            if graph.version == current_version():
+                break
+            # Landmarks changed during the build: catch up with the latest version
+            graph = get_landmark_graph()
+    except Exception:
+        logger.exception("Landmark hierarchy rebuild failed; SLM keeps using ALT")
+    finally:
+        _release_rebuild_lock(path)
+        connection.close()
@@ -0,0 +1,227 @@
+"""
+Krishiment all-pairs landmark table: the shortest cost between every two
+landmarks and the next hop along that path, precomputed offline
+(`manage.py build_landmark_table`) into one binary file.
+
+The file is memory-mapped read-only, so every worker process on a host shares
+the same page-cache pages instead of holding its own copy. A cost lookup reads
+one cell; a path lookup follows next-hop cells, one per landmark on the path.
+
+Layout after the header and node ids (8-byte aligned), for n landmarks:
+- costs[j * n + i]: shortest cost from landmark i to landmark j (inf if unreachable)
+- next_hops[j * n + i]: landmark after i on that path (j itself when i == j, -1 if unreachable)
+
+Rows are grouped by destination because the graph is undirected: one
+single-source search from j fills row j, and its predecessor tree gives the
+next hop from every i towards j. Rows are computed in parallel processes.
+"""
+import heapq
+import mmap
+import os
+import struct
+import threading
+from array import array
+from multiprocessing import Pool
+from typing import Callable, Dict, List, Optional, Tuple
+
+from .csr_graph import CSRGraph
+
+MAGIC = b'KRAP'
+FORMAT_VERSION = 1
+# magic, format version, fingerprint (hex sha1), nodes, node id bytes
+HEADER = struct.Struct('<4sH40sIQ')
+
+# Destinations handed to a worker process at a time
+ROWS_PER_TASK = 16
+
+INF = float('inf')
+
+
+def _data_offset(ids_len: int) -> int:
+    end = HEADER.size + ids_len
+    return end + (-end % 8)
+
+
+class LandmarkTable:
+    """Read-only view of a table file; costs and next_hops are memoryviews over the mapping."""
+
+    def __init__(self, node_ids: List[str], costs, next_hops, fingerprint: str):
+        self.node_ids = node_ids
+        self.index = {nid: i for i, nid in enumerate(node_ids)}
+        self.costs = costs
+        self.next_hops = next_hops
+        self.fingerprint = fingerprint
+
+    def __len__(self) -> int:
+        return len(self.node_ids)
+
+    def cost(self, start: str, end: str) -> float:
+        if start not in self.index or end not in self.index:
+            return INF
+        return self.costs[self.index[end] * len(self.node_ids) + self.index[start]]
+
+    def path(self, start: str, end: str, stats: Optional[Dict[str, int]] = None) -> Tuple[List[str], float]:
+        """Shortest path between two landmarks by following next hops: (node ids, cost), or ([], inf)."""
+        if start not in self.index or end not in self.index:
+            return [], INF
+        n = len(self.node_ids)
+        s, t = self.index[start], self.index[end]
+        row = t * n
+        cost = self.costs[row + s]
+        if stats is not None:
+            stats['settled'] = 0
+        if cost == INF:
+            return [], INF
+        path = [s]
+        cur = s
+        while cur != t:
+            cur = self.next_hops[row + cur]
+            if cur < 0 or len(path) > n:
+                raise ValueError('Corrupt landmark table: next hops do not reach the destination')
+            path.append(cur)
+        if stats is not None:
+            stats['settled'] = len(path)
+        return [self.node_ids[u] for u in path], cost
+
+    @classmethod
+    def load(cls, path: str) -> Optional['LandmarkTable']:
+        """Memory-map the table at path; None if the file is missing or not a table file."""
+        try:
+            with open(path, 'rb') as f:
+                if os.fstat(f.fileno()).st_size < HEADER.size:
+                    return None
+                mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except FileNotFoundError:
+            return None
+        magic, version, fingerprint, n, ids_len = HEADER.unpack_from(mapping)
+        start = _data_offset(ids_len)
+        if magic != MAGIC or version != FORMAT_VERSION or len(mapping) != start + 12 * n * n:
+            mapping.close()
+            return None
+        node_ids = mapping[HEADER.size:HEADER.size + ids_len].decode().split('\n') if n else []
+        view = memoryview(mapping)
+        costs = view[start:start + 8 * n * n].cast('d')
+        next_hops = view[start + 8 * n * n:].cast('i')
+        return cls(node_ids, costs, next_hops, fingerprint.decode())
+
+
+# --- Shared mappings
+
+_tables: Dict[str, Tuple[Tuple[int, int], Optional[LandmarkTable]]] = {}
+_tables_lock = threading.Lock()
+
+
+def open_landmark_table(path: str) -> Optional[LandmarkTable]:
+    """
+    The table at path, mapped once per process and remapped only when the
+    file is replaced (a rebuild renames a new file over it).
+    """
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    key = (stat.st_ino, stat.st_mtime_ns)
+    with _tables_lock:
+        cached = _tables.get(path)
+        if cached is None or cached[0] != key:
+            cached = (key, LandmarkTable.load(path))
+            _tables[path] = cached
+    return cached[1]
+
+
+# --- Build
+
+_worker_graph: Optional[Tuple[array, array, array]] = None
+
+
+def _init_worker(offsets: array, targets: array, weights: array) -> None:
+    global _worker_graph
+    _worker_graph = (offsets, targets, weights)
+
+
+def _table_rows(destinations: List[int]) -> List[Tuple[int, bytes, bytes]]:
+    """(destination, cost row, next-hop row) for each destination, in a worker process."""
+    offsets, targets, weights = _worker_graph
+    n = len(offsets) - 1
+    rows = []
+    for t in destinations:
+        dist = [INF] * n
+        pred = [-1] * n
+        dist[t] = 0.0
+        pred[t] = t
+        heap = [(0.0, t)]
+        while heap:
+            d, u = heapq.heappop(heap)
+            if d > dist[u]:
+                continue
+            for k in range(offsets[u], offsets[u + 1]):
+                v = targets[k]
+                alt = d + weights[k]
+                if alt < dist[v]:
+                    dist[v] = alt
+                    # Search runs from t, so u is the hop after v on the way to t
+                    pred[v] = u
+                    heapq.heappush(heap, (alt, v))
+        rows.append((t, array('d', dist).tobytes(), array('i', pred).tobytes()))
+    return rows
+
+
+def build_landmark_table(
+    graph: CSRGraph,
+    fingerprint: str,
+    path: str,
+    workers: Optional[int] = None,
+    progress: Optional[Callable[[int, int], None]] = None,
+) -> None:
+    """
+    Compute every row of the table for an undirected graph with a pool of
+    worker processes (workers=1 computes in this process) and write the file
+    atomically. progress(rows_done, n) is called as rows arrive.
+    """
+    if not graph.symmetric:
+        raise ValueError('Landmark table needs an undirected graph')
+    n = len(graph)
+    ids_blob = '\n'.join(graph.node_ids).encode()
+    start = _data_offset(len(ids_blob))
+    row_bytes = 8 * n
+    next_start = start + 8 * n * n
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    tasks = [list(range(i, min(i + ROWS_PER_TASK, n))) for i in range(0, n, ROWS_PER_TASK)]
+    with open(tmp_path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, FORMAT_VERSION, fingerprint.encode(), n, len(ids_blob)))
+        f.write(ids_blob)
+        f.truncate(start + 12 * n * n)
+
+        def write(rows):
+            for t, cost_row, next_row in rows:
+                f.seek(start + t * row_bytes)
+                f.write(cost_row)
+                f.seek(next_start + t * 4 * n)
+                f.write(next_row)
+
+        done = 0
+        if workers == 1:
+            _init_worker(graph.offsets, graph.targets, graph.weights)
+            results = map(_table_rows, tasks)
+            pool = None
+        else:
+            pool = Pool(workers, initializer=_init_worker,
+                        initargs=(graph.offsets, graph.targets, graph.weights))
+            results = pool.imap_unordered(_table_rows, tasks)
+        try:
+            for rows in results:
+                write(rows)
+                done += len(rows)
+                if progress is not None:
+                    progress(done, n)
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
+            else:
+                _init_worker(None, None, None)
+    os.replace(tmp_path, path)
@@ -0,0 +1,52 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+
+from api import geometry
+from api.geometry import haversine_km, haversine_many
+
+
+class Command(BaseCommand):
+    help = 'Micro-benchmark scalar vs vectorized Haversine distance throughput'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='1000,10000,100000',
+                            help='Comma-separated point counts to measure')
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        if geometry.np is None:
+            self.stdout.write(self.style.WARNING(
+                'NumPy is not installed: the vectorized kernel falls back to the scalar loop'
+            ))
+        rng = random.Random(options['seed'])
+        origin_lat, origin_lon = 18.5204, 73.8567
+
+        self.stdout.write(
+            f"{'points':>8} {'scalar ms':>10} {'vector ms':>10} "
+            f"{'scalar pts/s':>14} {'vector pts/s':>14} {'speedup':>8}"
+        )
+        for size in sorted(int(s) for s in options['sizes'].split(',')):
+            lats = [rng.uniform(8.0, 30.0) for _ in range(size)]
+            lons = [rng.uniform(70.0, 88.0) for _ in range(size)]
+
+            scalar = self._best_of(options['repeat'], lambda: [
+                haversine_km(origin_lat, origin_lon, la, lo) for la, lo in zip(lats, lons)
+            ])
+            vector = self._best_of(options['repeat'], lambda: haversine_many(
+                origin_lat, origin_lon, lats, lons
+            ))
+            self.stdout.write(
+                f"{size:>8} {scalar * 1000:>10.2f} {vector * 1000:>10.2f} "
+                f"{size / scalar:>14,.0f} {size / vector:>14,.0f} {scalar / vector:>7.1f}x"
+            )
+
+    def _best_of(self, repeat, fn):
+        best = float('inf')
+        for _ in range(repeat):
+            start = time.perf_counter()
+            fn()
+            best = min(best, time.perf_counter() - start)
+        return best
@@ -0,0 +1,101 @@
+import heapq
+import math
+import random
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand
+
+from api.csr_graph import CSRGraph
+from api.routing_service import dijkstra, edge_weight_km, travel_time_min
+from api.spatial_index import KM_PER_DEG_LAT, pairs_within_radius
+
+# Synthetic network area: roughly India's bounding box
+LAT_RANGE = (8.0, 30.0)
+LON_RANGE = (70.0, 88.0)
+
+
+def dict_dijkstra(graph, start, end):
+    """The dict-of-lists Dijkstra the routing graph used before CSRGraph (reference)."""
+    dist = {n: float("inf") for n in graph}
+    dist[start] = 0.0
+    heap = [(0.0, start)]
+    while heap:
+        d, u = heapq.heappop(heap)
+        if d > dist[u]:
+            continue
+        if u == end:
+            break
+        for v, w in graph.get(u, []):
+            alt = d + w
+            if alt < dist[v]:
+                dist[v] = alt
+                heapq.heappush(heap, (alt, v))
+    return dist[end]
+
+
+class Command(BaseCommand):
+    help = 'Benchmark routing graph representations: dict of edge lists vs CSR arrays (memory and Dijkstra time)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='2000,20000,100000',
+                            help='Comma-separated synthetic network sizes (nodes)')
+        parser.add_argument('--neighbours', type=int, default=4,
+                            help='Links from each node to its nearest nodes')
+        parser.add_argument('--queries', type=int, default=50,
+                            help='Random point-to-point searches per size')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        self.stdout.write(
+            f"{'nodes':>7} {'edges':>8} {'dict MB':>8} {'csr MB':>7} "
+            f"{'dict ms/query':>14} {'csr ms/query':>13} {'speedup':>8}"
+        )
+        for size in sorted(int(s) for s in options['sizes'].split(',')):
+            node_ids, edges = self._synthetic_edges(rng, size, options['neighbours'])
+
+            tracemalloc.start()
+            adjacency = {nid: [] for nid in node_ids}
+            for u, v, w in edges:
+                adjacency[node_ids[u]].append((node_ids[v], w))
+                adjacency[node_ids[v]].append((node_ids[u], w))
+            dict_bytes = tracemalloc.get_traced_memory()[0]
+            tracemalloc.stop()
+
+            tracemalloc.start()
+            csr = CSRGraph.from_edges(node_ids, edges, undirected=True)
+            csr_bytes = tracemalloc.get_traced_memory()[0]
+            tracemalloc.stop()
+
+            pairs = [tuple(rng.sample(node_ids, 2)) for _ in range(options['queries'])]
+            start = time.perf_counter()
+            dict_costs = [dict_dijkstra(adjacency, a, b) for a, b in pairs]
+            dict_ms = (time.perf_counter() - start) * 1000 / len(pairs)
+            start = time.perf_counter()
+            csr_costs = [dijkstra(csr, a, b)[1] for a, b in pairs]
+            csr_ms = (time.perf_counter() - start) * 1000 / len(pairs)
+            if dict_costs != csr_costs:
+                self.stdout.write(self.style.ERROR('  CSR and dict searches disagree'))
+
+            self.stdout.write(
+                f"{size:>7} {csr.edge_count:>8} {dict_bytes / 1e6:>8.1f} {csr_bytes / 1e6:>7.1f} "
+                f"{dict_ms:>14.2f} {csr_ms:>13.2f} {dict_ms / csr_ms:>7.1f}x"
+            )
+
+    def _synthetic_edges(self, rng, size, neighbours):
+        """Random points over India, each linked to its nearest neighbours."""
+        lats = [rng.uniform(*LAT_RANGE) for _ in range(size)]
+        lons = [rng.uniform(*LON_RANGE) for _ in range(size)]
+        area_km2 = (
+            (LAT_RANGE[1] - LAT_RANGE[0]) * KM_PER_DEG_LAT
+            * (LON_RANGE[1] - LON_RANGE[0]) * KM_PER_DEG_LAT * math.cos(math.radians(sum(LAT_RANGE) / 2))
+        )
+        # Radius expected to hold about 2k points, so the k nearest are found in it
+        radius_km = math.sqrt(2 * neighbours * area_km2 / (math.pi * size))
+        node_ids = [f"node_{i}" for i in range(size)]
+        edges = [
+            (i, j, edge_weight_km(d, travel_time_min(d)))
+            for i, j, d in pairs_within_radius(lats, lons, radius_km, neighbours)
+        ]
+        return node_ids, edges
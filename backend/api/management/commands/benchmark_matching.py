@@ -0,0 +1,81 @@
+import io
+import random
+import time
+from contextlib import redirect_stdout
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from api.models import CustomUser
+from api.geometry import unit_vector
+from api.sharding import region_for
+from api.matching import available_labours_near, find_available_labours
+
+
+class Command(BaseCommand):
+    help = 'Benchmark labour matching (find_available_labours) as the labour table grows'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='1000,10000,50000',
+                            help='Comma-separated labour table sizes to measure')
+        parser.add_argument('--repeat', type=int, default=5,
+                            help='Job posts timed per size')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--explain', action='store_true',
+                            help='Print the query plan of the labour matching query after each size')
+
+    def handle(self, *args, **options):
+        sizes = sorted(int(s) for s in options['sizes'].split(','))
+        rng = random.Random(options['seed'])
+        # Job posted near Pune; labours spread across India
+        job_lat, job_lon = 18.5204, 73.8567
+
+        # All synthetic rows are rolled back at the end
+        with transaction.atomic():
+            created = 0
+            self.stdout.write(f"{'labours':>10} {'ms/post':>10} {'queries':>8} {'matched':>8}")
+            for size in sizes:
+                self._create_labours(rng, created, size)
+                created = size
+
+                timings = []
+                for _ in range(options['repeat']):
+                    # find_available_labours prints progress; keep the table readable
+                    with CaptureQueriesContext(connection) as ctx, redirect_stdout(io.StringIO()):
+                        start = time.perf_counter()
+                        matched, _radius = find_available_labours(job_lat, job_lon, 5, 10)
+                        timings.append((time.perf_counter() - start) * 1000)
+                timings.sort()
+                self.stdout.write(
+                    f"{size:>10} {timings[len(timings) // 2]:>10.2f} "
+                    f"{len(ctx.captured_queries):>8} {len(matched):>8}"
+                )
+                if options['explain']:
+                    plan = available_labours_near(job_lat, job_lon, 50).explain()
+                    self.stdout.write(f"  plan: {plan}")
+            transaction.set_rollback(True)
+
+    def _create_labours(self, rng, start, end):
+        batch = []
+        for i in range(start, end):
+            lat = Decimal(f"{rng.uniform(8.0, 30.0):.6f}")
+            lon = Decimal(f"{rng.uniform(70.0, 88.0):.6f}")
+            ux, uy, uz = unit_vector(lat, lon)
+            batch.append(CustomUser(
+                username=f'bench_labour_{i}',
+                email=f'bench_labour_{i}@bench.local',
+                first_name=f'Labour {i}',
+                phone='0000000000',
+                role='labour',
+                password='!',
+                latitude=lat,
+                longitude=lon,
+                is_available=True,
+                region=region_for(lat, lon),
+                ux=ux,
+                uy=uy,
+                uz=uz,
+            ))
+        CustomUser.objects.bulk_create(batch, batch_size=2000)
@@ -0,0 +1,81 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+
+from api.landmark_graph import LandmarkGraph, landmark_node_id
+from api.routing_service import compute_optimal_route, compute_route_matrix, travel_time_min
+
+# Job location the synthetic labours are scattered around (Pune)
+FARM_LAT, FARM_LON = 18.52, 73.86
+
+
+class Command(BaseCommand):
+    help = 'Benchmark one route_matrix call against one route call per destination'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--labours', type=int, default=400,
+                            help='Labours around the job (graph nodes)')
+        parser.add_argument('--landmarks', type=int, default=200,
+                            help='Landmarks across Maharashtra')
+        parser.add_argument('--destinations', default='5,20,100',
+                            help='Comma-separated numbers of destinations per batch')
+        parser.add_argument('--seed', type=int, default=42)
+
+    # Synthetic landmarks must not load, or trigger a rebuild of, the stored hierarchy and table
+    @override_settings(LANDMARK_HIERARCHY_PATH=None, LANDMARK_TABLE_PATH=None)
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        labour_nodes = [
+            {'id': f'labour_{i}', 'lat': FARM_LAT + rng.uniform(-0.6, 0.6),
+             'lon': FARM_LON + rng.uniform(-0.6, 0.6), 'label': f'L{i}'}
+            for i in range(options['labours'])
+        ]
+        landmarks = self._landmarks(rng, options['landmarks'])
+        origin = {'lat': FARM_LAT, 'lon': FARM_LON, 'label': 'Farm'}
+
+        self.stdout.write(f"{'dests':>6} {'single calls ms':>16} {'matrix ms':>10} {'speedup':>8} {'mismatches':>10}")
+        for count in sorted(int(c) for c in options['destinations'].split(',')):
+            destinations = [
+                {'lat': n['lat'], 'lon': n['lon'], 'label': n['label']}
+                for n in rng.sample(labour_nodes, min(count, len(labour_nodes)))
+            ]
+
+            start = time.perf_counter()
+            singles = [
+                compute_optimal_route(
+                    origin['lat'], origin['lon'], d['lat'], d['lon'],
+                    [dict(d, id='dest')] + labour_nodes, landmarks,
+                )
+                for d in destinations
+            ]
+            single_ms = (time.perf_counter() - start) * 1000
+
+            start = time.perf_counter()
+            matrix = compute_route_matrix([origin], destinations, labour_nodes, landmarks)
+            matrix_ms = (time.perf_counter() - start) * 1000
+
+            # Destinations are labour positions, so both graphs hold the same points
+            mismatches = sum(
+                1 for single, km in zip(singles, matrix['distance_km'][0])
+                if abs(single['total_distance_km'] - km) > 0.01
+            )
+            self.stdout.write(
+                f"{len(destinations):>6} {single_ms:>16.1f} {matrix_ms:>10.1f} "
+                f"{single_ms / matrix_ms:>7.1f}x {mismatches:>10}"
+            )
+
+    def _landmarks(self, rng, size):
+        nodes = {
+            landmark_node_id(i): {'lat': rng.uniform(16.0, 21.5), 'lon': rng.uniform(73.0, 80.5),
+                                  'label': f'M{i}', 'type': 'landmark'}
+            for i in range(size)
+        }
+        distances = {}
+        for i in range(size):
+            for j in rng.sample(range(size), 3):
+                if i != j:
+                    d_km = rng.uniform(20, 300)
+                    distances.setdefault(landmark_node_id(i), {})[landmark_node_id(j)] = (d_km, travel_time_min(d_km))
+        return LandmarkGraph(nodes, distances, version='benchmark')
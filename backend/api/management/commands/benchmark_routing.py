@@ -0,0 +1,134 @@
+import os
+import random
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.geometry import haversine_km, haversine_many
+from api.landmark_graph import LandmarkGraph, landmark_node_id
+from api.landmark_table import LandmarkTable, build_landmark_table
+from api.contraction_hierarchy import build_contraction_hierarchy
+from api.routing_service import alt_search, bidirectional_dijkstra, dijkstra, travel_time_min
+
+# Road distance is longer than the straight line between two landmarks
+ROAD_DETOUR_FACTOR = 1.3
+
+
+# Trips shorter than this (straight line) count as local
+LOCAL_TRIP_KM = 50.0
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark landmark routing searches (Dijkstra, bidirectional Dijkstra, A* with ALT, '
+        'contraction hierarchy, all-pairs table): '
+        'settled nodes and latency for local and long-distance trips'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='500,2000,5000',
+                            help='Comma-separated synthetic landmark network sizes')
+        parser.add_argument('--neighbours', type=int, default=4,
+                            help='Road links from each landmark to its nearest landmarks')
+        parser.add_argument('--queries', type=int, default=200,
+                            help='Random origin/destination pairs per trip class and size')
+        parser.add_argument('--table-max-nodes', type=int, default=2000,
+                            help='Largest network to build the all-pairs table for')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        self.stdout.write(
+            f"{'nodes':>7} {'trip':>6} {'search':>14} {'settled':>9} {'ms/query':>9} {'mismatches':>10}"
+        )
+        tmp = tempfile.TemporaryDirectory()
+        for size in sorted(int(s) for s in options['sizes'].split(',')):
+            graph = self._synthetic_graph(rng, size, options['neighbours'])
+            csr = graph.csr
+
+            start = time.perf_counter()
+            anchors = graph.anchors
+            self.stdout.write(f"{size:>7} ALT anchors precomputed in {(time.perf_counter() - start) * 1000:.1f} ms")
+            start = time.perf_counter()
+            hierarchy = build_contraction_hierarchy(csr, graph.fingerprint)
+            self.stdout.write(
+                f"{size:>7} contraction hierarchy built in {time.perf_counter() - start:.2f} s "
+                f"({hierarchy.shortcut_count} shortcuts)"
+            )
+
+            searches = (
+                ('dijkstra', lambda a, b, stats: dijkstra(csr, a, b, stats)),
+                ('bidirectional', lambda a, b, stats: bidirectional_dijkstra(csr, a, b, stats)),
+                ('alt', lambda a, b, stats: alt_search(csr, a, b, anchors, stats)),
+                ('ch', lambda a, b, stats: hierarchy.query(a, b, stats)),
+            )
+            if size <= options['table_max_nodes']:
+                path = os.path.join(tmp.name, f'table_{size}.bin')
+                start = time.perf_counter()
+                build_landmark_table(csr, graph.fingerprint, path)
+                self.stdout.write(
+                    f"{size:>7} all-pairs table built in {time.perf_counter() - start:.2f} s "
+                    f"({os.path.getsize(path) / 1e6:.1f} MB)"
+                )
+                table = LandmarkTable.load(path)
+                searches += (('table', lambda a, b, stats: table.path(a, b, stats)),)
+            for trip, pairs in (
+                ('local', self._local_pairs(rng, graph, options['queries'])),
+                ('long', self._long_pairs(rng, graph, options['queries'])),
+            ):
+                reference = [dijkstra(csr, a, b)[1] for a, b in pairs]
+                for name, search in searches:
+                    settled = 0
+                    mismatches = 0
+                    start = time.perf_counter()
+                    for (a, b), expected in zip(pairs, reference):
+                        stats = {}
+                        _, cost = search(a, b, stats)
+                        settled += stats['settled']
+                        if cost != expected and abs(cost - expected) > 1e-6 * max(1.0, expected):
+                            mismatches += 1
+                    elapsed_ms = (time.perf_counter() - start) * 1000
+                    self.stdout.write(
+                        f"{size:>7} {trip:>6} {name:>14} {settled / len(pairs):>9.1f} "
+                        f"{elapsed_ms / len(pairs):>9.3f} {mismatches:>10}"
+                    )
+        tmp.cleanup()
+
+    def _local_pairs(self, rng, graph, count):
+        """Pairs whose straight-line distance is under LOCAL_TRIP_KM."""
+        pairs = []
+        while len(pairs) < count:
+            i = rng.randrange(len(graph))
+            dists = haversine_many(graph.lats[i], graph.lons[i], graph.lats, graph.lons)
+            near = [j for j in range(len(graph)) if j != i and dists[j] < LOCAL_TRIP_KM]
+            if near:
+                pairs.append((graph.node_ids[i], graph.node_ids[rng.choice(near)]))
+        return pairs
+
+    def _long_pairs(self, rng, graph, count):
+        """Pairs whose straight-line distance is at least LOCAL_TRIP_KM."""
+        pairs = []
+        while len(pairs) < count:
+            i, j = rng.sample(range(len(graph)), 2)
+            if haversine_km(graph.lats[i], graph.lons[i], graph.lats[j], graph.lons[j]) >= LOCAL_TRIP_KM:
+                pairs.append((graph.node_ids[i], graph.node_ids[j]))
+        return pairs
+
+    def _synthetic_graph(self, rng, size, neighbours):
+        """Landmarks spread across India, each linked by road to its nearest landmarks."""
+        lats = [rng.uniform(8.0, 30.0) for _ in range(size)]
+        lons = [rng.uniform(70.0, 88.0) for _ in range(size)]
+        nodes = {
+            landmark_node_id(i): {"lat": lats[i], "lon": lons[i], "label": f"L{i}", "type": "landmark"}
+            for i in range(size)
+        }
+        distances = {}
+        for i in range(size):
+            dists = haversine_many(lats[i], lons[i], lats, lons)
+            nearest = sorted(range(size), key=dists.__getitem__)[1:neighbours + 1]
+            targets = distances.setdefault(landmark_node_id(i), {})
+            for j in nearest:
+                d_km = float(dists[j]) * ROAD_DETOUR_FACTOR
+                targets[landmark_node_id(j)] = (d_km, travel_time_min(d_km))
+        return LandmarkGraph(nodes, distances, version='benchmark')
@@ -0,0 +1,53 @@
+import os
+import random
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.contraction_hierarchy import build_contraction_hierarchy
+from api.landmark_graph import clear_landmark_graph, hierarchy_path, load_landmark_graph
+from api.routing_service import dijkstra
+
+
+class Command(BaseCommand):
+    help = 'Precompute the contraction hierarchy of the landmark network used by SLM routing'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--verify', type=int, default=0, metavar='N',
+                            help='Check N random landmark pairs against plain Dijkstra')
+        parser.add_argument('--output', default=None,
+                            help='File to write (default: settings.LANDMARK_HIERARCHY_PATH)')
+
+    def handle(self, *args, **options):
+        path = options['output'] or hierarchy_path()
+        if not path:
+            raise CommandError('LANDMARK_HIERARCHY_PATH is not set and no --output was given')
+
+        graph = load_landmark_graph(version='build')
+        if len(graph) < 2:
+            raise CommandError('Need at least two landmarks to build a hierarchy')
+        start = time.perf_counter()
+        hierarchy = build_contraction_hierarchy(graph.csr, graph.fingerprint)
+        build_s = time.perf_counter() - start
+
+        if options['verify']:
+            rng = random.Random(0)
+            mismatches = 0
+            for _ in range(options['verify']):
+                a, b = rng.sample(graph.node_ids, 2)
+                expected = dijkstra(graph.csr, a, b)[1]
+                cost = hierarchy.query(a, b)[1]
+                if cost != expected and abs(cost - expected) > 1e-6 * max(1.0, expected):
+                    mismatches += 1
+            if mismatches:
+                raise CommandError(f"{mismatches} of {options['verify']} queries disagree with Dijkstra")
+            self.stdout.write(f"Verified {options['verify']} queries against Dijkstra")
+
+        hierarchy.save(path)
+        # Workers pick up the new file when they next load the graph
+        clear_landmark_graph()
+        self.stdout.write(self.style.SUCCESS(
+            f"Contracted {len(hierarchy)} landmarks ({graph.csr.edge_count // 2} roads, "
+            f"{hierarchy.shortcut_count} shortcuts) in {build_s:.2f}s; "
+            f"wrote {os.path.getsize(path) / 1024:.1f} KB to {path}"
+        ))
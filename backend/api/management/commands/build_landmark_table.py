@@ -0,0 +1,61 @@
+import os
+import random
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.landmark_graph import clear_landmark_graph, load_landmark_graph, table_path
+from api.landmark_table import LandmarkTable, build_landmark_table
+from api.routing_service import dijkstra
+
+
+class Command(BaseCommand):
+    help = 'Precompute the all-pairs landmark cost and next-hop table used by SLM routing'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=None,
+                            help='Worker processes (default: one per CPU; 1 builds in this process)')
+        parser.add_argument('--verify', type=int, default=0, metavar='N',
+                            help='Check N random landmark pairs against plain Dijkstra')
+        parser.add_argument('--output', default=None,
+                            help='File to write (default: settings.LANDMARK_TABLE_PATH)')
+
+    def handle(self, *args, **options):
+        path = options['output'] or table_path()
+        if not path:
+            raise CommandError('LANDMARK_TABLE_PATH is not set and no --output was given')
+
+        graph = load_landmark_graph(version='build')
+        n = len(graph)
+        if n < 2:
+            raise CommandError('Need at least two landmarks to build a table')
+        self.stdout.write(f"Building {n} x {n} table ({12 * n * n / 1e6:.1f} MB)")
+
+        def progress(done, total):
+            if done == total or done % 500 < 16:
+                self.stdout.write(f"  {done}/{total} rows")
+
+        start = time.perf_counter()
+        build_landmark_table(graph.csr, graph.fingerprint, path, workers=options['workers'], progress=progress)
+        elapsed = time.perf_counter() - start
+
+        if options['verify']:
+            table = LandmarkTable.load(path)
+            rng = random.Random(0)
+            mismatches = 0
+            for _ in range(options['verify']):
+                a, b = rng.sample(graph.node_ids, 2)
+                expected = dijkstra(graph.csr, a, b)[1]
+                cost = table.path(a, b)[1]
+                if cost != expected and abs(cost - expected) > 1e-6 * max(1.0, expected):
+                    mismatches += 1
+            if mismatches:
+                raise CommandError(f"{mismatches} of {options['verify']} queries disagree with Dijkstra")
+            self.stdout.write(f"Verified {options['verify']} queries against Dijkstra")
+
+        # Workers map the new file when they next load the graph
+        clear_landmark_graph()
+        self.stdout.write(self.style.SUCCESS(
+            f"Computed {n} rows in {elapsed:.2f}s ({n / elapsed:.0f} rows/s); "
+            f"wrote {os.path.getsize(path) / 1e6:.1f} MB to {path}"
+        ))
@@ -0,0 +1,115 @@
+import os
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from api.landmark_distances import (
+    DEFAULT_K, compute_landmark_distances, landmarks_without_distances, load_landmarks, pair_tasks,
+    save_distance_batch, stored_distances,
+)
+from api.landmark_graph import clear_landmark_graph, hierarchy_path, table_path
+from api.road_network import get_road_network, snap_max_km
+
+
+class Command(BaseCommand):
+    help = 'Compute LandmarkDistance rows for each landmark\'s k nearest neighbours (or all pairs) in parallel'
+
+    def add_arguments(self, parser):
+        pairs = parser.add_mutually_exclusive_group()
+        pairs.add_argument('--k', type=int, default=DEFAULT_K,
+                           help=f'Pair each landmark with its k nearest landmarks (default: {DEFAULT_K})')
+        pairs.add_argument('--all-pairs', action='store_true',
+                           help='Pair every two landmarks: a complete landmark graph, only for small sets')
+        parser.add_argument('--incremental', action='store_true',
+                            help='Only compute pairs involving landmarks that have no distances yet')
+        parser.add_argument('--overwrite', action='store_true',
+                            help='Replace stored distances with road-network ones (great-circle estimates '
+                                 'never replace a stored distance); default: only add missing pairs')
+        parser.add_argument('--workers', type=int, default=None,
+                            help='Worker processes (default: one per CPU; 1 computes in this process)')
+        parser.add_argument('--batch-size', type=int, default=5000,
+                            help='Rows written per bulk_create/bulk_update transaction')
+
+    def handle(self, *args, **options):
+        k = None if options['all_pairs'] else options['k']
+        if k is not None and k < 1:
+            raise CommandError('--k must be at least 1')
+        ids, lats, lons = load_landmarks()
+        n = len(ids)
+        if n < 2:
+            raise CommandError('Need at least two landmarks')
+
+        only = None
+        if options['incremental']:
+            new_ids = landmarks_without_distances(ids)
+            if not new_ids:
+                self.stdout.write(self.style.SUCCESS('Every landmark already has distances; nothing to do'))
+                return
+            only = {i for i, pk in enumerate(ids) if pk in new_ids}
+            existing = stored_distances(sorted(new_ids))
+        else:
+            existing = stored_distances()
+
+        # Workers map the same network file the routing code uses
+        road_path = settings.ROAD_NETWORK_PATH if get_road_network() is not None else None
+        skip = None
+        if not (options['overwrite'] and road_path):
+            # Stored pairs stay as they are: do not compute them again
+            index = {pk: i for i, pk in enumerate(ids)}
+            skip = {(index[a], index[b]) for a, b in existing if a in index and b in index}
+        tasks = pair_tasks(n, lats, lons, k, only, skip)
+        pairs = sum(len(targets) for task in tasks for _, targets in task)
+        source = 'road network' if road_path else 'great-circle distance'
+        scope = f", {len(only)} new" if only is not None else ''
+        self.stdout.write(f"Computing {pairs} pairs for {n} landmarks ({source}{scope})")
+
+        start = time.perf_counter()
+        write_s = 0.0
+        created = updated = done = 0
+        batch = []
+
+        def flush():
+            nonlocal created, updated, write_s
+            started = time.perf_counter()
+            c, u = save_distance_batch(batch, existing, overwrite=options['overwrite'])
+            write_s += time.perf_counter() - started
+            created += c
+            updated += u
+            batch.clear()
+
+        for rows in compute_landmark_distances(ids, lats, lons, tasks, workers=options['workers'],
+                                               road_path=road_path, snap_max_km=snap_max_km()):
+            batch.extend(rows)
+            done += len(rows)
+            if len(batch) >= options['batch_size']:
+                flush()
+                self.stdout.write(f"  {done}/{pairs} pairs")
+        if batch:
+            flush()
+        elapsed = time.perf_counter() - start
+
+        # bulk_create/bulk_update skip the signals that keep the landmark graph current
+        clear_landmark_graph()
+        compute_s = max(elapsed - write_s, 1e-9)
+        self.stdout.write(self.style.SUCCESS(
+            f"{done} pairs in {elapsed:.2f}s: computed at {done / compute_s:.0f} pairs/s, "
+            f"written at {done / max(write_s, 1e-9):.0f} rows/s; {created} created, {updated} updated"
+        ))
+        if created or updated:
+            self.warn_stale_files()
+
+    def warn_stale_files(self):
+        """The precomputed files no longer match the landmark graph: SLM ignores them until rebuilt."""
+        commands = []
+        if getattr(settings, 'LANDMARK_HIERARCHY_AUTO_REBUILD', False):
+            self.stdout.write("Workers rebuild the landmark hierarchy in the background")
+        elif hierarchy_path() and os.path.exists(hierarchy_path()):
+            commands.append('build_landmark_hierarchy')
+        if table_path() and os.path.exists(table_path()):
+            commands.append('build_landmark_table')
+        if commands:
+            self.stdout.write(self.style.WARNING(
+                "Landmark distances changed; SLM uses ALT search until you run "
+                + ' and '.join(f"`manage.py {command}`" for command in commands)
+            ))
@@ -0,0 +1,93 @@
+import os
+import resource
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from api.models import CustomUser, Job, Landmark
+from api.road_network import (
+    DEFAULT_CELL_DEG, RoadNetwork, RoadNetworkBuilder, import_geojson, import_osm_pbf, import_osm_xml, snap_max_km,
+)
+
+READERS = {
+    'osm': import_osm_xml,
+    'pbf': import_osm_pbf,
+    'geojson': import_geojson,
+}
+
+
+def detect_format(path: str) -> str:
+    name = path.lower()
+    if name.endswith('.pbf'):
+        return 'pbf'
+    if name.endswith(('.geojson', '.geojsonl', '.geojsons', '.ndjson', '.json')):
+        return 'geojson'
+    return 'osm'
+
+
+class Command(BaseCommand):
+    help = 'Import an OSM (XML/PBF) or GeoJSON road extract into the road network used for routing'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Road extract (.osm, .osm.pbf, .geojson or line-delimited .geojsonl)')
+        parser.add_argument('--format', choices=sorted(READERS), default=None,
+                            help='Input format (default: from the file extension)')
+        parser.add_argument('--output', default=None,
+                            help='File to write (default: settings.ROAD_NETWORK_PATH)')
+        parser.add_argument('--cell-deg', type=float, default=DEFAULT_CELL_DEG,
+                            help='Snapping grid cell size in degrees')
+
+    def handle(self, *args, **options):
+        path = options['output'] or getattr(settings, 'ROAD_NETWORK_PATH', None)
+        if not path:
+            raise CommandError('ROAD_NETWORK_PATH is not set and no --output was given')
+        source = options['path']
+        if not os.path.exists(source):
+            raise CommandError(f"No such file: {source}")
+        fmt = options['format'] or detect_format(source)
+
+        start = time.perf_counter()
+        builder = RoadNetworkBuilder(cell_deg=options['cell_deg'])
+        try:
+            READERS[fmt](source, builder)
+        except ImportError as e:
+            raise CommandError(str(e))
+        if not builder.way_count:
+            raise CommandError(f"No drivable roads found in {source}")
+        counts = builder.write(path)
+        elapsed = time.perf_counter() - start
+        # ru_maxrss is in kilobytes on Linux
+        peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+        self.stdout.write(
+            f"{counts['ways']} ways, {counts['referenced_nodes']} way nodes -> "
+            f"{counts['road_nodes']} road nodes, {counts['road_segments']} segments"
+        )
+        self.stdout.write(f"Imported in {elapsed:.2f}s, peak memory {peak_mb:.0f} MB")
+
+        network = RoadNetwork.load(path)
+        max_km = snap_max_km()
+        for name, rows in (
+            ('Landmarks', Landmark.objects.values_list('latitude', 'longitude')),
+            ('Labours', CustomUser.objects.filter(role='labour', latitude__isnull=False, longitude__isnull=False)
+                .values_list('latitude', 'longitude')),
+            ('Farms (jobs)', Job.objects.values_list('latitude', 'longitude')),
+        ):
+            total = snapped = 0
+            furthest = 0.0
+            for lat, lon in rows.iterator():
+                total += 1
+                found = network.nearest_node(float(lat), float(lon), max_km)
+                if found is not None:
+                    snapped += 1
+                    furthest = max(furthest, found[1])
+            if total:
+                self.stdout.write(
+                    f"  {name}: {snapped}/{total} within {max_km:g} km of a road node "
+                    f"(furthest snap {furthest:.2f} km)"
+                )
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote {os.path.getsize(path) / 1e6:.1f} MB to {path}"
+        ))
@@ -0,0 +1,41 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from api.matching import apply_match_diff, diff_matches, expected_job_matches
+from api.models import Job, JobMatch
+
+
+class Command(BaseCommand):
+    help = 'Check the JobMatch table against a full recomputation and rebuild it in bulk'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true',
+                            help='Only report drift; exit with an error if the table is inconsistent')
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        expected = {}
+        jobs = 0
+        for job in Job.objects.filter(status='open').iterator():
+            expected.update(expected_job_matches(job))
+            jobs += 1
+
+        if options['check']:
+            missing, wrong, stale = diff_matches(JobMatch.objects.all(), expected)
+            self.stdout.write(
+                f"{jobs} open jobs, {len(expected)} expected matches: "
+                f"{len(missing)} missing, {len(wrong)} outdated, {len(stale)} stale"
+            )
+            if missing or wrong or stale:
+                raise CommandError('JobMatch table is inconsistent; run rebuild_job_matches to fix it')
+            self.stdout.write(self.style.SUCCESS('JobMatch table is consistent'))
+            return
+
+        with transaction.atomic():
+            created, updated, deleted = apply_match_diff(JobMatch.objects.all(), expected)
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt matches for {jobs} open jobs in {time.perf_counter() - start:.2f}s: "
+            f"{created} created, {updated} updated, {deleted} deleted"
+        ))
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from api.route_cache import reset_route_cache_stats, route_cache_stats
+
+
+class Command(BaseCommand):
+    help = 'Show route cache hit/miss counts (shared by all workers using the route cache)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true', help='Zero the counters after printing them')
+
+    def handle(self, *args, **options):
+        stats = route_cache_stats()
+        hit_rate = 'n/a' if stats['hit_rate'] is None else f"{stats['hit_rate']:.1%}"
+        self.stdout.write(f"hits: {stats['hits']}  misses: {stats['misses']}  hit rate: {hit_rate}")
+        if options['reset']:
+            reset_route_cache_stats()
+            self.stdout.write('Counters reset')
@@ -0,0 +1,206 @@
+"""
+Krishiment job matching: which labours a job reaches and which jobs a labour can see.
+
+- Spatial queries: available labours near a point, open jobs whose radius
+  reaches a point, k-nearest labours for a new job.
+- Travel-time prefilter: labours reachable within a number of minutes, from
+  one isochrone search (api.isochrone) rather than one route per labour.
+- JobMatch table: the persisted labour <-> open job pairs (labour within the
+  job's radius). Signal handlers call sync_job_matches / sync_labour_matches
+  when a job or a labour changes, so reads are indexed lookups; the
+  rebuild_job_matches command recomputes the whole table in bulk.
+"""
+import logging
+import math
+
+from django.db.models import F
+
+from .isochrone import compute_isochrone, isochrone_radius_km
+from .landmark_graph import get_landmark_graph
+from .models import CustomUser, Job, JobMatch
+from .spatial_index import MAX_SEARCH_RADIUS_KM, annotate_distance, grid_cell, within_bounding_box
+
+logger = logging.getLogger(__name__)
+
+# Labour search: the job radius grows in 5 km steps up to MAX_SEARCH_RADIUS_KM (Uber-like)
+SEARCH_RADIUS_STEP_KM = 5
+
+
+def available_labours_near(lat, lon, radius_km):
+    """
+    Available labours inside the bounding box of radius_km around (lat, lon),
+    served by the (role, is_available, latitude, longitude) index.
+    Callers still check the exact distance.
+    """
+    labours = CustomUser.objects.filter(
+        role='labour',
+        # IN rather than =True: SQLite only uses the composite index past
+        # is_available when the boolean is written as a comparison
+        is_available__in=[True],
+    )
+    return within_bounding_box(labours, lat, lon, radius_km)
+
+
+def labours_reachable_within(lat, lon, minutes, labours):
+    """{labour id: travel minutes} for the labours (CustomUser instances) reachable within minutes."""
+    labour_nodes = [
+        {'id': f'labour_{labour.id}', 'lat': float(labour.latitude), 'lon': float(labour.longitude)}
+        for labour in labours
+    ]
+    isochrone = compute_isochrone(float(lat), float(lon), minutes, labour_nodes, get_landmark_graph())
+    return {int(entry['id'][len('labour_'):]): entry['time_min'] for entry in isochrone['labours']}
+
+
+def find_available_labours(job_lat, job_lon, radius_km, required_workers, max_travel_min=None):
+    """
+    Find the nearest available labours (k-nearest, Uber-like).
+    The database ranks the labours within the maximum search radius by
+    great-circle distance and returns the closest required_workers of them;
+    the radius returned is the smallest one (the initial radius expanded in
+    5 km steps) that covers them.
+    With max_travel_min, only labours reachable within that many minutes
+    count, and each result carries its travel_min.
+    """
+    initial_radius = float(radius_km)
+    max_radius = max(MAX_SEARCH_RADIUS_KM, initial_radius)
+    
+    logger.debug("Searching for labours at %s, %s with radius %skm", job_lat, job_lon, radius_km)
+    
+    # Nearest available labours within the maximum radius, ranked in SQL
+    labours = annotate_distance(
+        available_labours_near(job_lat, job_lon, max_radius), job_lat, job_lon
+    ).filter(distance_km__lte=max_radius).order_by('distance_km', 'id')
+    travel = None
+    if max_travel_min is not None:
+        # The isochrone needs every candidate anyway: rank the fetched rows instead of querying by id again
+        candidates = list(labours.filter(distance_km__lte=isochrone_radius_km(max_travel_min)))
+        travel = labours_reachable_within(job_lat, job_lon, max_travel_min, candidates)
+        selected = [labour for labour in candidates if labour.id in travel][:required_workers]
+    else:
+        selected = labours[:required_workers]
+    available_labours = [
+        {'labour': labour, 'distance': labour.distance_km}
+        for labour in selected
+    ]
+    if travel is not None:
+        for entry in available_labours:
+            entry['travel_min'] = travel[entry['labour'].id]
+    
+    if len(available_labours) < required_workers:
+        # Not enough labours even at the maximum radius: return all of them
+        logger.debug("Final result: %d labours within %skm", len(available_labours), max_radius)
+        return available_labours, max_radius
+    
+    # Smallest step radius covering the farthest selected labour
+    final_radius = initial_radius
+    farthest = available_labours[-1]['distance'] if available_labours else 0.0
+    if farthest > initial_radius:
+        steps = math.ceil((farthest - initial_radius) / SEARCH_RADIUS_STEP_KM)
+        final_radius = min(initial_radius + steps * SEARCH_RADIUS_STEP_KM, max_radius)
+    
+    logger.debug("Found %d labours within %skm", len(available_labours), final_radius)
+    return available_labours, final_radius
+
+
+def open_jobs_covering(lat, lon):
+    """
+    Open jobs whose search radius reaches (lat, lon), annotated with distance_km.
+    Candidates come from the job coverage index and the bounding box of the
+    largest job radius; the exact radius check runs in the database.
+    """
+    jobs = Job.objects.filter(
+        status='open',
+        coverage_cells__cell=grid_cell(lat, lon)
+    )
+    jobs = annotate_distance(within_bounding_box(jobs, lat, lon, MAX_SEARCH_RADIUS_KM), lat, lon)
+    return jobs.filter(distance_km__lte=F('radius_km'))
+
+
+def jobs_matched_to(labour):
+    """Open jobs in the labour's JobMatch rows, annotated with distance_km."""
+    return Job.objects.filter(
+        status='open',
+        matches__labour=labour
+    ).annotate(distance_km=F('matches__distance_km'))
+
+
+def labours_within_job_radius(job):
+    """Located labours (available or not) within the job's radius, annotated with distance_km."""
+    labours = within_bounding_box(
+        CustomUser.objects.filter(role='labour'),
+        job.latitude, job.longitude, job.radius_km
+    )
+    labours = annotate_distance(labours, job.latitude, job.longitude)
+    return labours.filter(distance_km__lte=job.radius_km)
+
+
+def expected_job_matches(job):
+    """{(job_id, labour_id): (distance_km, labour_available)} the job should have."""
+    if job.status != 'open':
+        return {}
+    return {
+        (job.id, labour_id): (distance, available)
+        for labour_id, distance, available in labours_within_job_radius(job).values_list(
+            'id', 'distance_km', 'is_available'
+        )
+    }
+
+
+def expected_labour_matches(labour):
+    """{(job_id, labour_id): (distance_km, labour_available)} the labour should have."""
+    if labour.role != 'labour' or labour.latitude is None or labour.longitude is None:
+        return {}
+    return {
+        (job_id, labour.id): (distance, labour.is_available)
+        for job_id, distance in open_jobs_covering(labour.latitude, labour.longitude).values_list(
+            'id', 'distance_km'
+        )
+    }
+
+
+def diff_matches(existing, expected):
+    """
+    Compare the JobMatch rows in `existing` (a queryset) with `expected`.
+    Returns (to_create, to_update, stale_ids).
+    """
+    current = {(m.job_id, m.labour_id): m for m in existing}
+    stale_ids = [m.id for key, m in current.items() if key not in expected]
+
+    to_create, to_update = [], []
+    for (job_id, labour_id), (distance, available) in expected.items():
+        match = current.get((job_id, labour_id))
+        if match is None:
+            to_create.append(JobMatch(
+                job_id=job_id, labour_id=labour_id,
+                distance_km=distance, labour_available=available
+            ))
+        elif not math.isclose(match.distance_km, distance, abs_tol=1e-6) or match.labour_available != available:
+            match.distance_km = distance
+            match.labour_available = available
+            to_update.append(match)
+    return to_create, to_update, stale_ids
+
+
+def apply_match_diff(existing, expected):
+    """
+    Bring the JobMatch rows in `existing` (a queryset) to `expected`.
+    Returns (created, updated, deleted) counts.
+    """
+    to_create, to_update, stale_ids = diff_matches(existing, expected)
+    if stale_ids:
+        JobMatch.objects.filter(id__in=stale_ids).delete()
+    if to_create:
+        JobMatch.objects.bulk_create(to_create, batch_size=1000)
+    if to_update:
+        JobMatch.objects.bulk_update(to_update, ['distance_km', 'labour_available'], batch_size=1000)
+    return len(to_create), len(to_update), len(stale_ids)
+
+
+def sync_job_matches(job):
+    """Recompute one job's matches (job created, closed, moved or radius changed)."""
+    return apply_match_diff(job.matches.all(), expected_job_matches(job))
+
+
+def sync_labour_matches(labour):
+    """Recompute one labour's matches (location changed or availability toggled)."""
+    return apply_match_diff(labour.job_matches.all(), expected_labour_matches(labour))
@@ -0,0 +1,215 @@
+"""
+Krishiment request middleware.
+
+- RegionShardMiddleware: forwards requests located in another shard's region
+  to that shard (see api.sharding) and tags responses with the shard that
+  served them.
+- QueryCountMiddleware: records the number and total time of SQL queries each
+  request runs; exposed as X-Query-Count / X-Query-Time-Ms headers when DEBUG
+  is on, logged otherwise.
+"""
+import json
+import logging
+import time
+import urllib.error
+import urllib.request
+
+from django.conf import settings
+from django.core.exceptions import RequestDataTooBig
+from django.db import connection
+from django.http import HttpResponse, JsonResponse
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+
+from .models import CustomUser
+from .sharding import local_shard, shard_for, shard_url
+
+logger = logging.getLogger(__name__)
+
+# Query parameter / body field pairs that locate a request, in order of preference
+COORDINATE_PARAMS = (
+    ('from_lat', 'from_lon'),
+    ('latitude', 'longitude'),
+)
+
+# Endpoints located by the requesting user's profile when they carry no coordinates
+PROFILE_LOCATED_PATHS = (
+    '/api/jobs/nearby/',
+)
+
+# Request headers passed on when a request is proxied to its shard
+PROXY_HEADERS = ('Authorization', 'Content-Type', 'Accept', 'Accept-Language')
+
+# Set on proxied requests, so the receiving worker serves them whatever its shard map says
+FORWARDED_HEADER = 'X-Shard-Forwarded'
+
+
+def _coordinates_in(data, pairs=COORDINATE_PARAMS):
+    for lat_param, lon_param in pairs:
+        lat = data.get(lat_param)
+        lon = data.get(lon_param)
+        if lat not in (None, '') and lon not in (None, ''):
+            try:
+                return float(lat), float(lon)
+            except (TypeError, ValueError):
+                return None
+    return None
+
+
+def request_body_data(request):
+    """Fields of a JSON or form-encoded request body ({} for any other body)."""
+    if request.content_type == 'application/json':
+        try:
+            data = json.loads(request.body or b'{}')
+        except (ValueError, RequestDataTooBig):
+            return {}
+        return data if isinstance(data, dict) else {}
+    if request.content_type == 'application/x-www-form-urlencoded':
+        return request.POST
+    return {}
+
+
+def profile_coordinates(request):
+    """(lat, lon) of the user a request's access token belongs to, or None."""
+    authentication = JWTAuthentication()
+    header = authentication.get_header(request)
+    raw_token = authentication.get_raw_token(header) if header else None
+    if raw_token is None:
+        return None
+    try:
+        token = authentication.get_validated_token(raw_token)
+    except (InvalidToken, TokenError):
+        return None
+    location = CustomUser.objects.filter(
+        pk=token.get(jwt_settings.USER_ID_CLAIM)
+    ).values_list('latitude', 'longitude').first()
+    if not location or location[0] is None or location[1] is None:
+        return None
+    return float(location[0]), float(location[1])
+
+
+def request_coordinates(request):
+    """
+    (lat, lon) that locate a request, or None: the query parameters, then the
+    body (a job's latitude/longitude, the first route_matrix origin), then the
+    user's profile for PROFILE_LOCATED_PATHS.
+    """
+    coords = _coordinates_in(request.GET)
+    if coords:
+        return coords
+    if request.method in ('POST', 'PUT', 'PATCH'):
+        data = request_body_data(request)
+        coords = _coordinates_in(data)
+        origins = data.get('origins')
+        if not coords and isinstance(origins, list) and origins and isinstance(origins[0], dict):
+            coords = _coordinates_in(origins[0], (('lat', 'lon'),))
+        if coords:
+            return coords
+    if request.path in PROFILE_LOCATED_PATHS:
+        return profile_coordinates(request)
+    return None
+
+
+def remote_shards_configured():
+    return any(config.get('url') for config in getattr(settings, 'MATCHING_SHARDS', {}).values())
+
+
+def redirect_to_shard(request, base_url):
+    response = HttpResponse(status=307)
+    response['Location'] = base_url.rstrip('/') + request.get_full_path()
+    return response
+
+
+def proxy_to_shard(request, shard, base_url):
+    """Replays the request on the shard's workers and returns their response."""
+    try:
+        body = request.body if request.method not in ('GET', 'HEAD') else None
+    except RequestDataTooBig:
+        # Too large to hold in memory: let the client send it to the shard itself
+        return redirect_to_shard(request, base_url)
+    headers = {name: request.headers[name] for name in PROXY_HEADERS if name in request.headers}
+    headers[FORWARDED_HEADER] = local_shard()
+    forwarded = urllib.request.Request(
+        base_url.rstrip('/') + request.get_full_path(),
+        data=body,
+        headers=headers,
+        method=request.method,
+    )
+    try:
+        with urllib.request.urlopen(forwarded, timeout=settings.SHARD_PROXY_TIMEOUT_S) as upstream:
+            status, content, content_type = upstream.status, upstream.read(), upstream.headers.get('Content-Type')
+    except urllib.error.HTTPError as error:
+        status, content, content_type = error.code, error.read(), error.headers.get('Content-Type')
+    except OSError as error:
+        logger.warning("Shard %s unreachable for %s %s: %s", shard, request.method, request.path, error)
+        return JsonResponse({'error': f'Shard {shard} is unavailable'}, status=502)
+    return HttpResponse(content, status=status, content_type=content_type)
+
+
+class RegionShardMiddleware:
+    """
+    Serves a request on the shard owning its coordinates. With SHARD_FORWARDING
+    'proxy' (the default) this worker replays the request on the shard and
+    relays its answer, so the Authorization header never has to cross origins.
+    With 'redirect' it answers 307 to the shard's URL instead; the client must
+    then re-send Authorization to that origin itself (browsers drop it on
+    cross-origin redirects), and every shard must accept the same JWT signing key.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        coords = None
+        if remote_shards_configured() and FORWARDED_HEADER not in request.headers:
+            coords = request_coordinates(request)
+        shard = shard_for(*coords) if coords else local_shard()
+        request.shard = shard
+
+        if shard != local_shard() and shard_url(shard):
+            if getattr(settings, 'SHARD_FORWARDING', 'proxy') == 'redirect':
+                response = redirect_to_shard(request, shard_url(shard))
+            else:
+                response = proxy_to_shard(request, shard, shard_url(shard))
+        else:
+            response = self.get_response(request)
+        response['X-Shard'] = shard
+        return response
+
+
+class QueryCounter:
+    """Database execute wrapper that counts queries and their total time."""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.seconds += time.perf_counter() - start
+
+
+class QueryCountMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        counter = QueryCounter()
+        with connection.execute_wrapper(counter):
+            response = self.get_response(request)
+        time_ms = counter.seconds * 1000
+
+        if settings.DEBUG:
+            response['X-Query-Count'] = str(counter.count)
+            response['X-Query-Time-Ms'] = f"{time_ms:.1f}"
+        else:
+            logger.info(
+                "%s %s: %d queries in %.1f ms",
+                request.method, request.path, counter.count, time_ms,
+            )
+        return response
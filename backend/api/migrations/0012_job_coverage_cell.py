@@ -0,0 +1,38 @@
+# Reverse coverage index mapping grid cells to open jobs
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def populate_job_coverage(apps, schema_editor):
+    from api.spatial_index import cells_within_radius
+
+    Job = apps.get_model('api', 'Job')
+    JobCoverageCell = apps.get_model('api', 'JobCoverageCell')
+    for job in Job.objects.filter(status='open').iterator():
+        JobCoverageCell.objects.bulk_create([
+            JobCoverageCell(job_id=job.id, cell=cell)
+            for cell in cells_within_radius(job.latitude, job.longitude, job.radius_km)
+        ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0011_routing_landmarks'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='JobCoverageCell',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cell', models.CharField(db_index=True, max_length=20)),
+                ('job', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='coverage_cells', to='api.job')),
+            ],
+            options={
+                'unique_together': {('job', 'cell')},
+            },
+        ),
+        migrations.RunPython(populate_job_coverage, migrations.RunPython.noop),
+    ]
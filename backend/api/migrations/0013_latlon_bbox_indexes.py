@@ -0,0 +1,21 @@
+# Generated by Django 4.2.30 on 2026-10-17 17:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0012_job_coverage_cell'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='customuser',
+            index=models.Index(fields=['role', 'is_available', 'latitude', 'longitude'], name='user_role_avail_latlon_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='job',
+            index=models.Index(fields=['status', 'latitude', 'longitude'], name='job_status_latlon_idx'),
+        ),
+    ]
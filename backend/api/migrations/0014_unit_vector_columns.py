@@ -0,0 +1,70 @@
+# Cached unit-vector columns for in-database great-circle distance
+
+from django.db import migrations, models
+
+
+def populate_unit_vectors(apps, schema_editor):
+    from api.geometry import unit_vector
+
+    for model_name in ('CustomUser', 'Job', 'Landmark'):
+        Model = apps.get_model('api', model_name)
+        rows = Model.objects.filter(latitude__isnull=False, longitude__isnull=False)
+        for row in rows.iterator():
+            row.ux, row.uy, row.uz = unit_vector(row.latitude, row.longitude)
+            row.save(update_fields=['ux', 'uy', 'uz'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0013_latlon_bbox_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customuser',
+            name='ux',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='customuser',
+            name='uy',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='customuser',
+            name='uz',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='job',
+            name='ux',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='job',
+            name='uy',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='job',
+            name='uz',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='landmark',
+            name='ux',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='landmark',
+            name='uy',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='landmark',
+            name='uz',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(populate_unit_vectors, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,49 @@
+# Persisted labour <-> open job match table
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def populate_job_matches(apps, schema_editor):
+    from api.spatial_index import annotate_distance, within_bounding_box
+
+    CustomUser = apps.get_model('api', 'CustomUser')
+    Job = apps.get_model('api', 'Job')
+    JobMatch = apps.get_model('api', 'JobMatch')
+    for job in Job.objects.filter(status='open').iterator():
+        labours = within_bounding_box(
+            CustomUser.objects.filter(role='labour'), job.latitude, job.longitude, job.radius_km
+        )
+        labours = annotate_distance(labours, job.latitude, job.longitude)
+        JobMatch.objects.bulk_create([
+            JobMatch(job_id=job.id, labour_id=labour_id, distance_km=distance, labour_available=available)
+            for labour_id, distance, available in labours.filter(
+                distance_km__lte=job.radius_km
+            ).values_list('id', 'distance_km', 'is_available')
+        ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0014_unit_vector_columns'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='JobMatch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('distance_km', models.FloatField()),
+                ('labour_available', models.BooleanField(default=True)),
+                ('job', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='matches', to='api.job')),
+                ('labour', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='job_matches', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['labour', 'distance_km'], name='jobmatch_labour_dist_idx'), models.Index(fields=['job', 'labour_available'], name='jobmatch_job_avail_idx')],
+                'unique_together': {('job', 'labour')},
+            },
+        ),
+        migrations.RunPython(populate_job_matches, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,35 @@
+# Region tile column used to shard matching
+
+from django.db import migrations, models
+
+
+def populate_regions(apps, schema_editor):
+    from api.sharding import region_for
+
+    for model_name in ('CustomUser', 'Job'):
+        Model = apps.get_model('api', model_name)
+        rows = Model.objects.filter(latitude__isnull=False, longitude__isnull=False)
+        for row in rows.iterator():
+            row.region = region_for(row.latitude, row.longitude)
+            row.save(update_fields=['region'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0015_job_match'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customuser',
+            name='region',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=20),
+        ),
+        migrations.AddField(
+            model_name='job',
+            name='region',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=20),
+        ),
+        migrations.RunPython(populate_regions, migrations.RunPython.noop),
+    ]
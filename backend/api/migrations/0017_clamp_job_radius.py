@@ -0,0 +1,34 @@
+# Clamp job radii above the matching search range, which JobSerializer now rejects
+
+from decimal import Decimal
+
+from django.db import migrations
+
+# spatial_index.MAX_SEARCH_RADIUS_KM when this migration was written
+MAX_RADIUS_KM = 50
+
+
+def clamp_job_radius(apps, schema_editor):
+    from api.spatial_index import cells_within_radius
+
+    Job = apps.get_model('api', 'Job')
+    JobCoverageCell = apps.get_model('api', 'JobCoverageCell')
+    JobMatch = apps.get_model('api', 'JobMatch')
+    jobs = Job.objects.filter(radius_km__gt=MAX_RADIUS_KM)
+    for job in jobs.iterator():
+        # Signals do not run here: bring the job's coverage cells and matches to the new radius
+        wanted = set(cells_within_radius(job.latitude, job.longitude, MAX_RADIUS_KM)) if job.status == 'open' else set()
+        JobCoverageCell.objects.filter(job_id=job.id).exclude(cell__in=wanted).delete()
+        JobMatch.objects.filter(job_id=job.id, distance_km__gt=MAX_RADIUS_KM).delete()
+    jobs.update(radius_km=Decimal(MAX_RADIUS_KM))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0016_region_shard_key'),
+    ]
+
+    operations = [
+        migrations.RunPython(clamp_job_radius, migrations.RunPython.noop),
+    ]
@@ -1,6 +1,27 @@
 from django.db import models
 from django.contrib.auth.models import AbstractUser
 
+from .geometry import unit_vector
+from .sharding import region_for
+
+
+# Cached 3D unit vector of the row's latitude/longitude, kept current on save.
+# Lets queries rank by great-circle distance in SQL (see spatial_index.annotate_distance).
+class UnitVectorModel(models.Model):
+    ux = models.FloatField(null=True, blank=True, editable=False)
+    uy = models.FloatField(null=True, blank=True, editable=False)
+    uz = models.FloatField(null=True, blank=True, editable=False)
+    
+    class Meta:
+        abstract = True
+    
+    def save(self, *args, **kwargs):
+        self.ux, self.uy, self.uz = unit_vector(self.latitude, self.longitude) or (None, None, None)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and ({'latitude', 'longitude'} & set(update_fields)):
+            kwargs['update_fields'] = set(update_fields) | {'ux', 'uy', 'uz'}
+        super().save(*args, **kwargs)
+
 # User roles
 USER_ROLES = (
     ('farmer', 'Farmer'),
@@ -8,7 +29,7 @@ USER_ROLES = (
 )
 
 # Custom user model
-class CustomUser(AbstractUser):
+class CustomUser(UnitVectorModel, AbstractUser):
     email = models.EmailField(unique=True)
     phone = models.CharField(max_length=15)
     role = models.CharField(max_length=10, choices=USER_ROLES)
@@ -18,13 +39,43 @@ class CustomUser(AbstractUser):
     latitude = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True)
     longitude = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True)
     is_available = models.BooleanField(default=True)  # For labours to indicate availability
+    # Region tile ("row:col") used to shard matching, kept current on save
+    region = models.CharField(max_length=20, blank=True, db_index=True, editable=False)
     
     # Make email the username field
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['username', 'first_name', 'phone', 'role']
     
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            # Bounding-box prefilter for labour matching
+            models.Index(fields=['role', 'is_available', 'latitude', 'longitude'], name='user_role_avail_latlon_idx'),
+        ]
+    
     def __str__(self):
         return f"{self.first_name} ({self.get_role_display()})"
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Role and region as stored, so post_save handlers can tell a change without a query
+        if 'role' in instance.__dict__:
+            instance.saved_role = instance.role
+        if 'region' in instance.__dict__:
+            instance.saved_region = instance.region
+        return instance
+    
+    def save(self, *args, **kwargs):
+        # Keep the region in sync with the location
+        self.region = region_for(self.latitude, self.longitude) or ''
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and ({'latitude', 'longitude'} & set(update_fields)):
+            kwargs['update_fields'] = set(update_fields) | {'region'}
+        super().save(*args, **kwargs)
+        if update_fields is None or 'role' in update_fields:
+            self.saved_role = self.role
+        if update_fields is None or {'latitude', 'longitude'} & set(update_fields):
+            self.saved_region = self.region
 
 # Equipment listing model
 def equipment_image_path(instance, filename):
@@ -89,7 +140,7 @@ class Inquiry(models.Model):
         return f"Inquiry for {self.equipment.title} by {self.buyer_name}"
 
 # Job model for farmers to post agricultural work opportunities
-class Job(models.Model):
+class Job(UnitVectorModel):
     STATUS_CHOICES = [
         ('open', 'Open'),
         ('in_progress', 'In Progress'),
@@ -122,6 +173,8 @@ class Job(models.Model):
     latitude = models.DecimalField(max_digits=9, decimal_places=6)
     longitude = models.DecimalField(max_digits=9, decimal_places=6)
     radius_km = models.DecimalField(max_digits=5, decimal_places=2, default=5.0)  # Initial search radius
+    # Region tile ("row:col") used to shard matching, kept current on save
+    region = models.CharField(max_length=20, blank=True, db_index=True, editable=False)
     
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='open')
     created_at = models.DateTimeField(auto_now_add=True)
@@ -129,9 +182,48 @@ class Job(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Bounding-box prefilter for nearby open jobs
+            models.Index(fields=['status', 'latitude', 'longitude'], name='job_status_latlon_idx'),
+        ]
     
     def __str__(self):
         return f"{self.title} - {self.get_category_display()} - {self.wage_per_day}₹/day"
+    
+    def save(self, *args, **kwargs):
+        self.region = region_for(self.latitude, self.longitude) or ''
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and ({'latitude', 'longitude'} & set(update_fields)):
+            kwargs['update_fields'] = set(update_fields) | {'region'}
+        super().save(*args, **kwargs)
+
+# Reverse coverage index: grid cells reached by an open job's search radius
+class JobCoverageCell(models.Model):
+    job = models.ForeignKey(Job, on_delete=models.CASCADE, related_name='coverage_cells')
+    cell = models.CharField(max_length=20, db_index=True)
+    
+    class Meta:
+        unique_together = ['job', 'cell']
+    
+    def __str__(self):
+        return f"Job {self.job_id} covers cell {self.cell}"
+
+# Persisted labour <-> open job match (labour within the job's radius), kept current by signals
+class JobMatch(models.Model):
+    job = models.ForeignKey(Job, on_delete=models.CASCADE, related_name='matches')
+    labour = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='job_matches')
+    distance_km = models.FloatField()
+    labour_available = models.BooleanField(default=True)  # Copy of labour.is_available for counts
+    
+    class Meta:
+        unique_together = ['job', 'labour']
+        indexes = [
+            models.Index(fields=['labour', 'distance_km'], name='jobmatch_labour_dist_idx'),
+            models.Index(fields=['job', 'labour_available'], name='jobmatch_job_avail_idx'),
+        ]
+    
+    def __str__(self):
+        return f"Labour {self.labour_id} matches job {self.job_id} ({self.distance_km:.1f} km)"
 
 # Job application model for labours to apply for jobs
 class JobApplication(models.Model):
@@ -280,4 +372,40 @@ class Notification(models.Model):
         ordering = ['-created_at']
 
     def __str__(self):
-        return f"Notification for {self.user.email}: {self.title}"
\ No newline at end of file
+        return f"Notification for {self.user.email}: {self.title}"
+
+# Landmarks (mandis, warehouses, markets) used by the Spatial Landmark Model for route optimization
+class Landmark(UnitVectorModel):
+    LOCATION_TYPES = [
+        ('mandi', 'Mandi'),
+        ('warehouse', 'Warehouse'),
+        ('market', 'Market'),
+    ]
+
+    name = models.CharField(max_length=200)
+    location_type = models.CharField(max_length=20, choices=LOCATION_TYPES)
+    latitude = models.DecimalField(max_digits=9, decimal_places=6)
+    longitude = models.DecimalField(max_digits=9, decimal_places=6)
+    address = models.CharField(max_length=300, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['name']
+
+    def __str__(self):
+        return f"{self.name} ({self.get_location_type_display()})"
+
+# Pre-computed distance between two landmarks (edges of the landmark network)
+class LandmarkDistance(models.Model):
+    from_landmark = models.ForeignKey(Landmark, on_delete=models.CASCADE, related_name='distances_from')
+    to_landmark = models.ForeignKey(Landmark, on_delete=models.CASCADE, related_name='distances_to')
+    distance_km = models.DecimalField(max_digits=10, decimal_places=2)
+    travel_time_min = models.PositiveIntegerField(help_text='Estimated travel time in minutes')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ['from_landmark', 'to_landmark']
+        ordering = ['from_landmark', 'to_landmark']
+
+    def __str__(self):
+        return f"{self.from_landmark.name} → {self.to_landmark.name}: {self.distance_km} km"
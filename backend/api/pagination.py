@@ -0,0 +1,54 @@
+"""
+Keyset (cursor) pagination for distance-ordered results.
+
+Rows are ordered by (distance_km, id); the cursor is the position of the last
+row of a page, so the next page is a `WHERE (distance_km, id) > cursor` query
+that stays stable while rows are added or removed, and only one page is ever
+fetched and serialized.
+"""
+import base64
+import binascii
+
+from django.db.models import Q
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+def encode_cursor(distance_km: float, pk: int) -> str:
+    raw = f"{distance_km!r}|{pk}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str):
+    """(distance_km, id) from a cursor string; raises ValueError if it is malformed."""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        distance, pk = base64.urlsafe_b64decode(padded.encode()).decode().split('|')
+        return float(distance), int(pk)
+    except (binascii.Error, UnicodeDecodeError, ValueError) as e:
+        raise ValueError('Invalid cursor') from e
+
+
+def parse_page_size(value) -> int:
+    """Page size from a query parameter, clamped to [1, MAX_PAGE_SIZE]."""
+    if value in (None, ''):
+        return DEFAULT_PAGE_SIZE
+    return max(1, min(int(value), MAX_PAGE_SIZE))
+
+
+def paginate_by_distance(queryset, cursor=None, page_size=DEFAULT_PAGE_SIZE):
+    """
+    One page of a queryset annotated with distance_km, ordered by (distance_km, id).
+    Returns (rows, next_cursor); next_cursor is None on the last page.
+    """
+    queryset = queryset.order_by('distance_km', 'id')
+    if cursor:
+        distance, pk = decode_cursor(cursor)
+        queryset = queryset.filter(Q(distance_km__gt=distance) | Q(distance_km=distance, id__gt=pk))
+    rows = list(queryset[:page_size + 1])
+    if len(rows) <= page_size:
+        return rows, None
+    rows = rows[:page_size]
+    last = rows[-1]
+    return rows, encode_cursor(last.distance_km, last.id)
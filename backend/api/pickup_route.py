@@ -0,0 +1,176 @@
+"""
+Krishiment pickup routes: one vehicle collects several labours and ends at the farm.
+
+The road cost between every two points (optional vehicle start, each pickup,
+the farm) comes from routing_service.compute_route_matrix(), routed for the
+vehicle's routing profile. The order minimises that profile's travel minutes
+by default, or the distance (PICKUP_METRICS). It is an open path with fixed
+ends, solved heuristically:
+
+- Nearest neighbour: from the start (or from each pickup in turn when there is
+  no start) always drive to the closest unvisited pickup.
+- 2-opt: reverse a run of stops when that shortens the path.
+- Or-opt: move a run of 1-3 stops (optionally reversed) to another place.
+
+Improvement passes repeat until none helps or the time budget runs out; the
+best order found so far is always returned.
+"""
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from .routing_profiles import RoutingProfile
+from .routing_service import compute_route_matrix
+
+# Wall-clock limit for 2-opt/Or-opt improvement
+PICKUP_TIME_BUDGET_S = 0.2
+
+# Longest run of stops Or-opt moves at once
+OR_OPT_MAX_RUN = 3
+
+# Route matrix entries a pickup order can minimise
+PICKUP_METRICS = ('time_min', 'distance_km')
+
+
+def path_cost(cost: Sequence[Sequence[float]], order: List[int], first: Optional[int], last: int) -> float:
+    nodes = ([first] if first is not None else []) + order + [last]
+    return sum(cost[a][b] for a, b in zip(nodes, nodes[1:]))
+
+
+def nearest_neighbour_order(cost: Sequence[Sequence[float]], stops: List[int], first: Optional[int]) -> List[int]:
+    """Greedy order from first; with no first, every stop is tried as the start."""
+    def greedy(start: int, remaining: List[int]) -> List[int]:
+        order = []
+        cur = start
+        remaining = list(remaining)
+        while remaining:
+            nxt = min(remaining, key=lambda s: cost[cur][s])
+            remaining.remove(nxt)
+            order.append(nxt)
+            cur = nxt
+        return order
+
+    if first is not None:
+        return greedy(first, stops)
+    candidates = [[s] + greedy(s, [r for r in stops if r != s]) for s in stops]
+    # Compare open paths without their (shared) end
+    return min(candidates, key=lambda order: sum(cost[a][b] for a, b in zip(order, order[1:])))
+
+
+def solve_pickup_order(
+    cost: Sequence[Sequence[float]],
+    stops: List[int],
+    first: Optional[int],
+    last: int,
+    time_budget_s: float = PICKUP_TIME_BUDGET_S,
+) -> Tuple[List[int], Dict[str, Any]]:
+    """
+    Order of stops (indexes into cost) for the path first -> stops -> last,
+    first None meaning the path starts at whichever stop is best.
+    Returns (order, stats) with the nearest-neighbour cost, final cost,
+    improving moves, and whether the time budget cut the search short.
+    """
+    deadline = time.perf_counter() + time_budget_s
+    order = nearest_neighbour_order(cost, stops, first)
+    best = path_cost(cost, order, first, last)
+    stats = {'initial_cost': best, 'moves': 0, 'timed_out': False}
+
+    improved = True
+    while improved:
+        improved = False
+        for candidate in _neighbourhood(order):
+            if time.perf_counter() > deadline:
+                stats['timed_out'] = True
+                break
+            candidate_cost = path_cost(cost, candidate, first, last)
+            if candidate_cost < best - 1e-9:
+                order, best = candidate, candidate_cost
+                stats['moves'] += 1
+                improved = True
+                break
+        if stats['timed_out']:
+            break
+    stats['cost'] = best
+    return order, stats
+
+
+def _neighbourhood(order: List[int]):
+    """2-opt reversals, then Or-opt moves of runs of 1..OR_OPT_MAX_RUN stops."""
+    n = len(order)
+    for i in range(n - 1):
+        for j in range(i + 1, n):
+            yield order[:i] + order[i:j + 1][::-1] + order[j + 1:]
+    for run in range(1, min(OR_OPT_MAX_RUN, n - 1) + 1):
+        for i in range(n - run + 1):
+            segment = order[i:i + run]
+            rest = order[:i] + order[i + run:]
+            for k in range(len(rest) + 1):
+                if k == i:
+                    continue
+                yield rest[:k] + segment + rest[k:]
+                if run > 1:
+                    yield rest[:k] + segment[::-1] + rest[k:]
+
+
+def plan_pickup_route(
+    farm: Dict[str, Any],
+    pickups: List[Dict[str, Any]],
+    labour_nodes: List[Dict[str, Any]],
+    landmark_graph,
+    start: Optional[Dict[str, Any]] = None,
+    time_budget_s: float = PICKUP_TIME_BUDGET_S,
+    profile: Optional[RoutingProfile] = None,
+    metric: str = 'time_min',
+) -> Dict[str, Any]:
+    """
+    Pickup route ending at farm. farm, pickups and start are {lat, lon, label}.
+    Legs are routed for profile (RoutingProfile, default if None) and the order
+    minimises metric, one of PICKUP_METRICS.
+    Returns the pickup indexes in visiting order with each leg's distance and
+    time, the concatenated waypoints, totals and optimizer stats.
+    """
+    if metric not in PICKUP_METRICS:
+        raise ValueError(f"metric must be one of: {', '.join(PICKUP_METRICS)}")
+    points = ([start] if start else []) + pickups + [farm]
+    first = 0 if start else None
+    offset = 1 if start else 0
+    last = len(points) - 1
+    matrix = compute_route_matrix(
+        points, points, labour_nodes, landmark_graph, include_routes=True, profile=profile,
+    )
+
+    started = time.perf_counter()
+    order, stats = solve_pickup_order(
+        matrix[metric], list(range(offset, offset + len(pickups))), first, last, time_budget_s,
+    )
+    solve_ms = (time.perf_counter() - started) * 1000
+
+    nodes = ([first] if first is not None else []) + order + [last]
+    waypoints = []
+    legs = []
+    for a, b in zip(nodes, nodes[1:]):
+        route = matrix['routes'][a][b]
+        # Each leg starts where the previous one ended
+        waypoints.extend(route if not waypoints else route[1:])
+        legs.append({'distance_km': matrix['distance_km'][a][b], 'time_min': matrix['time_min'][a][b]})
+    if not waypoints:
+        # Single pickup at the farm itself
+        waypoints = [{'lat': farm['lat'], 'lon': farm['lon'], 'label': farm.get('label', '')}]
+
+    # Leg i ends at stop i (the last leg ends at the farm); without a start the route begins at stop 0
+    arrivals = legs if start else [{'distance_km': 0.0, 'time_min': 0}] + legs
+    return {
+        'order': [i - offset for i in order],
+        'legs_to_stops': arrivals[:len(order)],
+        'leg_to_farm': arrivals[len(order)],
+        'waypoints': waypoints,
+        'total_distance_km': round(sum(leg['distance_km'] for leg in legs), 2),
+        'total_time_min': sum(leg['time_min'] for leg in legs),
+        'optimizer': {
+            'metric': metric,
+            # The nearest-neighbour order's total, in the metric's unit
+            'initial_cost': round(stats['initial_cost'], 2),
+            'moves': stats['moves'],
+            'timed_out': stats['timed_out'],
+            'solve_ms': round(solve_ms, 1),
+        },
+    }
@@ -0,0 +1,139 @@
+"""
+Krishiment route cache: results of compute_optimal_route() kept in the Django
+cache settings.ROUTE_CACHE_ALIAS, so repeated farm-to-mandi or farm-to-labour
+routes are served without recomputing them.
+
+- Keys hold the origin and destination rounded to a ROUTE_CACHE_GRID_DEG grid,
+  the destination label and the landmark graph version. A landmark change
+  publishes a new version (api.landmark_graph), so routes computed on older
+  landmark data are never read again and age out. The route view appends the
+  road network's version and the routing profile unless it is the default.
+- Labour versions: routes pass through nearby labours, so each region tile
+  has a version in this cache that signal handlers replace when a labour in
+  it is added, moved, renamed or removed (bump_labour_version()).
+- The alias is LocMemCache unless settings point it at Redis: entries expire
+  after TIMEOUT and the least recently used go beyond MAX_ENTRIES. LocMemCache
+  is per worker, so a labour change only reaches the worker that saved it;
+  deployments with several workers use Redis.
+- A failing cache backend never fails a request: the route is computed and
+  not stored.
+- Hits and misses are counted with the backend's atomic incr
+  (route_cache_stats(), also `manage.py route_cache_stats`); per worker with
+  LocMemCache.
+"""
+import copy
+import hashlib
+import logging
+import uuid
+from typing import Any, Callable, Dict, Iterable, Tuple
+
+from django.conf import settings
+from django.core.cache import caches
+
+KEY_PREFIX = 'route'
+HITS_KEY = 'route_cache:hits'
+MISSES_KEY = 'route_cache:misses'
+LABOUR_VERSION_PREFIX = 'route_labours'
+
+logger = logging.getLogger(__name__)
+
+
+def route_cache():
+    return caches[getattr(settings, 'ROUTE_CACHE_ALIAS', 'default')]
+
+
+def _cell(value: float, grid: float) -> int:
+    return round(value / grid)
+
+
+def route_cache_key(origin_lat: float, origin_lon: float, dest_lat: float, dest_lon: float,
+                    label: str, version: str) -> str:
+    grid = getattr(settings, 'ROUTE_CACHE_GRID_DEG', 0.001)
+    cells = (_cell(origin_lat, grid), _cell(origin_lon, grid), _cell(dest_lat, grid), _cell(dest_lon, grid))
+    # Labels are free text: hash them so keys stay short and memcached-safe
+    label_hash = hashlib.sha1(label.encode()).hexdigest()[:12]
+    return f"{KEY_PREFIX}:{version}:{grid}:{':'.join(map(str, cells))}:{label_hash}"
+
+
+def labour_version(regions: Iterable[str]) -> str:
+    """Short token that changes whenever the labours in any of these region tiles change."""
+    cache = route_cache()
+    keys = [f"{LABOUR_VERSION_PREFIX}:{region}" for region in sorted(set(regions))]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            # Never set (or evicted): a fresh version, so no route cached before can match it
+            cache.add(key, uuid.uuid4().hex, timeout=None)
+            versions[key] = cache.get(key)
+    token = ':'.join(str(versions[key]) for key in keys)
+    return hashlib.sha1(token.encode()).hexdigest()[:12]
+
+
+def bump_labour_version(regions: Iterable[str]) -> None:
+    """Stop serving routes cached with the labours these region tiles had until now."""
+    route_cache().set_many(
+        {f"{LABOUR_VERSION_PREFIX}:{region}": uuid.uuid4().hex for region in set(regions) if region},
+        timeout=None,
+    )
+
+
+def _count(key: str) -> None:
+    cache = route_cache()
+    try:
+        try:
+            cache.incr(key)
+        except ValueError:
+            # First count (or evicted): add() so concurrent workers do not reset each other
+            if not cache.add(key, 1, timeout=None):
+                cache.incr(key)
+    except Exception as error:
+        logger.warning("Route cache count %s failed: %s", key, error)
+
+
+def cached_route(
+    origin_lat: float, origin_lon: float, dest_lat: float, dest_lon: float, label: str, version: str,
+    compute: Callable[[], Dict[str, Any]], regions: Iterable[str] = (),
+) -> Tuple[Dict[str, Any], bool]:
+    """
+    (route, hit): the cached route for this grid cell pair and the labours of
+    the given region tiles, or compute() stored under it. The first and last
+    waypoints are moved to the requested points.
+    """
+    cache = route_cache()
+    try:
+        if regions:
+            version = f"{version}:{labour_version(regions)}"
+        key = route_cache_key(origin_lat, origin_lon, dest_lat, dest_lon, label, version)
+        result = cache.get(key)
+    except Exception as error:
+        # Cache server down or misconfigured: serve the route uncached
+        logger.warning("Route cache unavailable, computing the route: %s", error)
+        return compute(), False
+    hit = result is not None
+    if hit:
+        _count(HITS_KEY)
+        result = copy.deepcopy(result)
+        waypoints = result.get('waypoints') or []
+        if len(waypoints) >= 2:
+            waypoints[0].update(lat=origin_lat, lon=origin_lon)
+            waypoints[-1].update(lat=dest_lat, lon=dest_lon)
+    else:
+        _count(MISSES_KEY)
+        result = compute()
+        try:
+            cache.set(key, result)
+        except Exception as error:
+            logger.warning("Route cache write failed: %s", error)
+    return result, hit
+
+
+def route_cache_stats() -> Dict[str, Any]:
+    cache = route_cache()
+    hits = cache.get(HITS_KEY, 0)
+    misses = cache.get(MISSES_KEY, 0)
+    total = hits + misses
+    return {'hits': hits, 'misses': misses, 'hit_rate': round(hits / total, 3) if total else None}
+
+
+def reset_route_cache_stats() -> None:
+    route_cache().delete_many([HITS_KEY, MISSES_KEY])
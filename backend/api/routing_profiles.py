@@ -0,0 +1,121 @@
+"""
+Krishiment routing profiles: how a vehicle travels in a time window. A route
+(`route?profile=tractor_morning`) is costed for the vehicle that drives it.
+
+- Vehicle: top speed, speed on links that are not imported roads (local
+  links and the legs onto the road network), how many km of detour one hour
+  is worth, and road classes it may not use.
+- Time window: a travel-time multiplier on the main roads, e.g. mandi
+  arrivals in the early morning. Stored landmark distances count as main
+  roads (they join mandis and markets); local links do not.
+- Stored landmark distances keep their stored travel time (entered by hand,
+  or driven over the road network at up to 80 km/h by
+  generate_landmark_distances), scaled by the time window, but never faster
+  than the vehicle's top speed. They carry no road class, so excluded
+  classes do not apply to them.
+- Profiles never copy a graph. Each graph keeps its topology and stored
+  distance/time metrics once; a profile adds its own edge-weight (and
+  travel-time) array, computed on first use and kept with that graph
+  (LandmarkGraph.profile_csr(), RoadNetwork.with_profile()).
+
+The default profile reproduces edge_weight_km() and travel_time_min(), so
+routes without a profile are unchanged and keep using the precomputed
+landmark table and contraction hierarchy.
+"""
+import itertools
+from array import array
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from .csr_graph import CSRGraph
+
+INF = float("inf")
+
+# (name, top speed km/h or None for road speed limits, speed off the road network km/h,
+#  km-equivalent of one hour, road classes it may not use)
+VEHICLES = (
+    ("truck", None, 30.0, 0.5, ()),
+    ("tractor", 25.0, 20.0, 1.0, ("motorway", "trunk")),
+    ("bicycle", 15.0, 12.0, 2.0, ("motorway", "trunk")),
+)
+
+# (name, travel-time multiplier on main roads, road classes it applies to)
+TIME_WINDOWS = (
+    ("offpeak", 1.0, ()),
+    # Mandi arrivals, roughly 5-10 am
+    ("morning", 1.6, ("trunk", "primary", "secondary", "tertiary")),
+)
+
+DEFAULT_PROFILE = "truck_offpeak"
+
+
+class RoutingProfile:
+    """One vehicle in one time window; named "<vehicle>_<window>"."""
+
+    __slots__ = (
+        "name", "vehicle", "window", "max_speed_kmh", "local_speed_kmh", "time_factor",
+        "excluded_classes", "congestion", "congested_classes",
+    )
+
+    def __init__(self, vehicle: Tuple, window: Tuple):
+        self.vehicle, self.max_speed_kmh, self.local_speed_kmh, self.time_factor, excluded = vehicle
+        self.window, self.congestion, congested = window
+        self.name = f"{self.vehicle}_{self.window}"
+        self.excluded_classes = frozenset(excluded)
+        self.congested_classes = frozenset(congested)
+
+    def __repr__(self):
+        return f"RoutingProfile({self.name!r})"
+
+    @property
+    def is_default(self) -> bool:
+        return self.name == DEFAULT_PROFILE
+
+    def travel_minutes(self, distance_km: float) -> int:
+        """Minutes for a local link or road access leg (travel_time_min() at local speed)."""
+        return max(1, int(round((float(distance_km) / self.local_speed_kmh) * 60)))
+
+    def landmark_minutes(self, distance_km: float, stored_minutes: float) -> float:
+        """Minutes for a stored landmark distance: its stored time in this window, at most the top speed."""
+        minutes = stored_minutes * self.congestion
+        if self.max_speed_kmh is not None:
+            minutes = max(minutes, float(distance_km) / self.max_speed_kmh * 60.0)
+        return minutes
+
+    def edge_weight(self, distance_km: float, minutes: float) -> float:
+        """edge_weight_km() with this vehicle's value of time."""
+        return float(distance_km) + (minutes / 60.0) * self.time_factor
+
+    def road_minutes_per_km(self, speed_classes: Sequence[Tuple[str, float]]) -> List[float]:
+        """Minutes per km on each (name, speed) road class; INF where the vehicle may not drive."""
+        minutes = []
+        for name, speed in speed_classes:
+            if name in self.excluded_classes:
+                minutes.append(INF)
+                continue
+            if self.max_speed_kmh is not None:
+                speed = min(speed, self.max_speed_kmh)
+            minutes.append(60.0 / speed * (self.congestion if name in self.congested_classes else 1.0))
+        return minutes
+
+    def reweight(self, graph: CSRGraph) -> CSRGraph:
+        """
+        graph (built with_metrics from stored landmark distances) with this
+        profile's weights and minutes; its node and edge arrays are shared.
+        """
+        minutes = array("d", map(self.landmark_minutes, graph.lengths, graph.minutes))
+        weights = array("d", map(self.edge_weight, graph.lengths, minutes))
+        return graph.with_weights(weights, minutes)
+
+
+PROFILES: Dict[str, RoutingProfile] = {
+    profile.name: profile
+    for profile in (RoutingProfile(vehicle, window) for vehicle, window in itertools.product(VEHICLES, TIME_WINDOWS))
+}
+
+
+def get_profile(name: Optional[str] = None) -> RoutingProfile:
+    """Profile by name (the default for None or ""); ValueError for unknown names."""
+    profile = PROFILES.get(name or DEFAULT_PROFILE)
+    if profile is None:
+        raise ValueError(f"Unknown routing profile: {name}")
+    return profile
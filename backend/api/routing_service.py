@@ -3,28 +3,32 @@ Krishiment Route Optimization: Dijkstra (local) + Spatial Landmark Model (SLM) f
 
 - Road network: weighted graph with nodes (farms, labour, mandis, warehouses, markets)
   and edges (distance + travel time).
-- Dijkstra's Algorithm: shortest path for local routing.
+- Dijkstra's Algorithm: shortest path for local routing (bidirectional by default).
 - SLM: landmark-based routing for cross-region trips using pre-computed landmark distances.
+- ALT: A* over the landmark graph, guided by triangle-inequality lower bounds from
+  a few far-apart anchor landmarks.
+- Contraction hierarchy: precomputed shortcuts (api.contraction_hierarchy) answer
+  landmark-to-landmark queries by settling only a few nodes; used by SLM when built.
+- All-pairs table: memory-mapped costs and next hops between every two landmarks
+  (api.landmark_table); preferred by SLM when built for the current landmarks.
+- Road network: when an imported road graph is present (api.road_network),
+  routes follow real roads between the road nodes nearest to each endpoint;
+  the graphs above remain the fallback for points off the network.
+- Route totals are summed from the distance and travel time each edge was
+  weighted with (stored LandmarkDistance values for landmark hops), not
+  re-estimated from straight lines once the path is known.
+- Routing profiles (api.routing_profiles): a vehicle and time window swap in
+  their own edge weights and travel times over the same graphs.
 """
-import math
 import heapq
-from decimal import Decimal
+import itertools
+from array import array
 from typing import List, Tuple, Optional, Dict, Any
 
-
-def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
-    """Distance between two points in km (Haversine)."""
-    R = 6371
-    lat1_rad = math.radians(float(lat1))
-    lat2_rad = math.radians(float(lat2))
-    dlat = math.radians(float(lat2) - float(lat1))
-    dlon = math.radians(float(lon2) - float(lon1))
-    a = (
-        math.sin(dlat / 2) ** 2
-        + math.cos(lat1_rad) * math.cos(lat2_rad) * math.sin(dlon / 2) ** 2
-    )
-    c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
-    return R * c
+from .csr_graph import CSRGraph
+from .geometry import haversine_km, haversine_many
+from .routing_profiles import RoutingProfile, get_profile
+from .spatial_index import pairs_within_radius
 
 
 def travel_time_min(distance_km: float, avg_speed_kmh: float = 30.0) -> int:
@@ -44,46 +48,328 @@ def edge_weight_km(distance_km: float, travel_time_minutes: Optional[int] = None
     return float(distance_km) + (travel_time_minutes / 60.0) * time_factor
 
 
-# --- Graph representation (node_id -> list of (neighbor_id, weight))
-# Node id: string like "origin", "dest", "labour_<id>", "landmark_<id>"
+# --- Graph representation: CSRGraph (api.csr_graph) with integer nodes; node ids
+# at the API boundary are strings like "origin", "dest", "labour_<id>", "landmark_<id>"
+
+INF = float("inf")
 
 
 def dijkstra(
-    graph: Dict[str, List[Tuple[str, float]]],
+    graph: CSRGraph,
     start: str,
     end: str,
+    stats: Optional[Dict[str, int]] = None,
 ) -> Tuple[List[str], float]:
     """
     Dijkstra's Algorithm: returns (path as list of node ids, total cost) or ([], inf) if no path.
+    stats, if given, receives the number of settled nodes under "settled".
     """
-    if start not in graph or end not in graph:
-        return [], float("inf")
-    dist = {n: float("inf") for n in graph}
-    dist[start] = 0.0
-    prev = {n: None for n in graph}
-    # min-heap: (cost, node_id)
-    heap = [(0.0, start)]
+    if start not in graph.index or end not in graph.index:
+        return [], INF
+    s, t = graph.index[start], graph.index[end]
+    offsets, targets, weights = graph.offsets, graph.targets, graph.weights
+    dist = [INF] * len(graph)
+    prev = [-1] * len(graph)
+    dist[s] = 0.0
+    settled = 0
+    # min-heap: (cost, node)
+    heap = [(0.0, s)]
     while heap:
         d, u = heapq.heappop(heap)
         if d > dist[u]:
             continue
-        if u == end:
+        settled += 1
+        if u == t:
             break
-        for v, w in graph.get(u, []):
-            alt = dist[u] + w
+        for k in range(offsets[u], offsets[u + 1]):
+            v = targets[k]
+            alt = d + weights[k]
+            if alt < dist[v]:
+                dist[v] = alt
+                prev[v] = u
+                heapq.heappush(heap, (alt, v))
+    if stats is not None:
+        stats["settled"] = settled
+    if dist[t] == INF:
+        return [], INF
+    return _trace_path(graph, prev, t), dist[t]
+
+
+def bidirectional_dijkstra(
+    graph: CSRGraph,
+    start: str,
+    end: str,
+    stats: Optional[Dict[str, int]] = None,
+) -> Tuple[List[str], float]:
+    """
+    Dijkstra from both ends at once: a forward search from start on the graph
+    and a backward search from end on its reverse, always advancing the side
+    with the smaller queue head. mu is the best start-end cost seen through an
+    edge joining the two searches; once the two queue heads add up to at least
+    mu no shorter path can exist, so the search stops. Each side explores
+    about a disc of radius d/2 instead of one disc of radius d.
+    Same result and stats as dijkstra().
+    """
+    if start not in graph.index or end not in graph.index:
+        return [], INF
+    s, t = graph.index[start], graph.index[end]
+    n = len(graph)
+    backward_graph = graph.reverse()
+    # Per direction: graph, dist, prev, heap, settled flags
+    sides = (
+        (graph, [INF] * n, [-1] * n, [(0.0, s)], bytearray(n)),
+        (backward_graph, [INF] * n, [-1] * n, [(0.0, t)], bytearray(n)),
+    )
+    sides[0][1][s] = 0.0
+    sides[1][1][t] = 0.0
+    mu = 0.0 if s == t else INF
+    meet = s if s == t else -1
+    settled = 0
+    forward_heap, backward_heap = sides[0][3], sides[1][3]
+    while forward_heap and backward_heap:
+        if forward_heap[0][0] + backward_heap[0][0] >= mu:
+            break
+        side = 0 if forward_heap[0][0] <= backward_heap[0][0] else 1
+        g, dist, prev, heap, done = sides[side]
+        other_dist = sides[1 - side][1]
+        d, u = heapq.heappop(heap)
+        if done[u] or d > dist[u]:
+            continue
+        done[u] = 1
+        settled += 1
+        offsets, targets, weights = g.offsets, g.targets, g.weights
+        for k in range(offsets[u], offsets[u + 1]):
+            v = targets[k]
+            alt = d + weights[k]
             if alt < dist[v]:
                 dist[v] = alt
                 prev[v] = u
                 heapq.heappush(heap, (alt, v))
-    if dist[end] == float("inf"):
-        return [], float("inf")
+            through = alt + other_dist[v]
+            if through < mu:
+                mu = through
+                meet = v
+    if stats is not None:
+        stats["settled"] = settled
+    if mu == INF:
+        return [], INF
+    # start .. meet from the forward tree, meet .. end from the backward tree
+    path = _trace_path(graph, sides[0][2], meet)
+    cur = sides[1][2][meet]
+    while cur != -1:
+        path.append(graph.node_ids[cur])
+        cur = sides[1][2][cur]
+    return path, mu
+
+
+# Point-to-point search used for local routes: "bidirectional" or "dijkstra"
+POINT_TO_POINT_SEARCH = "bidirectional"
+
+POINT_TO_POINT_SEARCHES = {
+    "dijkstra": dijkstra,
+    "bidirectional": bidirectional_dijkstra,
+}
+
+
+def shortest_path(
+    graph: CSRGraph,
+    start: str,
+    end: str,
+    algorithm: Optional[str] = None,
+    stats: Optional[Dict[str, int]] = None,
+) -> Tuple[List[str], float]:
+    """Point-to-point search with the given algorithm (default POINT_TO_POINT_SEARCH)."""
+    search = POINT_TO_POINT_SEARCHES[algorithm or POINT_TO_POINT_SEARCH]
+    return search(graph, start, end, stats)
+
+
+def _trace_path(graph: CSRGraph, prev: List[int], end: int) -> List[str]:
     path = []
     cur = end
-    while cur is not None:
-        path.append(cur)
+    while cur != -1:
+        path.append(graph.node_ids[cur])
         cur = prev[cur]
     path.reverse()
-    return path, dist[end]
+    return path
+
+
+def shortest_path_tree(
+    graph: CSRGraph,
+    start: str,
+    targets: List[str],
+    stats: Optional[Dict[str, int]] = None,
+) -> Tuple[List[float], List[int]]:
+    """
+    One-to-many Dijkstra: a single search from start that stops once every
+    target is settled. Returns (dist, prev) over node indexes; read paths
+    with _trace_path(graph, prev, graph.index[target]).
+    """
+    n = len(graph)
+    dist = [INF] * n
+    prev = [-1] * n
+    if start not in graph.index:
+        return dist, prev
+    s = graph.index[start]
+    remaining = {graph.index[t] for t in targets if t in graph.index}
+    offsets, targets_, weights = graph.offsets, graph.targets, graph.weights
+    dist[s] = 0.0
+    settled = 0
+    heap = [(0.0, s)]
+    while heap and remaining:
+        d, u = heapq.heappop(heap)
+        if d > dist[u]:
+            continue
+        settled += 1
+        remaining.discard(u)
+        for k in range(offsets[u], offsets[u + 1]):
+            v = targets_[k]
+            alt = d + weights[k]
+            if alt < dist[v]:
+                dist[v] = alt
+                prev[v] = u
+                heapq.heappush(heap, (alt, v))
+    if stats is not None:
+        stats["settled"] = settled
+    return dist, prev
+
+
+def distances_within(graph: CSRGraph, source: int, limit: float) -> Dict[int, float]:
+    """Bounded Dijkstra: {node: cost} for every node whose cost from source is at most limit."""
+    offsets, targets, weights = graph.offsets, graph.targets, graph.weights
+    dist = {source: 0.0}
+    settled = {}
+    heap = [(0.0, source)]
+    while heap:
+        d, u = heapq.heappop(heap)
+        if d > limit:
+            break
+        if u in settled:
+            continue
+        settled[u] = d
+        for k in range(offsets[u], offsets[u + 1]):
+            v = targets[k]
+            alt = d + weights[k]
+            if alt <= limit and alt < dist.get(v, INF):
+                dist[v] = alt
+                heapq.heappush(heap, (alt, v))
+    return settled
+
+
+# --- ALT: A* with landmark (anchor) lower bounds
+# For any anchor a, the triangle inequality gives d(v, t) >= |d(a, t) - d(a, v)|,
+# so the maximum over a few anchors is an admissible, consistent A* heuristic on
+# an undirected graph. Anchors are graph nodes, picked far apart so their
+# bounds are tight in every direction.
+
+# Number of anchors whose distances are precomputed per landmark graph
+ALT_ANCHOR_COUNT = 8
+
+
+def shortest_distances(graph: CSRGraph, source: int) -> array:
+    """Single-source Dijkstra: cost from node source to every node (inf if unreachable)."""
+    offsets, targets, weights = graph.offsets, graph.targets, graph.weights
+    dist = [INF] * len(graph)
+    dist[source] = 0.0
+    heap = [(0.0, source)]
+    while heap:
+        d, u = heapq.heappop(heap)
+        if d > dist[u]:
+            continue
+        for k in range(offsets[u], offsets[u + 1]):
+            v = targets[k]
+            alt = d + weights[k]
+            if alt < dist[v]:
+                dist[v] = alt
+                heapq.heappush(heap, (alt, v))
+    return array("d", dist)
+
+
+def select_anchors(graph: CSRGraph, count: int = ALT_ANCHOR_COUNT) -> Dict[int, array]:
+    """
+    Farthest-point anchor selection: start from the node farthest from an
+    arbitrary node, then repeatedly add the node farthest from all anchors so
+    far. Returns {anchor_node: shortest_distances(graph, anchor_node)}.
+    Every connected component gets its own anchors once the larger ones are covered.
+    """
+    n = len(graph)
+    if not n:
+        return {}
+    anchors = {}
+    # Minimum distance to any anchor so far (inf = not reached by any anchor yet)
+    closest = [INF] * n
+    seed = shortest_distances(graph, 0)
+    candidate = max((u for u in range(n) if seed[u] < INF), key=seed.__getitem__)
+    while len(anchors) < min(count, n):
+        dist = shortest_distances(graph, candidate)
+        anchors[candidate] = dist
+        for u in range(n):
+            if dist[u] < closest[u]:
+                closest[u] = dist[u]
+        # Unreached nodes (other components) come first, then the farthest node
+        remaining = [u for u in range(n) if u not in anchors]
+        if not remaining:
+            break
+        candidate = max(remaining, key=closest.__getitem__)
+    return anchors
+
+
+def alt_search(
+    graph: CSRGraph,
+    start: str,
+    end: str,
+    anchors: Dict[int, array],
+    stats: Optional[Dict[str, int]] = None,
+) -> Tuple[List[str], float]:
+    """
+    A* with ALT lower bounds; same result as dijkstra() but settles fewer nodes.
+    anchors: select_anchors(graph) (or a subset of it). Optimal as long as the
+    anchor distances were computed on this graph's weights.
+    """
+    if start not in graph.index or end not in graph.index:
+        return [], INF
+    s, t = graph.index[start], graph.index[end]
+    offsets, targets, weights = graph.offsets, graph.targets, graph.weights
+    # Anchors that reach the target; the others give no bound
+    bounds = [(dist, dist[t]) for dist in anchors.values() if dist[t] < INF]
+
+    def lower_bound(v: int) -> float:
+        # max over anchors of |d(a, t) - d(a, v)|
+        best = 0.0
+        for dist, dt in bounds:
+            diff = dt - dist[v]
+            if diff < 0:
+                diff = -diff
+            if diff > best:
+                best = diff
+        return best
+
+    dist = [INF] * len(graph)
+    prev = [-1] * len(graph)
+    closed = bytearray(len(graph))
+    settled = 0
+    dist[s] = 0.0
+    heap = [(lower_bound(s), s)]
+    while heap:
+        _, u = heapq.heappop(heap)
+        if closed[u]:
+            continue
+        closed[u] = 1
+        settled += 1
+        if u == t:
+            break
+        du = dist[u]
+        for k in range(offsets[u], offsets[u + 1]):
+            v = targets[k]
+            alt = du + weights[k]
+            if alt < dist[v]:
+                dist[v] = alt
+                prev[v] = u
+                heapq.heappush(heap, (alt + lower_bound(v), v))
+    if stats is not None:
+        stats["settled"] = settled
+    if dist[t] == INF:
+        return [], INF
+    return _trace_path(graph, prev, t), dist[t]
 
 
 def build_local_graph(
@@ -92,126 +378,168 @@ def build_local_graph(
     dest_lat: float,
     dest_lon: float,
     labour_nodes: List[Dict[str, Any]],
-    landmark_nodes: List[Dict[str, Any]],
-    landmark_distances: Dict[Tuple[str, str], Tuple[float, int]],
+    landmark_graph,
     connect_radius_km: float = 80.0,
-) -> Tuple[Dict[str, List[Tuple[str, float]]], Dict[str, Dict[str, Any]]]:
+    max_neighbours: Optional[int] = None,
+    profile: Optional[RoutingProfile] = None,
+) -> Tuple[CSRGraph, Dict[str, Dict[str, Any]]]:
     """
     Build weighted graph for local + landmark routing.
     labour_nodes: [{"id": "labour_1", "lat": ..., "lon": ..., "label": ...}, ...]
-    landmark_nodes: [{"id": "landmark_1", "lat": ..., "lon": ..., "label": ...}, ...]
-    landmark_distances: {(from_id, to_id): (distance_km, travel_time_min)}
+    landmark_graph: shared LandmarkGraph (api.landmark_graph); its nodes and
+    landmark-to-landmark edges are copied in rather than rebuilt.
+    Nodes within connect_radius_km are linked directly; max_neighbours, if set,
+    keeps only each node's k nearest links (a sparser, approximate graph).
+    profile: routing profile the edges are weighted for (default profile if None).
     Returns (graph, node_info) where node_info[id] = {lat, lon, label, type}.
     """
-    graph = {}
-    node_info = {}
+    endpoints = [
+        ("origin", origin_lat, origin_lon, "Your location", "origin"),
+        ("dest", dest_lat, dest_lon, "Destination", "destination"),
+    ]
+    return build_route_graph(endpoints, labour_nodes, landmark_graph, connect_radius_km, max_neighbours, profile)
+
+
+def build_route_graph(
+    endpoints: List[Tuple[str, float, float, str, str]],
+    labour_nodes: List[Dict[str, Any]],
+    landmark_graph,
+    connect_radius_km: float = 80.0,
+    max_neighbours: Optional[int] = None,
+    profile: Optional[RoutingProfile] = None,
+) -> Tuple[CSRGraph, Dict[str, Dict[str, Any]]]:
+    """
+    build_local_graph() for any number of endpoints, given as
+    (node_id, lat, lon, label, type); batch requests put every origin and
+    destination in one graph.
+    """
+    profile = profile or get_profile()
+    # Landmarks keep their landmark-graph numbering, so its edges copy over as is
+    node_ids = list(landmark_graph.node_ids)
+    index = dict(landmark_graph.csr.index)
+    lats = list(landmark_graph.lats)
+    lons = list(landmark_graph.lons)
+    node_info = dict(landmark_graph.nodes)
 
     def add_node(nid: str, lat: float, lon: float, label: str, ntype: str):
         node_info[nid] = {"lat": lat, "lon": lon, "label": label, "type": ntype}
-        if nid not in graph:
-            graph[nid] = []
+        if nid not in index:
+            index[nid] = len(node_ids)
+            node_ids.append(nid)
+            lats.append(lat)
+            lons.append(lon)
 
-    def add_edge(a: str, b: str, weight: float):
-        if a not in graph:
-            graph[a] = []
-        graph[a].append((b, weight))
-
-    add_node("origin", origin_lat, origin_lon, "Your location", "origin")
-    add_node("dest", dest_lat, dest_lon, "Destination", "destination")
+    for endpoint in endpoints:
+        add_node(*endpoint)
 
     for n in labour_nodes:
         nid = n["id"]
         add_node(nid, n["lat"], n["lon"], n.get("label", nid), "labour")
-    for n in landmark_nodes:
-        nid = n["id"]
-        add_node(nid, n["lat"], n["lon"], n.get("label", nid), "landmark")
-
-    # All nodes list for local edges (origin, dest, labours, landmarks)
-    all_local = [("origin", origin_lat, origin_lon), ("dest", dest_lat, dest_lon)]
-    for n in labour_nodes:
-        all_local.append((n["id"], n["lat"], n["lon"]))
-    for n in landmark_nodes:
-        all_local.append((n["id"], n["lat"], n["lon"]))
-
-    # Local edges: connect nodes within connect_radius_km (Haversine)
-    for i, (uid, ulat, ulon) in enumerate(all_local):
-        for j, (vid, vlat, vlon) in enumerate(all_local):
-            if i >= j:
-                continue
-            d = haversine_km(ulat, ulon, vlat, vlon)
-            if d <= connect_radius_km:
-                t = travel_time_min(d)
-                w = edge_weight_km(d, t)
-                add_edge(uid, vid, w)
-                add_edge(vid, uid, w)
-
-    # Landmark-to-landmark edges from precomputed table (directed; add both directions)
-    for (fid, tid), (d_km, t_min) in landmark_distances.items():
-        if fid in graph and tid in graph:
-            w = edge_weight_km(d_km, t_min)
-            add_edge(fid, tid, w)
-            add_edge(tid, fid, w)
 
+    # Local edges: connect nodes within connect_radius_km, found through grid buckets
+    # so construction stays near-linear in the number of nodes
+    local_edges = (
+        _local_edge(i, j, d, profile)
+        for i, j, d in pairs_within_radius(lats, lons, connect_radius_km, max_neighbours)
+    )
+    graph = CSRGraph.from_edges(
+        node_ids,
+        itertools.chain(
+            landmark_graph.profile_csr(profile).edges_with_metrics(),
+            _both_directions(local_edges),
+        ),
+        symmetric=True,
+        with_metrics=True,
+    )
     return graph, node_info
 
 
+def _local_edge(i: int, j: int, distance_km: float, profile: RoutingProfile) -> Tuple[int, int, float, float, int]:
+    minutes = profile.travel_minutes(distance_km)
+    return i, j, profile.edge_weight(distance_km, minutes), distance_km, minutes
+
+
+def _both_directions(edges):
+    for u, v, *metrics in edges:
+        yield (u, v, *metrics)
+        yield (v, u, *metrics)
+
+
+# (distance_km, travel_time_min) of one hop of a path
+Leg = Tuple[float, float]
+
+
+def path_legs(graph: CSRGraph, path: List[str]) -> List[Optional[Leg]]:
+    """Stored metrics of each hop of a path through graph (None where the graph has none)."""
+    index = graph.index
+    return [graph.edge_metrics(index[a], index[b]) for a, b in zip(path, path[1:])]
+
+
 def route_via_slm(
     origin_lat: float,
     origin_lon: float,
     dest_lat: float,
     dest_lon: float,
-    landmark_nodes: List[Dict[str, Any]],
-    landmark_distances: Dict[Tuple[str, str], Tuple[float, int]],
-    node_info: Dict[str, Dict[str, Any]],
-) -> Tuple[List[str], float, str]:
+    landmark_graph,
+    profile: Optional[RoutingProfile] = None,
+) -> Tuple[List[str], float, str, List[Optional[Leg]]]:
     """
     Compute path from origin to destination via nearest landmarks (SLM).
-    Returns (path_node_ids, total_cost, "slm").
+    Returns (path_node_ids, total_cost, "slm", legs): legs are the metrics of
+    each hop, the stored LandmarkDistance between landmarks (scaled for profile).
     """
-    if not landmark_nodes:
-        return [], float("inf"), "slm"
-
-    # Build landmark-only graph
-    lm_graph = {n["id"]: [] for n in landmark_nodes}
-    for (fid, tid), (d_km, t_min) in landmark_distances.items():
-        if fid in lm_graph and tid in lm_graph:
-            w = edge_weight_km(d_km, t_min)
-            lm_graph[fid].append((tid, w))
-            lm_graph[tid].append((fid, w))
+    profile = profile or get_profile()
+    if not len(landmark_graph):
+        return [], float("inf"), "slm", []
 
     # Nearest landmark to origin and to destination
     def nearest_to(lat: float, lon: float):
-        best_id, best_d = None, float("inf")
-        for n in landmark_nodes:
-            d = haversine_km(lat, lon, n["lat"], n["lon"])
-            if d < best_d:
-                best_d, best_id = d, n["id"]
-        return best_id, best_d
+        dists = haversine_many(lat, lon, landmark_graph.lats, landmark_graph.lons)
+        best = min(range(len(landmark_graph)), key=dists.__getitem__)
+        return landmark_graph.node_ids[best], float(dists[best])
 
     lm_origin_id, d_orig_lm = nearest_to(origin_lat, origin_lon)
     lm_dest_id, d_dest_lm = nearest_to(dest_lat, dest_lon)
 
     if lm_origin_id is None or lm_dest_id is None:
-        return [], float("inf"), "slm"
-
-    # Path between landmarks
-    lm_path, lm_cost = dijkstra(lm_graph, lm_origin_id, lm_dest_id)
+        return [], float("inf"), "slm", []
+
+    # Path between landmarks: all-pairs table lookup or contraction hierarchy when
+    # one matches the current landmarks, else A* with ALT bounds. The table and
+    # hierarchy hold default-profile costs, so other profiles always search.
+    csr = landmark_graph.profile_csr(profile)
+    table = landmark_graph.table if profile.is_default else None
+    hierarchy = landmark_graph.hierarchy if profile.is_default and table is None else None
+    if table is not None:
+        lm_path, lm_cost = table.path(lm_origin_id, lm_dest_id)
+    elif hierarchy is not None:
+        lm_path, lm_cost = hierarchy.query(lm_origin_id, lm_dest_id)
+    else:
+        lm_path, lm_cost = alt_search(csr, lm_origin_id, lm_dest_id, landmark_graph.profile_anchors(profile))
     if not lm_path:
-        return [], float("inf"), "slm"
+        return [], float("inf"), "slm", []
 
     # Full path: origin -> lm_origin -> ... -> lm_dest -> dest
-    t_orig = travel_time_min(d_orig_lm)
-    t_dest = travel_time_min(d_dest_lm)
-    w_orig = edge_weight_km(d_orig_lm, t_orig)
-    w_dest = edge_weight_km(d_dest_lm, t_dest)
+    t_orig = profile.travel_minutes(d_orig_lm)
+    t_dest = profile.travel_minutes(d_dest_lm)
+    w_orig = profile.edge_weight(d_orig_lm, t_orig)
+    w_dest = profile.edge_weight(d_dest_lm, t_dest)
     total_cost = w_orig + lm_cost + w_dest
     path = ["origin"] + lm_path + ["dest"]
-    return path, total_cost, "slm"
+    legs = [(d_orig_lm, t_orig)] + path_legs(csr, lm_path) + [(d_dest_lm, t_dest)]
+    return path, total_cost, "slm", legs
 
 
 # Threshold (km) above which we use SLM for long-distance
 SLM_DISTANCE_THRESHOLD_KM = 50.0
 
+# Cap on local links per node in the route graph (None keeps every link within
+# the connect radius, i.e. exact shortest paths)
+LOCAL_MAX_NEIGHBOURS = None
+
+# Largest origins x destinations batch accepted by compute_route_matrix callers
+ROUTE_MATRIX_MAX_PAIRS = 2500
+
 
 def compute_optimal_route(
     origin_lat: float,
@@ -219,48 +547,35 @@ def compute_optimal_route(
     dest_lat: float,
     dest_lon: float,
     labour_nodes: List[Dict[str, Any]],
-    landmark_models,
-    landmark_distance_models,
+    landmark_graph,
+    profile: Optional[RoutingProfile] = None,
 ) -> Dict[str, Any]:
     """
     Compute optimal route using Dijkstra (local) or SLM (long-distance).
-    landmark_models: queryset or list of Landmark.
-    landmark_distance_models: queryset or list of LandmarkDistance.
+    landmark_graph: LandmarkGraph, normally the shared api.landmark_graph.get_landmark_graph().
+    profile: RoutingProfile (api.routing_profiles) to cost the route for; the default if None.
     Returns dict: waypoints [{lat, lon, label}], total_distance_km, total_time_min, algorithm_used.
     """
+    profile = profile or get_profile()
     origin_lat = float(origin_lat)
     origin_lon = float(origin_lon)
     dest_lat = float(dest_lat)
     dest_lon = float(dest_lon)
 
-    direct_km = haversine_km(origin_lat, origin_lon, dest_lat, dest_lon)
-
-    # Landmark data
-    landmarks = list(
-        landmark_models.values("id", "name", "latitude", "longitude", "location_type")
-    )
-    landmark_nodes = [
-        {
-            "id": f"landmark_{lm['id']}",
-            "lat": float(lm["latitude"]),
-            "lon": float(lm["longitude"]),
-            "label": lm["name"],
-        }
-        for lm in landmarks
-    ]
-    ld_list = list(
-        landmark_distance_models.select_related("from_landmark", "to_landmark").all()
-    )
-    landmark_distances = {}
-    for ld in ld_list:
-        fid = f"landmark_{ld.from_landmark_id}"
-        tid = f"landmark_{ld.to_landmark_id}"
-        landmark_distances[(fid, tid)] = (
-            float(ld.distance_km),
-            int(ld.travel_time_min),
+    network = road_network()
+    if network is not None:
+        dest_label = next((n.get("label") for n in labour_nodes if n["id"] == "dest"), None) or "Destination"
+        route = network.with_profile(profile).route(
+            {"lat": origin_lat, "lon": origin_lon, "label": "Your location"},
+            {"lat": dest_lat, "lon": dest_lon, "label": dest_label},
+            road_snap_max_km(),
         )
+        if route is not None:
+            return route
 
-    use_slm = direct_km > SLM_DISTANCE_THRESHOLD_KM and len(landmark_nodes) >= 2
+    direct_km = haversine_km(origin_lat, origin_lon, dest_lat, dest_lon)
+
+    use_slm = direct_km > SLM_DISTANCE_THRESHOLD_KM and len(landmark_graph) >= 2
 
     # Always build graph and node_info so we have lat/lon for all nodes (origin, dest, landmarks)
     graph, node_info = build_local_graph(
@@ -269,19 +584,20 @@ def compute_optimal_route(
         dest_lat,
         dest_lon,
         labour_nodes,
-        landmark_nodes,
-        landmark_distances,
+        landmark_graph,
+        max_neighbours=LOCAL_MAX_NEIGHBOURS,
+        profile=profile,
     )
 
+    legs = None
     if use_slm:
-        path, cost, algo = route_via_slm(
+        path, cost, algo, legs = route_via_slm(
             origin_lat,
             origin_lon,
             dest_lat,
             dest_lon,
-            landmark_nodes,
-            landmark_distances,
-            node_info,
+            landmark_graph,
+            profile,
         )
         if not path:
             use_slm = False
@@ -290,21 +606,57 @@ def compute_optimal_route(
         algo = "dijkstra"
 
     if not use_slm:
-        path, cost = dijkstra(graph, "origin", "dest")
+        path, cost = shortest_path(graph, "origin", "dest")
         algo = "dijkstra"
+        legs = path_legs(graph, path)
 
     if not path:
-        # Fallback: direct segment
-        return {
-            "waypoints": [
-                {"lat": origin_lat, "lon": origin_lon, "label": "Start"},
-                {"lat": dest_lat, "lon": dest_lon, "label": "End"},
-            ],
-            "total_distance_km": round(direct_km, 2),
-            "total_time_min": travel_time_min(direct_km),
-            "algorithm_used": "direct",
-        }
+        return direct_route(origin_lat, origin_lon, dest_lat, dest_lon, profile)
+    return route_summary(path, node_info, algo, legs)
+
+
+def road_network():
+    """The imported road network (api.road_network), or None when there is none."""
+    from .road_network import get_road_network
 
+    return get_road_network()
+
+
+def road_snap_max_km() -> float:
+    from .road_network import snap_max_km
+
+    return snap_max_km()
+
+
+def direct_route(
+    origin_lat: float, origin_lon: float, dest_lat: float, dest_lon: float,
+    profile: Optional[RoutingProfile] = None,
+) -> Dict[str, Any]:
+    """Fallback when no path exists: a direct segment."""
+    direct_km = haversine_km(origin_lat, origin_lon, dest_lat, dest_lon)
+    minutes = (profile or get_profile()).travel_minutes(direct_km)
+    return {
+        "waypoints": [
+            {"lat": origin_lat, "lon": origin_lon, "label": "Start"},
+            {"lat": dest_lat, "lon": dest_lon, "label": "End"},
+        ],
+        "total_distance_km": round(direct_km, 2),
+        "total_time_min": minutes,
+        "algorithm_used": "direct",
+    }
+
+
+def route_summary(
+    path: List[str],
+    node_info: Dict[str, Dict[str, Any]],
+    algo: str,
+    legs: Optional[List[Optional[Leg]]] = None,
+) -> Dict[str, Any]:
+    """
+    Waypoints and distance/time totals of a path of node ids. legs[i], when
+    given, is the (distance_km, minutes) of the hop into path[i + 1]; hops
+    without one are estimated from the straight line.
+    """
     waypoints = []
     total_distance_km = 0.0
     total_time_min = 0
@@ -319,9 +671,12 @@ def compute_optimal_route(
                 }
             )
         if i > 0:
-            prev_id = path[i - 1]
-            prev_info = node_info.get(prev_id)
-            if prev_info and info:
+            leg = legs[i - 1] if legs else None
+            prev_info = node_info.get(path[i - 1])
+            if leg is not None:
+                total_distance_km += leg[0]
+                total_time_min += int(round(leg[1]))
+            elif prev_info and info:
                 d = haversine_km(
                     prev_info["lat"],
                     prev_info["lon"],
@@ -337,3 +692,89 @@ def compute_optimal_route(
         "total_time_min": total_time_min,
         "algorithm_used": algo,
     }
+
+
+def compute_route_matrix(
+    origins: List[Dict[str, Any]],
+    destinations: List[Dict[str, Any]],
+    labour_nodes: List[Dict[str, Any]],
+    landmark_graph,
+    include_routes: bool = False,
+    profile: Optional[RoutingProfile] = None,
+) -> Dict[str, Any]:
+    """
+    Routes from every origin to every destination ({lat, lon, label?} each),
+    from one graph build. Each origin runs one shortest-path tree that covers
+    all of its local destinations; long trips go through SLM per pair, as in
+    compute_optimal_route(). Every origin and destination is a node of the
+    shared graph, so a route may pass through another endpoint. With an
+    imported road network, one road search tree per origin serves every
+    destination on the network and the graph is only built for the rest.
+    Routes are found and costed for profile (the default profile if None).
+    Returns M x N lists: distance_km, time_min, algorithm_used, and routes
+    (waypoints) when include_routes.
+    """
+    profile = profile or get_profile()
+    endpoints = [
+        (f"origin_{i}", float(o["lat"]), float(o["lon"]), o.get("label") or "Your location", "origin")
+        for i, o in enumerate(origins)
+    ] + [
+        (f"dest_{j}", float(d["lat"]), float(d["lon"]), d.get("label") or "Destination", "destination")
+        for j, d in enumerate(destinations)
+    ]
+    network = road_network()
+    points = [{"lat": lat, "lon": lon, "label": label} for _, lat, lon, label, _ in endpoints]
+    graph = None
+    use_slm = len(landmark_graph) >= 2
+
+    matrix = {"distance_km": [], "time_min": [], "algorithm_used": []}
+    if include_routes:
+        matrix["routes"] = []
+    for i in range(len(origins)):
+        _, o_lat, o_lon, _, _ = endpoints[i]
+        paths = {}
+        road_routes = {}
+        if network is not None:
+            found = network.with_profile(profile).route_many(points[i], points[len(origins):], road_snap_max_km())
+            road_routes = {j: route for j, route in enumerate(found) if route is not None}
+        if graph is None and len(road_routes) < len(destinations):
+            # Only pairs the road network cannot serve need the landmark/labour graph
+            graph, node_info = build_route_graph(
+                endpoints, labour_nodes, landmark_graph, max_neighbours=LOCAL_MAX_NEIGHBOURS, profile=profile
+            )
+        local = []
+        for j in range(len(destinations)):
+            if j in road_routes:
+                continue
+            _, d_lat, d_lon, _, _ = endpoints[len(origins) + j]
+            if use_slm and haversine_km(o_lat, o_lon, d_lat, d_lon) > SLM_DISTANCE_THRESHOLD_KM:
+                path, _, algo, legs = route_via_slm(o_lat, o_lon, d_lat, d_lon, landmark_graph, profile)
+                if path:
+                    paths[j] = ([f"origin_{i}"] + path[1:-1] + [f"dest_{j}"], algo, legs)
+                    continue
+            local.append(j)
+
+        if local:
+            dist, prev = shortest_path_tree(graph, f"origin_{i}", [f"dest_{j}" for j in local])
+            for j in local:
+                t = graph.index[f"dest_{j}"]
+                if dist[t] != INF:
+                    path = _trace_path(graph, prev, t)
+                    paths[j] = (path, "dijkstra", path_legs(graph, path))
+
+        row = []
+        for j in range(len(destinations)):
+            if j in road_routes:
+                row.append(road_routes[j])
+            elif j in paths:
+                path, algo, legs = paths[j]
+                row.append(route_summary(path, node_info, algo, legs))
+            else:
+                _, d_lat, d_lon, _, _ = endpoints[len(origins) + j]
+                row.append(direct_route(o_lat, o_lon, d_lat, d_lon, profile))
+        matrix["distance_km"].append([r["total_distance_km"] for r in row])
+        matrix["time_min"].append([r["total_time_min"] for r in row])
+        matrix["algorithm_used"].append([r["algorithm_used"] for r in row])
+        if include_routes:
+            matrix["routes"].append([r["waypoints"] for r in row])
+    return matrix
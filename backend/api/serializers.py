@@ -1,7 +1,10 @@
 from rest_framework import serializers
 from django.contrib.auth import authenticate
 from django.contrib.auth import get_user_model
-from .models import Equipment, Inquiry, Notification, Job, JobApplication, LabourRating, LabourSkill, LabourEarning
+from django.db.models import Count, Exists, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from .models import Equipment, Inquiry, Notification, Job, JobApplication, JobMatch, LabourRating, LabourSkill, LabourEarning
+from .spatial_index import MAX_SEARCH_RADIUS_KM
 
 User = get_user_model()
 
@@ -113,6 +116,31 @@ class NotificationSerializer(serializers.ModelSerializer):
         )
         read_only_fields = ('created_at',)
 
+def _count_per_job(queryset):
+    """Correlated subquery counting the rows of queryset that belong to the outer job."""
+    counts = queryset.filter(job=OuterRef('pk')).order_by().values('job').annotate(n=Count('pk')).values('n')
+    return Coalesce(Subquery(counts), 0)
+
+
+def with_job_counts(queryset):
+    """
+    Load everything JobSerializer reads for a list of jobs in the list query itself
+    (farmer row plus the three counts), instead of one query per job.
+    """
+    return queryset.select_related('farmer').annotate(
+        applications_total=_count_per_job(JobApplication.objects.all()),
+        accepted_applications_total=_count_per_job(JobApplication.objects.filter(status='accepted')),
+        available_labours_total=_count_per_job(JobMatch.objects.filter(labour_available=True)),
+    )
+
+
+def with_application_details(queryset):
+    """Load the job, labour, rating and earning flag JobApplicationSerializer reads, in one query."""
+    return queryset.select_related('job', 'labour', 'rating').annotate(
+        has_earning_record=Exists(LabourEarning.objects.filter(job_application=OuterRef('pk'))),
+    )
+
+
 class JobSerializer(serializers.ModelSerializer):
     farmer_name = serializers.CharField(source='farmer.first_name', read_only=True)
     farmer_phone = serializers.CharField(source='farmer.phone', read_only=True)
@@ -153,17 +181,29 @@ class JobSerializer(serializers.ModelSerializer):
         if 'wage_per_day' in data and data['wage_per_day'] <= 0:
             raise serializers.ValidationError("Wage per day must be greater than 0")
         
+        # Check if radius_km is within the matching search range
+        if 'radius_km' in data and not (0 < data['radius_km'] <= MAX_SEARCH_RADIUS_KM):
+            raise serializers.ValidationError(f"Radius must be between 0 and {MAX_SEARCH_RADIUS_KM} km")
+        
         return data
 
+    # The counts come from with_job_counts() annotations when the view used it,
+    # and fall back to a query for single jobs (e.g. the response to a create).
     def get_applications_count(self, obj):
+        if hasattr(obj, 'applications_total'):
+            return obj.applications_total
         return obj.applications.count()
 
     def get_accepted_applications_count(self, obj):
+        if hasattr(obj, 'accepted_applications_total'):
+            return obj.accepted_applications_total
         return obj.applications.filter(status='accepted').count()
 
     def get_available_labours_count(self, obj):
-        # This will be calculated in the view using location-based matching
-        return 0  # Placeholder, actual count calculated in view
+        # Available labours within the job's radius, from the JobMatch table
+        if hasattr(obj, 'available_labours_total'):
+            return obj.available_labours_total
+        return obj.matches.filter(labour_available=True).count()
 
     def create(self, validated_data):
         request = self.context.get('request')
@@ -223,8 +263,9 @@ class JobApplicationSerializer(serializers.ModelSerializer):
         return None
 
     def get_has_earning(self, obj):
+        if hasattr(obj, 'has_earning_record'):
+            return obj.has_earning_record
         try:
-            from ..models import LabourEarning
             return LabourEarning.objects.filter(job_application=obj).exists()
         except Exception:
             return False
@@ -0,0 +1,86 @@
+"""
+Krishiment region sharding: split the country into fixed geographic tiles and
+assign the tiles to shards (worker pools).
+
+- Every labour and job is stored with the key of the region tile containing it
+  (`region`, indexed), ready to serve as a partition key. All shards share one
+  database for now, so matching reads every region a search reaches, including
+  tiles owned by a neighbouring shard.
+- settings.MATCHING_SHARDS assigns tiles to shards by bounding box; the worker's
+  own shard is settings.LOCAL_SHARD.
+- RegionShardMiddleware (api.middleware) forwards a request that carries
+  coordinates, or comes from a located user, to the shard that owns them.
+"""
+import math
+from typing import List, Optional
+
+from django.conf import settings
+
+from .spatial_index import bounding_box
+
+DEFAULT_SHARD = 'default'
+
+
+def tile_deg() -> float:
+    return float(getattr(settings, 'REGION_TILE_DEG', 2.0))
+
+
+def region_for(lat, lon) -> Optional[str]:
+    """Region tile key "row:col" for a point, or None if it has no location."""
+    if lat is None or lon is None:
+        return None
+    size = tile_deg()
+    row = int(math.floor(float(lat) / size))
+    col = int(math.floor(float(lon) / size))
+    return f"{row}:{col}"
+
+
+def regions_within_radius(lat, lon, radius_km) -> List[str]:
+    """All region tiles a circle of radius_km around (lat, lon) can intersect."""
+    size = tile_deg()
+    min_lat, max_lat, min_lon, max_lon = bounding_box(lat, lon, radius_km)
+    return [
+        f"{row}:{col}"
+        for row in range(int(math.floor(min_lat / size)), int(math.floor(max_lat / size)) + 1)
+        for col in range(int(math.floor(min_lon / size)), int(math.floor(max_lon / size)) + 1)
+    ]
+
+
+def _tile_center(region: str):
+    row, col = (int(part) for part in region.split(':'))
+    size = tile_deg()
+    return (row + 0.5) * size, (col + 0.5) * size
+
+
+def shard_for_region(region: Optional[str]) -> str:
+    """
+    Shard owning a region tile: the first shard in MATCHING_SHARDS whose bounds
+    contain the tile's center, else the shard whose bounds are '*'.
+    """
+    shards = getattr(settings, 'MATCHING_SHARDS', {})
+    fallback = next((name for name, config in shards.items() if config.get('bounds', '*') == '*'), DEFAULT_SHARD)
+    if region is None:
+        return fallback
+    lat, lon = _tile_center(region)
+    for name, config in shards.items():
+        bounds = config.get('bounds', '*')
+        if bounds == '*':
+            continue
+        for min_lat, max_lat, min_lon, max_lon in bounds:
+            if min_lat <= lat < max_lat and min_lon <= lon < max_lon:
+                return name
+    return fallback
+
+
+def shard_for(lat, lon) -> str:
+    """Shard that owns the point (lat, lon)."""
+    return shard_for_region(region_for(lat, lon))
+
+
+def local_shard() -> str:
+    return getattr(settings, 'LOCAL_SHARD', DEFAULT_SHARD)
+
+
+def shard_url(shard: str) -> str:
+    """Base URL of a shard's workers ('' when it is served locally)."""
+    return getattr(settings, 'MATCHING_SHARDS', {}).get(shard, {}).get('url', '')
@@ -0,0 +1,121 @@
+"""
+Signal handlers that keep derived spatial data in sync with the models they come from.
+
+- Job coverage: the grid cells an open job's radius reaches (JobCoverageCell),
+  rewritten when a job is created or its location, radius or status changes.
+- Job matches: labour <-> open job pairs (JobMatch), updated for the job on the
+  same job events and for the labour when its location or availability changes.
+- Landmark graph: the in-memory routing graph (api.landmark_graph), patched
+  when a landmark or landmark distance is saved or deleted.
+- Cached routes: the labour version of a region tile (api.route_cache),
+  replaced when a labour in it is added, moved, renamed or deleted.
+"""
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .landmark_graph import distance_value, landmark_node, update_landmark_graph
+from .matching import sync_job_matches, sync_labour_matches
+from .route_cache import bump_labour_version
+from .models import CustomUser, Job, JobCoverageCell, Landmark, LandmarkDistance
+from .spatial_index import cells_within_radius
+
+# CustomUser fields that can change a labour's matches
+MATCH_FIELDS = {'latitude', 'longitude', 'is_available', 'role'}
+# CustomUser fields a labour's route waypoint is built from
+ROUTE_FIELDS = {'latitude', 'longitude', 'first_name', 'email', 'role'}
+
+
+def sync_job_coverage(job):
+    """Make the job's coverage cells match its current location, radius and status."""
+    if job.status == 'open':
+        wanted = set(cells_within_radius(job.latitude, job.longitude, job.radius_km))
+    else:
+        wanted = set()
+    existing = set(job.coverage_cells.values_list('cell', flat=True))
+    stale = existing - wanted
+    if stale:
+        job.coverage_cells.filter(cell__in=stale).delete()
+    missing = wanted - existing
+    if missing:
+        JobCoverageCell.objects.bulk_create(
+            [JobCoverageCell(job=job, cell=cell) for cell in missing]
+        )
+
+
+@receiver(post_save, sender=Job)
+def update_job_coverage(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    sync_job_coverage(instance)
+    sync_job_matches(instance)
+
+
+@receiver(post_save, sender=CustomUser)
+def update_labour_matches(sender, instance, created=False, raw=False, update_fields=None, **kwargs):
+    if raw:
+        return
+    # Skip saves that cannot affect matching (e.g. last_login on login)
+    if update_fields is not None and not (MATCH_FIELDS & set(update_fields)):
+        return
+    # Non-labours only have matches left over if they were a labour before this save
+    if instance.role != 'labour':
+        if created:
+            return
+        saved_role = getattr(instance, 'saved_role', None)
+        if saved_role is not None and saved_role != 'labour':
+            return
+        if saved_role is None and not instance.job_matches.exists():
+            return
+    sync_labour_matches(instance)
+
+
+@receiver(post_save, sender=CustomUser)
+def labour_saved(sender, instance, created=False, raw=False, update_fields=None, **kwargs):
+    if raw:
+        return
+    if update_fields is not None and not (ROUTE_FIELDS & set(update_fields)):
+        return
+    saved_role = getattr(instance, 'saved_role', None)
+    if instance.role != 'labour' and (created or saved_role not in (None, 'labour')):
+        return
+    regions = {instance.region, getattr(instance, 'saved_region', None)}
+    transaction.on_commit(lambda: bump_labour_version(regions))
+
+
+@receiver(post_delete, sender=CustomUser)
+def labour_deleted(sender, instance, **kwargs):
+    if instance.role == 'labour':
+        regions = {instance.region}
+        transaction.on_commit(lambda: bump_labour_version(regions))
+
+
+def patch_landmark_graph(change):
+    """Apply a landmark graph change once the transaction that made it commits."""
+    transaction.on_commit(lambda: update_landmark_graph(change))
+
+
+# Values are read from the instance now: on commit its pk may already be cleared by delete()
+
+@receiver(post_save, sender=Landmark)
+def landmark_saved(sender, instance, **kwargs):
+    landmark_id, node = instance.pk, landmark_node(instance)
+    patch_landmark_graph(lambda graph, version: graph.with_landmark(landmark_id, node, version))
+
+
+@receiver(post_delete, sender=Landmark)
+def landmark_deleted(sender, instance, **kwargs):
+    landmark_id = instance.pk
+    patch_landmark_graph(lambda graph, version: graph.without_landmark(landmark_id, version))
+
+
+@receiver(post_save, sender=LandmarkDistance)
+def landmark_distance_saved(sender, instance, **kwargs):
+    from_id, to_id, value = instance.from_landmark_id, instance.to_landmark_id, distance_value(instance)
+    patch_landmark_graph(lambda graph, version: graph.with_distance(from_id, to_id, value, version))
+
+
+@receiver(post_delete, sender=LandmarkDistance)
+def landmark_distance_deleted(sender, instance, **kwargs):
+    from_id, to_id = instance.from_landmark_id, instance.to_landmark_id
+    patch_landmark_graph(lambda graph, version: graph.with_distance(from_id, to_id, None, version))
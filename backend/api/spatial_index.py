@@ -0,0 +1,159 @@
+"""
+Krishiment spatial index: fixed-size latitude/longitude grid cells.
+
+- Each open job stores the keys of the cells its search radius can touch
+  (JobCoverageCell, from cells_within_radius), so the jobs covering a labour
+  are found by the key of the labour's own cell (grid_cell).
+- within_bounding_box pushes the circle's lat/lon bounding box into an ORM
+  filter, which the composite latitude/longitude indexes can serve.
+- annotate_distance computes the great-circle distance in SQL from the cached
+  unit-vector columns (ux, uy, uz), so ranking and radius checks run in the database.
+- pairs_within_radius finds all in-memory point pairs closer than a radius by
+  bucketing the points into radius-sized cells and only comparing neighbouring cells.
+"""
+import math
+from collections import defaultdict
+from typing import Iterator, List, Optional, Sequence, Tuple
+
+from django.db.models import F, FloatField, Value
+from django.db.models.functions import ACos, Least
+
+from .geometry import EARTH_RADIUS_KM, haversine_matrix, np, unit_vector
+
+# Cell size in degrees (~11 km north-south). Small enough that a 5 km search
+# touches a handful of cells, large enough that a 50 km search stays ~100 cells.
+GRID_CELL_DEG = 0.1
+
+KM_PER_DEG_LAT = 111.32
+
+# Largest search radius a job can reach (job matching expands up to this)
+MAX_SEARCH_RADIUS_KM = 50
+
+
+def grid_cell(lat, lon) -> Optional[str]:
+    """Return the cell key "row:col" for a point, or None if it has no location."""
+    if lat is None or lon is None:
+        return None
+    row = int(math.floor(float(lat) / GRID_CELL_DEG))
+    col = int(math.floor(float(lon) / GRID_CELL_DEG))
+    return f"{row}:{col}"
+
+
+def bounding_box(lat, lon, radius_km) -> Tuple[float, float, float, float]:
+    """
+    (min_lat, max_lat, min_lon, max_lon) enclosing a circle of radius_km around
+    (lat, lon). Longitude is widened at the latitude closest to the pole so the
+    box never cuts the circle.
+    """
+    lat = float(lat)
+    lon = float(lon)
+    radius_km = float(radius_km)
+    dlat = radius_km / KM_PER_DEG_LAT
+    max_abs_lat = min(89.0, abs(lat) + dlat)
+    dlon = radius_km / (KM_PER_DEG_LAT * math.cos(math.radians(max_abs_lat)))
+    return lat - dlat, lat + dlat, lon - dlon, lon + dlon
+
+
+def within_bounding_box(queryset, lat, lon, radius_km):
+    """Restrict a queryset with latitude/longitude fields to the circle's bounding box."""
+    min_lat, max_lat, min_lon, max_lon = bounding_box(lat, lon, radius_km)
+    return queryset.filter(
+        latitude__range=(min_lat, max_lat),
+        longitude__range=(min_lon, max_lon),
+    )
+
+
+def cells_within_radius(lat, lon, radius_km) -> List[str]:
+    """All cell keys that a circle of radius_km around (lat, lon) can intersect."""
+    min_lat, max_lat, min_lon, max_lon = bounding_box(lat, lon, radius_km)
+    row_min = int(math.floor(min_lat / GRID_CELL_DEG))
+    row_max = int(math.floor(max_lat / GRID_CELL_DEG))
+    col_min = int(math.floor(min_lon / GRID_CELL_DEG))
+    col_max = int(math.floor(max_lon / GRID_CELL_DEG))
+    return [
+        f"{row}:{col}"
+        for row in range(row_min, row_max + 1)
+        for col in range(col_min, col_max + 1)
+    ]
+
+
+def annotate_distance(queryset, lat, lon, name='distance_km'):
+    """
+    Annotate each row with its great-circle distance in km from (lat, lon):
+    R * acos(u . v), using the row's cached unit vector. Rows without a
+    location get NULL.
+    """
+    x, y, z = unit_vector(lat, lon)
+    dot = F('ux') * Value(x) + F('uy') * Value(y) + F('uz') * Value(z)
+    # Clamp rounding error above 1 so acos stays defined for identical points
+    cosine = Least(dot, Value(1.0), output_field=FloatField())
+    return queryset.annotate(**{name: Value(float(EARTH_RADIUS_KM)) * ACos(cosine)})
+
+
+def pairs_within_radius(
+    lats: Sequence[float],
+    lons: Sequence[float],
+    radius_km: float,
+    max_neighbours: Optional[int] = None,
+) -> Iterator[Tuple[int, int, float]]:
+    """
+    Yield (i, j, distance_km) with i < j for every pair of points at most radius_km
+    apart, the same pairs an all-pairs comparison would find.
+
+    Points are bucketed into cells one radius wide (longitude cells are sized at
+    the highest latitude present), so a point's neighbours all lie in the 3x3
+    cells around it and each cell is compared to its neighbourhood in one
+    batched distance matrix. With max_neighbours, each point keeps only its k
+    nearest neighbours and a pair is kept if either point chose the other.
+    """
+    n = len(lats)
+    radius_km = float(radius_km)
+    if n < 2 or radius_km <= 0:
+        return
+    cell_lat = radius_km / KM_PER_DEG_LAT
+    max_abs_lat = min(89.0, max(abs(float(lat)) for lat in lats) + cell_lat)
+    cell_lon = radius_km / (KM_PER_DEG_LAT * math.cos(math.radians(max_abs_lat)))
+
+    buckets = defaultdict(list)
+    for i in range(n):
+        buckets[(int(math.floor(float(lats[i]) / cell_lat)), int(math.floor(float(lons[i]) / cell_lon)))].append(i)
+
+    nearest = defaultdict(list) if max_neighbours else None
+    for (row, col), members in buckets.items():
+        candidates = [
+            j
+            for dr in (-1, 0, 1)
+            for dc in (-1, 0, 1)
+            for j in buckets.get((row + dr, col + dc), ())
+        ]
+        dist = haversine_matrix(
+            [lats[i] for i in members], [lons[i] for i in members],
+            [lats[j] for j in candidates], [lons[j] for j in candidates],
+        )
+        if np is not None:
+            hits = zip(*np.nonzero(dist <= radius_km))
+        else:
+            hits = (
+                (a, b)
+                for a in range(len(members))
+                for b in range(len(candidates))
+                if dist[a][b] <= radius_km
+            )
+        for a, b in hits:
+            i, j = members[a], candidates[b]
+            if i == j:
+                continue
+            d = float(dist[a][b])
+            if nearest is not None:
+                nearest[i].append((d, j))
+            elif i < j:
+                yield i, j, d
+
+    if nearest is not None:
+        kept = {}
+        for i, found in nearest.items():
+            found.sort()
+            for d, j in found[:max_neighbours]:
+                kept[(min(i, j), max(i, j))] = d
+        for (i, j), d in kept.items():
+            yield i, j, d
@@ -1,3 +1,1549 @@
-from django.test import TestCase
+import io
+import itertools
+import json
+import math
+import os
+import random
+import tempfile
+from contextlib import redirect_stdout
+from datetime import date
+from unittest import mock
 
-# Create your tests here.
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .contraction_hierarchy import ContractionHierarchy, build_contraction_hierarchy
+from .landmark_graph import LandmarkGraph, clear_landmark_graph, get_landmark_graph, schedule_hierarchy_rebuild
+from .landmark_table import LandmarkTable, build_landmark_table
+from .route_cache import route_cache, route_cache_stats
+from .routing_profiles import get_profile
+from .pickup_route import path_cost, plan_pickup_route, solve_pickup_order
+from .road_network import RoadNetwork, RoadNetworkBuilder, import_geojson, import_osm_xml
+from .csr_graph import CSRGraph
+from .models import (
+    CustomUser, Equipment, Inquiry, Job, JobApplication, LabourEarning, LabourRating,
+    JobMatch, LabourSkill, Notification, Landmark, LandmarkDistance,
+)
+from . import geometry
+from .geometry import haversine_km, haversine_many, haversine_matrix, unit_vector
+from .isochrone import compute_isochrone, time_graph
+from .matching import find_available_labours, open_jobs_covering
+from .routing_service import (
+    alt_search, bidirectional_dijkstra, build_local_graph, compute_optimal_route, compute_route_matrix,
+    dijkstra, distances_within, edge_weight_km, path_legs, route_summary, select_anchors, shortest_distances,
+    shortest_path, travel_time_min,
+)
+from .pagination import decode_cursor, encode_cursor
+from .sharding import region_for, regions_within_radius, shard_for, shard_for_region
+from .spatial_index import (
+    MAX_SEARCH_RADIUS_KM, annotate_distance, bounding_box, cells_within_radius, grid_cell, pairs_within_radius,
+    within_bounding_box,
+)
+
+FARM_LAT, FARM_LON = 18.5204, 73.8567
+
+
+def create_user(username, role, lat, lon, **fields):
+    return CustomUser.objects.create_user(
+        username=username, email=f'{username}@example.com', password='x', role=role,
+        phone='9999999999', latitude=lat, longitude=lon, **fields,
+    )
+
+
+def create_job(farmer, lat, lon, radius_km=10, **fields):
+    fields = {
+        'title': 'Harvest', 'description': 'd', 'category': 'harvesting', 'wage_per_day': 400,
+        'duration_days': 2, 'required_workers': 3, 'start_date': date(2026, 1, 1),
+        'end_date': date(2026, 1, 3), 'address': 'Pune', **fields,
+    }
+    return Job.objects.create(farmer=farmer, latitude=lat, longitude=lon, radius_km=radius_km, **fields)
+
+
+class GridCellTests(SimpleTestCase):
+    def test_grid_cell_keys(self):
+        self.assertEqual(grid_cell(18.52, 73.85), '185:738')
+        self.assertEqual(grid_cell(-0.05, -0.05), '-1:-1')
+        self.assertIsNone(grid_cell(None, 73.85))
+
+    def test_cells_within_radius_cover_every_point_in_the_circle(self):
+        rng = random.Random(1)
+        for lat, lon, radius in ((18.52, 73.85, 5), (18.52, 73.85, 50), (60.0, 10.0, 30), (-33.9, 18.4, 12)):
+            cells = set(cells_within_radius(lat, lon, radius))
+            span = radius / 111.0 * 2.5
+            points = [(lat + rng.uniform(-span, span), lon + rng.uniform(-2 * span, 2 * span)) for _ in range(2000)]
+            inside = [p for p in points if haversine_km(lat, lon, *p) <= radius]
+            self.assertTrue(inside)
+            for p in inside:
+                self.assertIn(grid_cell(*p), cells)
+
+
+class HaversineKernelTests(SimpleTestCase):
+    def test_batched_kernels_match_scalar_formula(self):
+        rng = random.Random(2)
+        lats = [rng.uniform(-60, 60) for _ in range(50)]
+        lons = [rng.uniform(-180, 180) for _ in range(50)]
+        # Without NumPy the same functions take the pure Python path
+        for np_module in {geometry.np, None}:
+            with self.subTest(numpy=np_module is not None), mock.patch.object(geometry, 'np', np_module):
+                many = haversine_many(lats[0], lons[0], lats, lons)
+                matrix = haversine_matrix(lats[:5], lons[:5], lats, lons)
+                for j in range(len(lats)):
+                    expected = haversine_km(lats[0], lons[0], lats[j], lons[j])
+                    self.assertAlmostEqual(many[j], expected, places=6)
+                    self.assertAlmostEqual(matrix[3][j], haversine_km(lats[3], lons[3], lats[j], lons[j]), places=6)
+                self.assertAlmostEqual(many[0], 0.0, places=6)
+
+    def test_unit_vector_dot_product_gives_great_circle_distance(self):
+        a, b = unit_vector(18.52, 73.85), unit_vector(19.99, 73.79)
+        cosine = sum(x * y for x, y in zip(a, b))
+        self.assertAlmostEqual(geometry.EARTH_RADIUS_KM * math.acos(cosine), haversine_km(18.52, 73.85, 19.99, 73.79),
+                               places=6)
+        self.assertIsNone(unit_vector(None, 73.85))
+
+
+class NearestLaboursTests(TestCase):
+    def setUp(self):
+        # Labours due north of the farm, about 1.1 km per 0.01 degree
+        self.labours = [
+            create_user(f'labour{i}', 'labour', FARM_LAT + offset, FARM_LON)
+            for i, offset in enumerate((0.09, 0.02, 0.11, 0.05))
+        ]
+        create_user('busy', 'labour', FARM_LAT + 0.01, FARM_LON, is_available=False)
+        create_user('far', 'labour', FARM_LAT + 0.6, FARM_LON)
+
+    def _nearest(self, radius_km, required):
+        with redirect_stdout(io.StringIO()):
+            return find_available_labours(FARM_LAT, FARM_LON, radius_km, required)
+
+    def test_returns_nearest_available_labours_in_order(self):
+        found, _ = self._nearest(5, 3)
+        self.assertEqual([e['labour'] for e in found], [self.labours[1], self.labours[3], self.labours[0]])
+        distances = [e['distance'] for e in found]
+        self.assertEqual(distances, sorted(distances))
+        self.assertAlmostEqual(distances[0], haversine_km(FARM_LAT, FARM_LON, FARM_LAT + 0.02, FARM_LON), places=3)
+
+    def test_radius_expands_in_steps_to_cover_the_farthest_labour(self):
+        self.assertEqual(self._nearest(5, 1)[1], 5)
+        # Second nearest is ~5.6 km away: one 5 km step
+        self.assertEqual(self._nearest(5, 2)[1], 10)
+        # Fourth nearest is ~12.2 km away
+        self.assertEqual(self._nearest(5, 4)[1], 15)
+        self.assertEqual(self._nearest(20, 4)[1], 20)
+
+    def test_short_of_labours_returns_all_at_the_maximum_radius(self):
+        found, radius = self._nearest(5, 10)
+        self.assertEqual(len(found), 4)
+        self.assertEqual(radius, MAX_SEARCH_RADIUS_KM)
+
+
+class BoundingBoxTests(TestCase):
+    def test_box_encloses_the_circle(self):
+        rng = random.Random(3)
+        for lat, lon, radius in ((18.52, 73.85, 50), (70.0, 20.0, 80), (-45.0, 170.0, 10)):
+            min_lat, max_lat, min_lon, max_lon = bounding_box(lat, lon, radius)
+            for _ in range(500):
+                bearing, km = rng.uniform(0, 2 * math.pi), rng.uniform(0, radius)
+                p_lat = lat + km * math.cos(bearing) / 111.32
+                p_lon = lon + km * math.sin(bearing) / (111.32 * math.cos(math.radians(p_lat)))
+                if haversine_km(lat, lon, p_lat, p_lon) <= radius:
+                    self.assertTrue(min_lat <= p_lat <= max_lat and min_lon <= p_lon <= max_lon)
+
+    def test_queryset_is_cut_to_the_box(self):
+        inside = create_user('inside', 'labour', FARM_LAT + 0.2, FARM_LON - 0.2)
+        create_user('north', 'labour', FARM_LAT + 0.5, FARM_LON)
+        create_user('east', 'labour', FARM_LAT, FARM_LON + 0.5)
+        create_user('nowhere', 'labour', None, None)
+        labours = within_bounding_box(CustomUser.objects.all(), FARM_LAT, FARM_LON, 30)
+        self.assertEqual(list(labours), [inside])
+
+
+class SqlDistanceTests(TestCase):
+    def test_annotated_distance_matches_haversine(self):
+        points = [(FARM_LAT, FARM_LON), (FARM_LAT + 0.3, FARM_LON - 0.1), (19.99, 73.79), (28.61, 77.21)]
+        users = [create_user(f'user{i}', 'labour', lat, lon) for i, (lat, lon) in enumerate(points)]
+        create_user('nowhere', 'labour', None, None)
+        ranked = annotate_distance(CustomUser.objects.all(), FARM_LAT, FARM_LON).order_by('distance_km')
+        located = [u for u in ranked if u.distance_km is not None]
+        self.assertEqual(located, users)
+        for user, (lat, lon) in zip(located, points):
+            self.assertAlmostEqual(user.distance_km, haversine_km(FARM_LAT, FARM_LON, lat, lon), delta=1e-3)
+        # Same point: rounding must not push the cosine above 1 (acos NULL)
+        self.assertEqual(located[0].distance_km, 0.0)
+        self.assertIsNone(next(u for u in ranked if u.username == 'nowhere').distance_km)
+
+    def test_unit_vector_follows_location_changes(self):
+        user = create_user('mover', 'labour', FARM_LAT, FARM_LON)
+        user.latitude, user.longitude = 28.61, 77.21
+        user.save(update_fields=['latitude', 'longitude'])
+        user.refresh_from_db()
+        self.assertEqual((user.ux, user.uy, user.uz), unit_vector(28.61, 77.21))
+
+
+class JobCoverageTests(TestCase):
+    def setUp(self):
+        self.farmer = create_user('farmer', 'farmer', FARM_LAT, FARM_LON)
+
+    def _cells(self, job):
+        return set(job.coverage_cells.values_list('cell', flat=True))
+
+    def test_coverage_cells_follow_radius_location_and_status(self):
+        job = create_job(self.farmer, FARM_LAT, FARM_LON, radius_km=5)
+        self.assertEqual(self._cells(job), set(cells_within_radius(FARM_LAT, FARM_LON, 5)))
+
+        job.radius_km = 20
+        job.save()
+        self.assertEqual(self._cells(job), set(cells_within_radius(FARM_LAT, FARM_LON, 20)))
+
+        job.latitude, job.longitude = 19.99, 73.79
+        job.save()
+        self.assertEqual(self._cells(job), set(cells_within_radius(19.99, 73.79, 20)))
+
+        job.status = 'completed'
+        job.save()
+        self.assertEqual(self._cells(job), set())
+
+    def test_open_jobs_covering_checks_the_exact_radius(self):
+        near = create_job(self.farmer, FARM_LAT, FARM_LON, radius_km=5)
+        wide = create_job(self.farmer, FARM_LAT + 0.1, FARM_LON, radius_km=15)
+        create_job(self.farmer, FARM_LAT, FARM_LON, radius_km=5, status='cancelled')
+        # ~3.3 km north of the farm: inside both radii
+        self.assertEqual(set(open_jobs_covering(FARM_LAT + 0.03, FARM_LON)), {near, wide})
+        # ~7.8 km north: outside the 5 km job, ~3.3 km from the wide one
+        jobs = list(open_jobs_covering(FARM_LAT + 0.07, FARM_LON))
+        self.assertEqual(jobs, [wide])
+        self.assertAlmostEqual(jobs[0].distance_km, haversine_km(FARM_LAT + 0.07, FARM_LON, FARM_LAT + 0.1, FARM_LON),
+                               places=3)
+
+
+class JobMatchSignalTests(TestCase):
+    def setUp(self):
+        self.farmer = create_user('farmer', 'farmer', FARM_LAT, FARM_LON)
+        self.job = create_job(self.farmer, FARM_LAT, FARM_LON, radius_km=10)
+
+    def test_non_labour_saves_do_not_query_matches(self):
+        farmer = CustomUser.objects.get(pk=self.farmer.pk)
+        farmer.first_name = 'Renamed'
+        farmer.latitude = FARM_LAT + 0.01
+        with CaptureQueriesContext(connection) as queries:
+            farmer.save()
+        self.assertFalse([q for q in queries.captured_queries if 'api_jobmatch' in q['sql']])
+
+    def _matches(self):
+        return {(m.job_id, m.labour_id): (round(m.distance_km, 3), m.labour_available) for m in JobMatch.objects.all()}
+
+    def test_matches_follow_job_and_labour_changes(self):
+        near = create_user('near', 'labour', FARM_LAT + 0.05, FARM_LON)
+        far = create_user('far', 'labour', FARM_LAT + 0.2, FARM_LON)
+        near_km = round(haversine_km(FARM_LAT, FARM_LON, FARM_LAT + 0.05, FARM_LON), 3)
+        self.assertEqual(self._matches(), {(self.job.id, near.id): (near_km, True)})
+
+        near.is_available = False
+        near.save(update_fields=['is_available'])
+        self.assertEqual(self._matches(), {(self.job.id, near.id): (near_km, False)})
+
+        self.job.radius_km = 25
+        self.job.save()
+        self.assertEqual(set(self._matches()), {(self.job.id, near.id), (self.job.id, far.id)})
+
+        far.latitude = FARM_LAT + 0.5
+        far.save(update_fields=['latitude'])
+        self.assertEqual(set(self._matches()), {(self.job.id, near.id)})
+
+        self.job.status = 'completed'
+        self.job.save()
+        self.assertEqual(self._matches(), {})
+
+    def test_rebuild_command_checks_and_repairs_the_table(self):
+        labour = create_user('labour', 'labour', FARM_LAT + 0.01, FARM_LON)
+        out = io.StringIO()
+        call_command('rebuild_job_matches', check=True, stdout=out)
+        self.assertIn('consistent', out.getvalue())
+
+        # Bulk updates skip the signals and leave the table behind
+        CustomUser.objects.filter(pk=labour.pk).update(latitude=FARM_LAT + 0.5)
+        JobMatch.objects.create(job=self.job, labour=self.farmer, distance_km=1.0)
+        with self.assertRaises(CommandError):
+            call_command('rebuild_job_matches', check=True, stdout=io.StringIO())
+
+        call_command('rebuild_job_matches', stdout=io.StringIO())
+        self.assertEqual(self._matches(), {})
+        call_command('rebuild_job_matches', check=True, stdout=io.StringIO())
+
+    def test_role_change_drops_matches(self):
+        labour = create_user('labour', 'labour', FARM_LAT + 0.01, FARM_LON)
+        self.assertTrue(JobMatch.objects.filter(labour=labour).exists())
+        labour = CustomUser.objects.get(pk=labour.pk)
+        labour.role = 'farmer'
+        labour.save()
+        self.assertFalse(JobMatch.objects.filter(labour=labour).exists())
+
+
+class NearbyPaginationTests(TestCase):
+    def setUp(self):
+        self.farmer = create_user('farmer', 'farmer', FARM_LAT, FARM_LON)
+        self.labour = create_user('labour', 'labour', FARM_LAT, FARM_LON)
+        # Pairs of jobs at the same distance, so ties are broken by id
+        self.jobs = [
+            create_job(self.farmer, FARM_LAT + 0.01 * (i // 2), FARM_LON, radius_km=20, title=f'Job {i}')
+            for i in range(7)
+        ]
+        self.client = APIClient()
+        self.client.force_authenticate(self.labour)
+
+    def _page(self, cursor=None, page_size=3):
+        params = {'page_size': page_size}
+        if cursor:
+            params['cursor'] = cursor
+        with redirect_stdout(io.StringIO()):
+            response = self.client.get('/api/jobs/nearby/', params)
+        self.assertEqual(response.status_code, 200)
+        return [job['id'] for job in response.data['results']], response.data['next_cursor']
+
+    def test_pages_cover_every_job_once_in_distance_order(self):
+        seen, cursor = self._page()
+        while cursor:
+            ids, cursor = self._page(cursor)
+            seen.extend(ids)
+        self.assertEqual(seen, [job.id for job in self.jobs])
+
+    def test_cursor_is_stable_while_jobs_change(self):
+        first, cursor = self._page()
+        self.assertEqual(first, [job.id for job in self.jobs[:3]])
+        # A new job before the cursor and a removed one after it shift offsets, not the cursor
+        create_job(self.farmer, FARM_LAT, FARM_LON, radius_km=20, title='New')
+        self.jobs[4].delete()
+        seen = list(first)
+        while cursor:
+            ids, cursor = self._page(cursor)
+            seen.extend(ids)
+        self.assertEqual(seen, [job.id for i, job in enumerate(self.jobs) if i != 4])
+
+    def test_invalid_cursor_is_rejected(self):
+        with redirect_stdout(io.StringIO()):
+            response = self.client.get('/api/jobs/nearby/', {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(decode_cursor(encode_cursor(1.25, 7)), (1.25, 7))
+
+
+SHARDS = {
+    'west': {'bounds': [(14.0, 24.0, 68.0, 76.0)], 'url': 'https://west.example.com/'},
+    'rest': {'bounds': '*', 'url': ''},
+}
+
+
+@override_settings(MATCHING_SHARDS=SHARDS, LOCAL_SHARD='rest', REGION_TILE_DEG=2.0)
+class ShardRoutingTests(TestCase):
+    def test_regions_map_to_shards(self):
+        self.assertEqual(region_for(18.52, 73.85), '9:36')
+        self.assertEqual(shard_for(18.52, 73.85), 'west')
+        self.assertEqual(shard_for(28.61, 77.21), 'rest')
+        # Requests and users without a location go to the '*' shard
+        self.assertEqual(shard_for(None, None), 'rest')
+        self.assertEqual(shard_for_region(None), 'rest')
+
+    def test_regions_within_radius_cover_tiles_the_circle_touches(self):
+        regions = regions_within_radius(19.0, 73.99, 30)
+        self.assertEqual(set(regions), {'9:36', '9:37'})
+        self.assertEqual(regions_within_radius(19.0, 73.0, 5), ['9:36'])
+
+    @override_settings(SHARD_FORWARDING='redirect')
+    def test_middleware_redirects_to_the_owning_shard(self):
+        user = create_user('farmer', 'farmer', FARM_LAT, FARM_LON)
+        client = APIClient()
+        client.force_authenticate(user)
+        response = client.get('/api/jobs/labour_count/', {'latitude': 18.52, 'longitude': 73.85})
+        self.assertEqual(response.status_code, 307)
+        self.assertEqual(response['Location'],
+                         'https://west.example.com/api/jobs/labour_count/?latitude=18.52&longitude=73.85')
+        self.assertEqual(response['X-Shard'], 'west')
+
+        local = client.get('/api/jobs/labour_count/', {'latitude': 28.61, 'longitude': 77.21})
+        self.assertEqual(local.status_code, 200)
+        self.assertEqual(local['X-Shard'], 'rest')
+        self.assertEqual(client.get('/api/jobs/')['X-Shard'], 'rest')
+
+        # route_matrix is located by its first origin
+        body = {'origins': [{'lat': 18.52, 'lon': 73.85}], 'destinations': [{'lat': 28.61, 'lon': 77.21}]}
+        self.assertEqual(client.post('/api/jobs/route_matrix/', body, format='json')['X-Shard'], 'west')
+
+    def test_middleware_proxies_posts_located_by_their_body(self):
+        farmer = create_user('farmer', 'farmer', 28.61, 77.21)
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(farmer).access_token}')
+        job = {
+            'title': 'Harvest', 'description': 'Cut and stack wheat', 'address': 'Pune', 'category': 'harvesting', 'wage_per_day': '500', 'duration_days': 2,
+            'required_workers': 3, 'start_date': '2026-11-01', 'end_date': '2026-11-03',
+            'latitude': 18.52, 'longitude': 73.85, 'radius_km': 10,
+        }
+        with mock.patch('api.middleware.urllib.request.urlopen') as urlopen:
+            upstream = urlopen.return_value.__enter__.return_value
+            upstream.status = 201
+            upstream.read.return_value = b'{"id": 7}'
+            upstream.headers = {'Content-Type': 'application/json'}
+            response = client.post('/api/jobs/', job, format='json')
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.content, b'{"id": 7}')
+        self.assertEqual(response['X-Shard'], 'west')
+        forwarded = urlopen.call_args.args[0]
+        self.assertEqual(forwarded.full_url, 'https://west.example.com/api/jobs/')
+        self.assertEqual(forwarded.get_method(), 'POST')
+        self.assertEqual(json.loads(forwarded.data)['latitude'], 18.52)
+        self.assertEqual(forwarded.get_header('Authorization'), client._credentials['HTTP_AUTHORIZATION'])
+        self.assertFalse(Job.objects.exists())
+
+        # A job in this shard's region is created here
+        local = client.post('/api/jobs/', dict(job, latitude=28.61, longitude=77.21), format='json')
+        self.assertEqual(local.status_code, 201)
+        self.assertEqual(local['X-Shard'], 'rest')
+
+    def test_nearby_is_located_by_the_profile(self):
+        labour = create_user('labour', 'labour', FARM_LAT, FARM_LON)
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(labour).access_token}')
+        with mock.patch('api.middleware.urllib.request.urlopen', side_effect=OSError('refused')):
+            response = client.get('/api/jobs/nearby/')
+        self.assertEqual(response.status_code, 502)
+        self.assertEqual(response['X-Shard'], 'west')
+
+    def test_region_column_follows_location(self):
+        labour = create_user('labour', 'labour', FARM_LAT, FARM_LON)
+        self.assertEqual(labour.region, '9:36')
+        labour.latitude, labour.longitude = 28.61, 77.21
+        labour.save(update_fields=['latitude', 'longitude'])
+        labour.refresh_from_db()
+        self.assertEqual(labour.region, '14:38')
+
+
+@override_settings(DEBUG=True, ALLOWED_HOSTS=['*'], LANDMARK_HIERARCHY_PATH=None, LANDMARK_TABLE_PATH=None,
+                   LANDMARK_GRAPH_VERSION_PATH=None, ROAD_NETWORK_PATH=None)
+class QueryBudgetTests(TestCase):
+    """
+    Every list endpoint in api/urls.py must run the same number of SQL queries
+    whatever the number of rows it returns. Each endpoint is requested after
+    seeding data of increasing size and the X-Query-Count header
+    (QueryCountMiddleware) has to stay flat.
+    """
+
+    # Cumulative rows of each kind per measurement; kept under the nearby page size
+    SIZES = (2, 5, 10)
+
+    def setUp(self):
+        route_cache().clear()
+        self.farmer = self._user('farmer', 'farmer', FARM_LAT, FARM_LON)
+        self.labour = self._user('labour', 'labour', FARM_LAT + 0.01, FARM_LON + 0.01)
+        self.seeded = 0
+        self.first_job = None
+
+    def _user(self, username, role, lat, lon):
+        return CustomUser.objects.create_user(
+            username=username, email=f'{username}@example.com', password='x', role=role,
+            phone='9999999999', latitude=lat, longitude=lon, is_available=True,
+        )
+
+    def _seed_to(self, size):
+        for i in range(self.seeded, size):
+            job = Job.objects.create(
+                farmer=self.farmer, title=f'Job {i}', description='d', category='harvesting',
+                wage_per_day=400, duration_days=2, required_workers=3,
+                start_date=date(2026, 1, 1), end_date=date(2026, 1, 3), address='Pune',
+                latitude=FARM_LAT + i * 0.001, longitude=FARM_LON, radius_km=10,
+            )
+            self.first_job = self.first_job or job
+            application = JobApplication.objects.create(job=job, labour=self.labour, status='completed')
+            LabourRating.objects.create(
+                job_application=application, farmer=self.farmer, labour=self.labour, rating=5,
+            )
+            LabourEarning.objects.create(
+                job_application=application, labour=self.labour, job_title=job.title,
+                farmer_name='Farmer', wage_per_day=400, days_worked=2, total_amount=800,
+                job_start_date=job.start_date, job_end_date=job.end_date,
+            )
+            # Other labours applying to the same job grow the per-job application list
+            other = self._user(f'labour{i}', 'labour', FARM_LAT - 0.01, FARM_LON)
+            JobApplication.objects.create(job=self.first_job, labour=other, status='accepted')
+            LabourSkill.objects.create(
+                labour=self.labour, skill_name=f'Skill {i}', category='harvesting',
+                experience_level='beginner',
+            )
+            equipment = Equipment.objects.create(
+                title=f'Tractor {i}', description='d', price=1000, category='Tractors',
+                condition='Used - Good', location='Pune', seller=self.farmer,
+            )
+            inquiry = Inquiry.objects.create(
+                equipment=equipment, seller=self.farmer, buyer_name='Buyer',
+                buyer_email='buyer@example.com', message='Interested',
+            )
+            for user in (self.farmer, self.labour):
+                Notification.objects.create(
+                    user=user, title='n', message='m', equipment=equipment, inquiry=inquiry, job=job,
+                )
+        self.seeded = size
+
+    def _endpoints(self):
+        labour_id = self.labour.id
+        return [
+            (self.farmer, '/api/jobs/', {}),
+            (self.farmer, f'/api/jobs/{self.first_job.id}/applications/', {}),
+            (self.farmer, f'/api/jobs/{self.first_job.id}/pickup_route/', {}),
+            (self.farmer, '/api/jobs/labour_count/', {'latitude': FARM_LAT, 'longitude': FARM_LON}),
+            (self.farmer, '/api/jobs/route/', {
+                'from_lat': FARM_LAT, 'from_lon': FARM_LON, 'to_lat': FARM_LAT + 0.05, 'to_lon': FARM_LON,
+            }),
+            (self.farmer, '/api/job-applications/', {}),
+            (self.farmer, '/api/labour-ratings/', {}),
+            (self.farmer, '/api/labour-ratings/labour_ratings/', {'labour_id': labour_id}),
+            (self.farmer, '/api/labour-skills/', {}),
+            (self.farmer, '/api/labour-earnings/', {}),
+            (self.farmer, '/api/notifications/', {}),
+            (self.farmer, '/api/equipment/', {}),
+            (self.farmer, '/api/inquiries/', {}),
+            (self.farmer, '/api/inquiries/mine/', {}),
+            (self.labour, '/api/jobs/', {}),
+            (self.labour, '/api/jobs/nearby/', {}),
+            (self.labour, '/api/job-applications/', {}),
+            (self.labour, '/api/labour-ratings/', {}),
+            (self.labour, '/api/labour-ratings/my_average_rating/', {}),
+            (self.labour, '/api/labour-skills/', {}),
+            (self.labour, '/api/labour-earnings/', {}),
+            (self.labour, '/api/labour-earnings/summary/', {}),
+            (self.labour, '/api/notifications/', {}),
+        ]
+
+    def _query_counts(self):
+        counts = {}
+        for user, path, params in self._endpoints():
+            client = APIClient()
+            client.force_authenticate(user)
+            response = client.get(path, params)
+            self.assertEqual(response.status_code, 200, f'{user.role} GET {path}: {response.content[:200]}')
+            counts[(user.role, path)] = int(response['X-Query-Count'])
+        return counts
+
+    def test_query_count_does_not_grow_with_rows(self):
+        self._seed_to(self.SIZES[0])
+        self._query_counts()  # warm process-wide caches (e.g. the landmark graph)
+        baseline = self._query_counts()
+        for size in self.SIZES[1:]:
+            self._seed_to(size)
+            counts = self._query_counts()
+            for endpoint, count in counts.items():
+                with self.subTest(endpoint=endpoint, rows=size):
+                    self.assertEqual(
+                        count, baseline[endpoint],
+                        f'{endpoint} ran {baseline[endpoint]} queries with {self.SIZES[0]} rows '
+                        f'and {count} with {size}',
+                    )
+
+    def test_query_time_header(self):
+        self._seed_to(1)
+        client = APIClient()
+        client.force_authenticate(self.labour)
+        response = client.get('/api/jobs/')
+        self.assertGreater(int(response['X-Query-Count']), 0)
+        self.assertGreaterEqual(float(response['X-Query-Time-Ms']), 0.0)
+
+
+@override_settings(LANDMARK_HIERARCHY_PATH=None, LANDMARK_TABLE_PATH=None, LANDMARK_GRAPH_VERSION_PATH=None,
+                   ROAD_NETWORK_PATH=None)
+class LandmarkGraphCacheTests(TestCase):
+    def setUp(self):
+        # Graphs loaded by earlier tests saw rows that have since been rolled back
+        clear_landmark_graph()
+        self.pune = Landmark.objects.create(name='Pune', location_type='mandi', latitude=18.52, longitude=73.86)
+        self.nashik = Landmark.objects.create(name='Nashik', location_type='mandi', latitude=20.0, longitude=73.79)
+        self.ahmednagar = Landmark.objects.create(
+            name='Ahmednagar', location_type='market', latitude=19.09, longitude=74.74,
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            LandmarkDistance.objects.create(
+                from_landmark=self.pune, to_landmark=self.nashik, distance_km=400, travel_time_min=600,
+            )
+
+    def _route_labels(self):
+        route = compute_optimal_route(18.5, 73.85, 20.0, 73.8, [], get_landmark_graph())
+        return [w['label'] for w in route['waypoints']]
+
+    def test_steady_state_route_reads_no_landmark_rows(self):
+        get_landmark_graph()
+        with CaptureQueriesContext(connection) as queries:
+            self._route_labels()
+        self.assertEqual(len(queries), 0)
+
+    def test_saved_and_deleted_distances_patch_the_graph(self):
+        self.assertEqual(self._route_labels(), ['Your location', 'Pune', 'Nashik', 'Destination'])
+        with self.captureOnCommitCallbacks(execute=True):
+            LandmarkDistance.objects.create(
+                from_landmark=self.pune, to_landmark=self.ahmednagar, distance_km=120, travel_time_min=180,
+            )
+            LandmarkDistance.objects.create(
+                from_landmark=self.ahmednagar, to_landmark=self.nashik, distance_km=150, travel_time_min=200,
+            )
+        with CaptureQueriesContext(connection) as queries:
+            labels = self._route_labels()
+        self.assertEqual(len(queries), 0)
+        self.assertEqual(labels, ['Your location', 'Pune', 'Ahmednagar', 'Nashik', 'Destination'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.ahmednagar.delete()
+        self.assertEqual(self._route_labels(), ['Your location', 'Pune', 'Nashik', 'Destination'])
+
+    def test_version_file_reaches_other_processes(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'landmark_graph.version')
+            with override_settings(LANDMARK_GRAPH_VERSION_PATH=path):
+                graph = get_landmark_graph()
+                self.assertIs(get_landmark_graph(), graph)
+                # A management command in another process publishes a new version
+                with open(f'{path}.tmp', 'w') as f:
+                    f.write('rebuilt')
+                os.replace(f'{path}.tmp', path)
+                reloaded = get_landmark_graph()
+                self.assertIsNot(reloaded, graph)
+                self.assertEqual(reloaded.version, 'rebuilt')
+                clear_landmark_graph()
+                self.assertNotEqual(get_landmark_graph().version, 'rebuilt')
+
+
+class AltSearchTests(SimpleTestCase):
+    def _random_graph(self, rng, size):
+        graph = {str(i): [] for i in range(size)}
+        for i in range(size):
+            for j in rng.sample(range(size), 3):
+                if i != j:
+                    w = rng.uniform(1, 100)
+                    graph[str(i)].append((str(j), w))
+                    graph[str(j)].append((str(i), w))
+        return CSRGraph.from_adjacency(graph)
+
+    def test_alt_matches_dijkstra_and_settles_fewer_nodes(self):
+        rng = random.Random(7)
+        graph = self._random_graph(rng, 300)
+        anchors = select_anchors(graph, 6)
+        plain_settled = alt_settled = 0
+        for _ in range(100):
+            a, b = rng.sample(graph.node_ids, 2)
+            plain_stats, alt_stats = {}, {}
+            path, cost = dijkstra(graph, a, b, plain_stats)
+            alt_path, alt_cost = alt_search(graph, a, b, anchors, alt_stats)
+            self.assertAlmostEqual(cost, alt_cost)
+            self.assertEqual((alt_path[0], alt_path[-1]), (a, b))
+            plain_settled += plain_stats['settled']
+            alt_settled += alt_stats['settled']
+        self.assertLess(alt_settled, plain_settled)
+
+    def test_bidirectional_matches_dijkstra(self):
+        rng = random.Random(11)
+        undirected = self._random_graph(rng, 300)
+        directed = CSRGraph.from_adjacency({
+            str(i): [(str(j), rng.uniform(1, 100)) for j in rng.sample(range(300), 3) if j != i]
+            for i in range(300)
+        })
+        for graph in (undirected, directed):
+            weights = {(u, v): w for u in graph.node_ids for v, w in graph.neighbours(u)}
+            for _ in range(100):
+                a, b = rng.sample(graph.node_ids, 2)
+                path, cost = dijkstra(graph, a, b)
+                bi_path, bi_cost = bidirectional_dijkstra(graph, a, b)
+                self.assertAlmostEqual(cost, bi_cost)
+                if path:
+                    self.assertEqual((bi_path[0], bi_path[-1]), (a, b))
+                    self.assertAlmostEqual(sum(weights[e] for e in zip(bi_path, bi_path[1:])), bi_cost)
+                else:
+                    self.assertEqual(bi_path, [])
+        self.assertEqual(bidirectional_dijkstra(undirected, '5', '5'), (['5'], 0.0))
+
+    def test_disconnected_components_get_anchors_and_no_path(self):
+        graph = CSRGraph.from_adjacency(
+            {'a': [('b', 1.0)], 'b': [('a', 1.0)], 'c': [('d', 2.0)], 'd': [('c', 2.0)]}
+        )
+        anchors = select_anchors(graph, 2)
+        anchor_ids = {graph.node_ids[u] for u in anchors}
+        self.assertEqual(len({'a', 'b'} & anchor_ids), 1)
+        self.assertEqual(len({'c', 'd'} & anchor_ids), 1)
+        self.assertEqual(alt_search(graph, 'a', 'c', anchors), ([], float('inf')))
+        self.assertEqual(alt_search(graph, 'c', 'd', anchors), (['c', 'd'], 2.0))
+
+
+def random_landmark_graph(rng, size):
+    """Landmarks around Pune, each with stored distances to three random others."""
+    nodes = {
+        f'landmark_{i}': {'lat': rng.uniform(18, 21), 'lon': rng.uniform(73, 76), 'label': str(i), 'type': 'landmark'}
+        for i in range(size)
+    }
+    distances = {}
+    for i in range(size):
+        for j in rng.sample(range(size), 3):
+            if i != j:
+                distances.setdefault(f'landmark_{i}', {})[f'landmark_{j}'] = (rng.uniform(5, 200), rng.randint(10, 300))
+    return LandmarkGraph(nodes, distances, version='test')
+
+
+class ContractionHierarchyTests(SimpleTestCase):
+    def test_queries_match_dijkstra(self):
+        rng = random.Random(13)
+        graph = random_landmark_graph(rng, 300)
+        csr = graph.csr
+        hierarchy = build_contraction_hierarchy(csr, graph.fingerprint)
+        # Both directions of a pair may be stored with different distances; the cheaper one counts
+        weights = {}
+        for u in csr.node_ids:
+            for v, w in csr.neighbours(u):
+                weights[u, v] = min(w, weights.get((u, v), w))
+        for _ in range(200):
+            a, b = rng.sample(csr.node_ids, 2)
+            path, cost = dijkstra(csr, a, b)
+            ch_path, ch_cost = hierarchy.query(a, b)
+            if path:
+                self.assertAlmostEqual(cost, ch_cost)
+                self.assertEqual((ch_path[0], ch_path[-1]), (a, b))
+                self.assertAlmostEqual(sum(weights[e] for e in zip(ch_path, ch_path[1:])), ch_cost)
+            else:
+                self.assertEqual(ch_path, [])
+        self.assertEqual(hierarchy.query('landmark_5', 'landmark_5'), (['landmark_5'], 0.0))
+
+    def test_stored_hierarchy_is_used_only_for_the_same_graph(self):
+        rng = random.Random(17)
+        graph = random_landmark_graph(rng, 50)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'ch.bin')
+            build_contraction_hierarchy(graph.csr, graph.fingerprint).save(path)
+            loaded = ContractionHierarchy.load(path)
+            self.assertEqual(loaded.fingerprint, graph.fingerprint)
+            a, b = graph.node_ids[0], graph.node_ids[-1]
+            self.assertEqual(loaded.query(a, b), build_contraction_hierarchy(graph.csr, '').query(a, b))
+
+            with override_settings(LANDMARK_HIERARCHY_PATH=path, LANDMARK_HIERARCHY_AUTO_REBUILD=False):
+                self.assertIsNotNone(LandmarkGraph(graph.nodes, graph.distances, 'v1').hierarchy)
+                changed = graph.with_distance(0, 1, (1.0, 1), 'v2')
+                self.assertIsNone(changed.hierarchy)
+        self.assertIsNone(ContractionHierarchy.load(path))
+
+    def test_auto_rebuild_runs_in_one_process_at_a_time(self):
+        graph = random_landmark_graph(random.Random(23), 30)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'ch.bin')
+            with override_settings(LANDMARK_HIERARCHY_PATH=path, LANDMARK_HIERARCHY_AUTO_REBUILD=True):
+                # Another worker holds the lock: this one does not build
+                open(f'{path}.lock', 'w').close()
+                with mock.patch('api.landmark_graph.threading.Thread') as thread:
+                    schedule_hierarchy_rebuild(LandmarkGraph(graph.nodes, graph.distances, 'v1'))
+                thread.assert_not_called()
+
+                os.remove(f'{path}.lock')
+                current = LandmarkGraph(graph.nodes, graph.distances, 'v2')
+                with mock.patch('api.landmark_graph.threading.Thread') as thread:
+                    schedule_hierarchy_rebuild(current)
+                    # Stale (here: missing) files are never used
+                    self.assertIsNone(current.hierarchy)
+                thread.assert_called_once()
+                self.assertTrue(os.path.exists(f'{path}.lock'))
+                with mock.patch('api.landmark_graph.current_version', return_value='v2'):
+                    thread.call_args.kwargs['target'](*thread.call_args.kwargs['args'])
+                self.assertFalse(os.path.exists(f'{path}.lock'))
+                # Graphs that already looked for the file see the rebuilt one
+                self.assertIsNotNone(current.hierarchy)
+
+    def test_rebuild_catches_up_with_changes_made_during_it(self):
+        graph = random_landmark_graph(random.Random(29), 30)
+        changed = graph.with_distance(0, 1, (1.0, 1), 'v2')
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'ch.bin')
+            with override_settings(LANDMARK_HIERARCHY_PATH=path, LANDMARK_HIERARCHY_AUTO_REBUILD=True):
+                with mock.patch('api.landmark_graph.threading.Thread') as thread:
+                    schedule_hierarchy_rebuild(graph)
+                with mock.patch('api.landmark_graph.current_version', return_value='v2'), \
+                        mock.patch('api.landmark_graph.get_landmark_graph', return_value=changed):
+                    thread.call_args.kwargs['target'](*thread.call_args.kwargs['args'])
+            self.assertEqual(ContractionHierarchy.load(path).fingerprint, changed.fingerprint)
+
+
+class LandmarkTableTests(SimpleTestCase):
+    def test_table_paths_match_dijkstra(self):
+        rng = random.Random(19)
+        graph = random_landmark_graph(rng, 120)
+        csr = graph.csr
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'table.bin')
+            # Two worker processes, rows split across several tasks
+            build_landmark_table(csr, graph.fingerprint, path, workers=2)
+            table = LandmarkTable.load(path)
+            self.assertEqual(table.fingerprint, graph.fingerprint)
+            for _ in range(200):
+                a, b = rng.sample(csr.node_ids, 2)
+                path_ids, cost = dijkstra(csr, a, b)
+                table_ids, table_cost = table.path(a, b)
+                self.assertAlmostEqual(table.cost(a, b), cost)
+                if path_ids:
+                    self.assertAlmostEqual(table_cost, cost)
+                    self.assertEqual((table_ids[0], table_ids[-1]), (a, b))
+                    self.assertAlmostEqual(
+                        sum(min(w for v, w in csr.neighbours(u) if v == x) for u, x in zip(table_ids, table_ids[1:])),
+                        cost,
+                    )
+                else:
+                    self.assertEqual(table_ids, [])
+            self.assertEqual(table.path('landmark_3', 'landmark_3'), (['landmark_3'], 0.0))
+
+            with override_settings(LANDMARK_TABLE_PATH=path):
+                self.assertIsNotNone(LandmarkGraph(graph.nodes, graph.distances, 'v1').table)
+                self.assertIsNone(graph.with_distance(0, 1, (1.0, 1), 'v2').table)
+
+
+class SparseLocalGraphTests(SimpleTestCase):
+    def _points(self, rng, size, lat_range=(18.0, 19.5), lon_range=(73.0, 74.5)):
+        return [rng.uniform(*lat_range) for _ in range(size)], [rng.uniform(*lon_range) for _ in range(size)]
+
+    def _all_pairs(self, lats, lons, radius_km):
+        return {
+            (i, j)
+            for i in range(len(lats))
+            for j in range(i + 1, len(lats))
+            if haversine_km(lats[i], lons[i], lats[j], lons[j]) <= radius_km
+        }
+
+    def test_pairs_match_all_pairs(self):
+        rng = random.Random(3)
+        for lat_range, radius in (((18.0, 19.5), 12), ((18.0, 19.5), 80), ((60.0, 70.0), 150)):
+            lats, lons = self._points(rng, 250, lat_range)
+            found = {(i, j) for i, j, _ in pairs_within_radius(lats, lons, radius)}
+            self.assertEqual(found, self._all_pairs(lats, lons, radius))
+
+    def test_max_neighbours_keeps_nearest_links(self):
+        rng = random.Random(4)
+        lats, lons = self._points(rng, 200)
+        capped = {(i, j) for i, j, _ in pairs_within_radius(lats, lons, 30, max_neighbours=3)}
+        self.assertTrue(capped <= self._all_pairs(lats, lons, 30))
+        degree = {}
+        for i, j in capped:
+            degree[i] = degree.get(i, 0) + 1
+            degree[j] = degree.get(j, 0) + 1
+        self.assertTrue(all(degree.get(i, 0) >= 3 for i in range(len(lats))))
+
+    def test_shortest_paths_match_all_pairs_graph(self):
+        rng = random.Random(5)
+        lats, lons = self._points(rng, 300)
+        labours = [
+            {'id': f'labour_{i}', 'lat': lat, 'lon': lon, 'label': str(i)}
+            for i, (lat, lon) in enumerate(zip(lats, lons))
+        ]
+        landmarks = LandmarkGraph(
+            {'landmark_1': {'lat': 18.6, 'lon': 73.9, 'label': 'Mandi', 'type': 'landmark'},
+             'landmark_2': {'lat': 26.9, 'lon': 75.8, 'label': 'Far mandi', 'type': 'landmark'}},
+            {'landmark_1': {'landmark_2': (1200.0, 1500)}},
+            version='test',
+        )
+        radius = 15
+        graph, node_info = build_local_graph(18.1, 73.1, 19.4, 74.4, labours, landmarks, connect_radius_km=radius)
+
+        reference = {nid: [] for nid in node_info}
+        for nid, edges in landmarks.csr.to_adjacency().items():
+            reference[nid].extend(edges)
+        ids = list(node_info)
+        for a in range(len(ids)):
+            for b in range(a + 1, len(ids)):
+                p, q = node_info[ids[a]], node_info[ids[b]]
+                d = haversine_km(p['lat'], p['lon'], q['lat'], q['lon'])
+                if d <= radius:
+                    w = edge_weight_km(d, travel_time_min(d))
+                    reference[ids[a]].append((ids[b], w))
+                    reference[ids[b]].append((ids[a], w))
+
+        reference = CSRGraph.from_adjacency(reference)
+        expected = shortest_distances(reference, reference.index['origin'])
+        actual = shortest_distances(graph, graph.index['origin'])
+        self.assertEqual(set(graph.node_ids), set(reference.node_ids))
+        for nid in reference.node_ids:
+            self.assertAlmostEqual(actual[graph.index[nid]], expected[reference.index[nid]], places=9)
+        self.assertAlmostEqual(dijkstra(graph, 'origin', 'dest')[1], dijkstra(reference, 'origin', 'dest')[1])
+
+
+@override_settings(LANDMARK_HIERARCHY_PATH=None, LANDMARK_TABLE_PATH=None, LANDMARK_GRAPH_VERSION_PATH=None,
+                   ROAD_NETWORK_PATH=None)
+class RouteLegMetricsTests(SimpleTestCase):
+    def _landmarks(self, b_lat, b_lon, stored):
+        return LandmarkGraph(
+            {'landmark_1': {'lat': 18.5, 'lon': 73.8, 'label': 'Mandi', 'type': 'landmark'},
+             'landmark_2': {'lat': b_lat, 'lon': b_lon, 'label': 'Market', 'type': 'landmark'}},
+            {'landmark_1': {'landmark_2': stored}},
+            version='test',
+        )
+
+    def test_slm_route_reports_stored_landmark_distance(self):
+        landmarks = self._landmarks(19.5, 74.5, (150.0, 200))
+        origin, dest = (18.52, 73.82), (19.48, 74.52)
+        route = compute_optimal_route(*origin, *dest, [], landmarks)
+        self.assertEqual(route['algorithm_used'], 'slm')
+        d_orig = haversine_km(*origin, 18.5, 73.8)
+        d_dest = haversine_km(19.5, 74.5, *dest)
+        self.assertAlmostEqual(route['total_distance_km'], round(d_orig + 150.0 + d_dest, 2))
+        self.assertEqual(route['total_time_min'], travel_time_min(d_orig) + 200 + travel_time_min(d_dest))
+
+    def test_dijkstra_summary_sums_edge_metrics(self):
+        # 40 km apart in a straight line, 48 km by road: too far for a local link
+        landmarks = self._landmarks(18.86, 73.8, (48.0, 70))
+        origin, dest = (18.47, 73.8), (18.89, 73.8)
+        graph, node_info = build_local_graph(*origin, *dest, [], landmarks, connect_radius_km=15)
+        path, _ = shortest_path(graph, 'origin', 'dest')
+        self.assertEqual(path, ['origin', 'landmark_1', 'landmark_2', 'dest'])
+        legs = path_legs(graph, path)
+        self.assertEqual(legs[1], (48.0, 70.0))
+        summary = route_summary(path, node_info, 'dijkstra', legs)
+        self.assertAlmostEqual(summary['total_distance_km'], round(sum(km for km, _ in legs), 2))
+        self.assertEqual(summary['total_time_min'], sum(int(t) for _, t in legs))
+        self.assertEqual(summary['total_time_min'], travel_time_min(legs[0][0]) + 70 + travel_time_min(legs[2][0]))
+
+
+@override_settings(LANDMARK_HIERARCHY_PATH=None, LANDMARK_TABLE_PATH=None, LANDMARK_GRAPH_VERSION_PATH=None,
+                   ROAD_NETWORK_PATH=None)
+class RoutingProfileTests(SimpleTestCase):
+    def setUp(self):
+        self.landmarks = LandmarkGraph(
+            {'landmark_1': {'lat': 18.5, 'lon': 73.8, 'label': 'Mandi', 'type': 'landmark'},
+             'landmark_2': {'lat': 19.5, 'lon': 74.5, 'label': 'Market', 'type': 'landmark'}},
+            {'landmark_1': {'landmark_2': (150.0, 200)}},
+            version='test',
+        )
+
+    def test_profiles_share_graph_topology(self):
+        base = self.landmarks.csr
+        self.assertIs(self.landmarks.profile_csr(get_profile()), base)
+        tractor = self.landmarks.profile_csr(get_profile('tractor_morning'))
+        self.assertIs(self.landmarks.profile_csr(get_profile('tractor_morning')), tractor)
+        for name in ('node_ids', 'offsets', 'targets', 'lengths'):
+            self.assertIs(getattr(tractor, name), getattr(base, name))
+        # 150 km at the tractor's 25 km/h is slower than 200 stored minutes even in the morning window
+        self.assertEqual(list(tractor.minutes), [150 / 25 * 60] * 2)
+        self.assertTrue(all(t > b for t, b in zip(tractor.weights, base.weights)))
+        # Trucks keep the stored time, slowed down by the morning window
+        self.assertEqual(list(self.landmarks.profile_csr(get_profile('truck_morning')).minutes), [200 * 1.6] * 2)
+        with self.assertRaises(ValueError):
+            get_profile('rocket_offpeak')
+
+    def test_route_costed_for_profile(self):
+        origin, dest = (18.52, 73.82), (19.48, 74.52)
+        default = compute_optimal_route(*origin, *dest, [], self.landmarks)
+        self.assertEqual(compute_optimal_route(*origin, *dest, [], self.landmarks, get_profile()), default)
+
+        tractor = get_profile('tractor_offpeak')
+        route = compute_optimal_route(*origin, *dest, [], self.landmarks, tractor)
+        self.assertEqual(route['algorithm_used'], 'slm')
+        self.assertEqual(route['total_distance_km'], default['total_distance_km'])
+        d_orig = haversine_km(*origin, 18.5, 73.8)
+        d_dest = haversine_km(19.5, 74.5, *dest)
+        self.assertEqual(route['total_time_min'],
+                         tractor.travel_minutes(d_orig) + 360 + tractor.travel_minutes(d_dest))
+        self.assertGreater(route['total_time_min'], default['total_time_min'])
+
+
+@override_settings(LANDMARK_HIERARCHY_PATH=None, LANDMARK_TABLE_PATH=None, LANDMARK_GRAPH_VERSION_PATH=None,
+                   ROAD_NETWORK_PATH=None)
+class RouteCacheTests(TestCase):
+    def setUp(self):
+        clear_landmark_graph()
+        route_cache().clear()
+        self.pune = Landmark.objects.create(name='Pune', location_type='mandi', latitude=18.52, longitude=73.86)
+        self.nashik = Landmark.objects.create(name='Nashik', location_type='mandi', latitude=20.0, longitude=73.79)
+        with self.captureOnCommitCallbacks(execute=True):
+            LandmarkDistance.objects.create(
+                from_landmark=self.pune, to_landmark=self.nashik, distance_km=400, travel_time_min=600,
+            )
+        farmer = CustomUser.objects.create_user(
+            username='farmer', email='farmer@example.com', password='x', role='farmer',
+            phone='9999999999', latitude=FARM_LAT, longitude=FARM_LON,
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(farmer)
+
+    def _route(self, from_lat=18.5, to_lat=20.0, label='Nashik'):
+        return self.client.get('/api/jobs/route/', {
+            'from_lat': from_lat, 'from_lon': 73.85, 'to_lat': to_lat, 'to_lon': 73.8, 'to_label': label,
+        })
+
+    def test_repeated_route_is_served_from_cache(self):
+        first = self._route()
+        self.assertEqual(first['X-Route-Cache'], 'miss')
+        with CaptureQueriesContext(connection) as queries:
+            # Same grid cell (0.001 degree) as the first request
+            second = self._route(from_lat=18.5002)
+        self.assertEqual(second['X-Route-Cache'], 'hit')
+        self.assertEqual(len([q for q in queries if 'api_customuser' in q['sql'] and 'role' in q['sql']]), 0)
+        self.assertEqual(second.data['total_distance_km'], first.data['total_distance_km'])
+        self.assertEqual(second.data['waypoints'][0]['lat'], 18.5002)
+        self.assertEqual(first.data['waypoints'][0]['lat'], 18.5)
+
+        self.assertEqual(self._route(from_lat=18.51)['X-Route-Cache'], 'miss')
+        self.assertEqual(self._route(label='Other')['X-Route-Cache'], 'miss')
+        self.assertEqual(route_cache_stats(), {'hits': 1, 'misses': 3, 'hit_rate': 0.25})
+
+    def test_profile_routes_are_cached_separately(self):
+        truck = self._route()
+        params = {'from_lat': 18.5, 'from_lon': 73.85, 'to_lat': 20.0, 'to_lon': 73.8, 'to_label': 'Nashik'}
+        tractor = self.client.get('/api/jobs/route/', {**params, 'profile': 'tractor_morning'})
+        self.assertEqual(tractor.status_code, 200)
+        self.assertEqual(tractor['X-Route-Cache'], 'miss')
+        self.assertGreater(tractor.data['total_time_min'], truck.data['total_time_min'])
+        default = self.client.get('/api/jobs/route/', {**params, 'profile': 'truck_offpeak'})
+        self.assertEqual(default['X-Route-Cache'], 'hit')
+        self.assertEqual(self.client.get('/api/jobs/route/', {**params, 'profile': 'rocket'}).status_code, 400)
+
+    def test_landmark_change_invalidates_cached_routes(self):
+        self.assertEqual(self._route()['X-Route-Cache'], 'miss')
+        self.assertEqual(self._route()['X-Route-Cache'], 'hit')
+        with self.captureOnCommitCallbacks(execute=True):
+            ahmednagar = Landmark.objects.create(
+                name='Ahmednagar', location_type='market', latitude=19.09, longitude=74.74,
+            )
+            LandmarkDistance.objects.create(
+                from_landmark=self.pune, to_landmark=ahmednagar, distance_km=120, travel_time_min=150,
+            )
+            LandmarkDistance.objects.create(
+                from_landmark=ahmednagar, to_landmark=self.nashik, distance_km=150, travel_time_min=180,
+            )
+        response = self._route()
+        self.assertEqual(response['X-Route-Cache'], 'miss')
+        self.assertEqual(
+            [w['label'] for w in response.data['waypoints']],
+            ['Your location', 'Pune', 'Ahmednagar', 'Nashik', 'Nashik'],
+        )
+
+    def test_labour_change_invalidates_nearby_cached_routes(self):
+        self.assertEqual(self._route()['X-Route-Cache'], 'miss')
+        with self.captureOnCommitCallbacks(execute=True):
+            # Neither a labour outside the origin's regions nor a farmer is on this route
+            far = create_user('far', 'labour', 28.61, 77.21)
+            create_user('farmer2', 'farmer', 18.5, 73.85)
+        self.assertEqual(self._route()['X-Route-Cache'], 'hit')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            labour = create_user('near', 'labour', 18.51, 73.86)
+        self.assertEqual(self._route()['X-Route-Cache'], 'miss')
+        self.assertEqual(self._route()['X-Route-Cache'], 'hit')
+
+        # Moving the far labour into the origin's region invalidates it as well
+        far.refresh_from_db()
+        with self.captureOnCommitCallbacks(execute=True):
+            far.latitude, far.longitude = 18.49, 73.84
+            far.save(update_fields=['latitude', 'longitude'])
+        self.assertEqual(self._route()['X-Route-Cache'], 'miss')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            labour.last_login = None
+            labour.save(update_fields=['last_login'])
+        self.assertEqual(self._route()['X-Route-Cache'], 'hit')
+        with self.captureOnCommitCallbacks(execute=True):
+            labour.delete()
+        self.assertEqual(self._route()['X-Route-Cache'], 'miss')
+
+
+    def test_failing_cache_falls_back_to_computing_the_route(self):
+        expected = self._route().data
+        broken = mock.Mock(**{name: mock.Mock(side_effect=ConnectionError('cache down'))
+                              for name in ('get', 'get_many', 'set', 'add', 'incr')})
+        with mock.patch('api.route_cache.route_cache', return_value=broken):
+            response = self._route()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Route-Cache'], 'miss')
+        self.assertEqual(response.data['total_distance_km'], expected['total_distance_km'])
+
+
+@override_settings(LANDMARK_HIERARCHY_PATH=None, LANDMARK_TABLE_PATH=None, LANDMARK_GRAPH_VERSION_PATH=None,
+                   ROAD_NETWORK_PATH=None)
+class RouteMatrixTests(TestCase):
+    def setUp(self):
+        clear_landmark_graph()
+        rng = random.Random(23)
+        self.labour_nodes = [
+            {'id': f'labour_{i}', 'lat': FARM_LAT + rng.uniform(-0.4, 0.4),
+             'lon': FARM_LON + rng.uniform(-0.4, 0.4), 'label': f'L{i}'}
+            for i in range(60)
+        ]
+        self.landmarks = LandmarkGraph(
+            {'landmark_1': {'lat': 18.6, 'lon': 73.9, 'label': 'Pune mandi', 'type': 'landmark'},
+             'landmark_2': {'lat': 19.99, 'lon': 73.79, 'label': 'Nashik mandi', 'type': 'landmark'}},
+            {'landmark_1': {'landmark_2': (210.0, 300)}},
+            version='test',
+        )
+
+    def test_matrix_matches_single_routes(self):
+        origins = [{'lat': FARM_LAT, 'lon': FARM_LON}, {'lat': FARM_LAT + 0.2, 'lon': FARM_LON - 0.1}]
+        # Labour positions (already graph nodes) and one long trip that goes through SLM
+        destinations = [
+            {'lat': n['lat'], 'lon': n['lon'], 'label': n['label']} for n in self.labour_nodes[:8]
+        ] + [{'lat': 20.0, 'lon': 73.8, 'label': 'Nashik'}]
+        matrix = compute_route_matrix(origins, destinations, self.labour_nodes, self.landmarks, include_routes=True)
+        self.assertEqual(len(matrix['distance_km']), 2)
+        for i, o in enumerate(origins):
+            self.assertEqual(len(matrix['routes'][i]), len(destinations))
+            for j, d in enumerate(destinations):
+                single = compute_optimal_route(
+                    o['lat'], o['lon'], d['lat'], d['lon'], [dict(d, id='dest')] + self.labour_nodes, self.landmarks,
+                )
+                self.assertAlmostEqual(matrix['distance_km'][i][j], single['total_distance_km'], places=2)
+                self.assertEqual(matrix['time_min'][i][j], single['total_time_min'])
+                self.assertEqual(matrix['algorithm_used'][i][j], single['algorithm_used'])
+                self.assertEqual(len(matrix['routes'][i][j]), len(single['waypoints']))
+        self.assertEqual(matrix['algorithm_used'][0][-1], 'slm')
+
+    def test_endpoint(self):
+        farmer = CustomUser.objects.create_user(
+            username='farmer', email='farmer@example.com', password='x', role='farmer',
+            phone='9999999999', latitude=FARM_LAT, longitude=FARM_LON,
+        )
+        client = APIClient()
+        client.force_authenticate(farmer)
+        body = {
+            'origins': [{'lat': FARM_LAT, 'lon': FARM_LON}],
+            'destinations': [{'lat': FARM_LAT + 0.05, 'lon': FARM_LON}, {'lat': FARM_LAT, 'lon': FARM_LON + 0.05}],
+        }
+        response = client.post('/api/jobs/route_matrix/', body, format='json')
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(len(response.data['distance_km'][0]), 2)
+        self.assertNotIn('routes', response.data)
+        response = client.post('/api/jobs/route_matrix/', dict(body, include_routes=True), format='json')
+        self.assertEqual(len(response.data['routes'][0]), 2)
+
+        for bad in ({'origins': [], 'destinations': body['destinations']},
+                    {'origins': [{'lat': 'x', 'lon': 1}], 'destinations': body['destinations']},
+                    {'origins': [{'lat': 91, 'lon': 1}], 'destinations': body['destinations']},
+                    {'origins': body['origins'] * 51, 'destinations': body['destinations'] * 25}):
+            self.assertEqual(client.post('/api/jobs/route_matrix/', bad, format='json').status_code, 400)
+
+
+class PickupRouteTests(TestCase):
+    def test_solver_improves_on_nearest_neighbour(self):
+        rng = random.Random(29)
+        for size in (2, 5, 9, 14):
+            points = [(rng.uniform(0, 50), rng.uniform(0, 50)) for _ in range(size + 1)]
+            cost = [[((ax - bx) ** 2 + (ay - by) ** 2) ** 0.5 for bx, by in points] for ax, ay in points]
+            stops, farm = list(range(size)), size
+            for first in (None, 0):
+                todo = stops[1:] if first == 0 else stops
+                order, stats = solve_pickup_order(cost, todo, first, farm)
+                self.assertEqual(sorted(order), todo)
+                self.assertAlmostEqual(stats['cost'], path_cost(cost, order, first, farm))
+                self.assertLessEqual(stats['cost'], stats['initial_cost'] + 1e-9)
+                if len(todo) <= 6:
+                    optimum = min(
+                        path_cost(cost, list(p), first, farm) for p in itertools.permutations(todo)
+                    )
+                    self.assertLessEqual(stats['cost'], optimum * 1.1)
+
+    def test_order_minimises_the_chosen_metric(self):
+        # Start 0, pickups 1 and 2, farm 3: via 1 first is shorter, via 2 first is faster (highway)
+        distance = [[0, 5, 9, 20], [5, 0, 6, 12], [9, 6, 0, 14], [20, 12, 14, 0]]
+        minutes = [[0, 15, 8, 30], [15, 0, 12, 15], [8, 12, 0, 12], [30, 15, 12, 0]]
+        matrix = {'distance_km': distance, 'time_min': minutes,
+                  'routes': [[[{'lat': 0, 'lon': 0, 'label': ''}] * 2] * 4] * 4}
+        points = [{'lat': 0, 'lon': 0, 'label': str(i)} for i in range(4)]
+        with mock.patch('api.pickup_route.compute_route_matrix', return_value=matrix) as route_matrix:
+            fastest = plan_pickup_route(points[3], points[1:3], [], None, start=points[0])
+            shortest = plan_pickup_route(points[3], points[1:3], [], None, start=points[0], metric='distance_km')
+            with self.assertRaises(ValueError):
+                plan_pickup_route(points[3], points[1:3], [], None, metric='cost')
+        self.assertEqual((fastest['order'], fastest['total_time_min'], fastest['optimizer']['metric']),
+                         ([1, 0], 35, 'time_min'))
+        self.assertEqual((shortest['order'], shortest['total_distance_km']), ([0, 1], 25))
+        self.assertIsNone(route_matrix.call_args.kwargs['profile'])
+
+    @override_settings(LANDMARK_HIERARCHY_PATH=None, LANDMARK_TABLE_PATH=None, LANDMARK_GRAPH_VERSION_PATH=None,
+                   ROAD_NETWORK_PATH=None)
+    def test_endpoint_collects_accepted_labours_farthest_first(self):
+        clear_landmark_graph()
+        route_cache().clear()
+        farmer = CustomUser.objects.create_user(
+            username='farmer', email='farmer@example.com', password='x', role='farmer',
+            phone='9999999999', latitude=FARM_LAT, longitude=FARM_LON,
+        )
+        job = Job.objects.create(
+            farmer=farmer, title='Harvest', description='d', category='harvesting',
+            wage_per_day=400, duration_days=2, required_workers=5,
+            start_date=date(2026, 1, 1), end_date=date(2026, 1, 3), address='Pune',
+            latitude=FARM_LAT, longitude=FARM_LON, radius_km=20,
+        )
+        # Labours strung out north of the farm: 2, 6, 4, 8 km, in a shuffled order
+        for i, km in enumerate((2, 6, 4, 8)):
+            labour = CustomUser.objects.create_user(
+                username=f'l{km}', email=f'l{km}@example.com', password='x', role='labour',
+                phone='1', first_name=f'L{km}', latitude=FARM_LAT + km / 111.0, longitude=FARM_LON,
+            )
+            JobApplication.objects.create(job=job, labour=labour, status='accepted')
+        pending = CustomUser.objects.create_user(
+            username='pending', email='p@example.com', password='x', role='labour', phone='1',
+            latitude=FARM_LAT + 0.3, longitude=FARM_LON,
+        )
+        JobApplication.objects.create(job=job, labour=pending, status='pending')
+        nowhere = CustomUser.objects.create_user(
+            username='nowhere', email='n@example.com', password='x', role='labour', phone='1',
+        )
+        JobApplication.objects.create(job=job, labour=nowhere, status='accepted')
+
+        client = APIClient()
+        client.force_authenticate(farmer)
+        response = client.get(f'/api/jobs/{job.id}/pickup_route/')
+        self.assertEqual(response.status_code, 200, response.content)
+        truck_min = response.data['total_time_min']
+        self.assertEqual([s['name'] for s in response.data['stops']], ['L8', 'L6', 'L4', 'L2'])
+        self.assertEqual([s['labour_id'] for s in response.data['skipped']], [nowhere.id])
+        self.assertAlmostEqual(response.data['total_distance_km'], 8.0, delta=0.1)
+        self.assertEqual(response.data['waypoints'][-1]['label'], 'Harvest')
+
+        # Starting at the farm the vehicle goes out to the nearest labour first
+        response = client.get(f'/api/jobs/{job.id}/pickup_route/', {'start_lat': FARM_LAT, 'start_lon': FARM_LON})
+        self.assertEqual([s['name'] for s in response.data['stops']], ['L2', 'L4', 'L6', 'L8'])
+        self.assertAlmostEqual(response.data['total_distance_km'], 16.0, delta=0.2)
+        self.assertEqual(client.get(f'/api/jobs/{job.id}/pickup_route/', {'start_lat': 'x'}).status_code, 400)
+
+        params = {'optimize': 'distance', 'profile': 'tractor_morning'}
+        response = client.get(f'/api/jobs/{job.id}/pickup_route/', params)
+        self.assertEqual([s['name'] for s in response.data['stops']], ['L8', 'L6', 'L4', 'L2'])
+        self.assertEqual(response.data['optimizer']['metric'], 'distance_km')
+        # A tractor in the morning is slower than the default truck off-peak
+        self.assertGreater(response.data['total_time_min'], truck_min)
+        for params in ({'optimize': 'cheapest'}, {'profile': 'rocket'}):
+            self.assertEqual(client.get(f'/api/jobs/{job.id}/pickup_route/', params).status_code, 400)
+
+
+@override_settings(LANDMARK_HIERARCHY_PATH=None, LANDMARK_TABLE_PATH=None, LANDMARK_GRAPH_VERSION_PATH=None,
+                   ROAD_NETWORK_PATH=None)
+class IsochroneTests(TestCase):
+    def setUp(self):
+        clear_landmark_graph()
+        near = Landmark.objects.create(name='Near mandi', location_type='mandi', latitude=FARM_LAT + 0.018,
+                                       longitude=FARM_LON)
+        far = Landmark.objects.create(name='Far mandi', location_type='mandi', latitude=FARM_LAT + 0.9,
+                                      longitude=FARM_LON)
+        with self.captureOnCommitCallbacks(execute=True):
+            # 100 km of highway in 30 minutes: the far mandi is only reachable through it
+            LandmarkDistance.objects.create(from_landmark=near, to_landmark=far, distance_km=100, travel_time_min=30)
+        self.farmer = CustomUser.objects.create_user(
+            username='farmer', email='farmer@example.com', password='x', role='farmer',
+            phone='9999999999', latitude=FARM_LAT, longitude=FARM_LON,
+        )
+        for km in (5, 10, 30):
+            CustomUser.objects.create_user(
+                username=f'l{km}', email=f'l{km}@example.com', password='x', role='labour', phone='1',
+                first_name=f'L{km}', latitude=FARM_LAT, longitude=FARM_LON + km / 105.5, is_available=True,
+            )
+        self.client = APIClient()
+        self.client.force_authenticate(self.farmer)
+
+    def test_bounded_search_matches_full_search(self):
+        rng = random.Random(31)
+        labour_nodes = [
+            {'id': f'labour_{i}', 'lat': FARM_LAT + rng.uniform(-0.3, 0.3),
+             'lon': FARM_LON + rng.uniform(-0.3, 0.3), 'label': f'L{i}'}
+            for i in range(80)
+        ]
+        landmarks = get_landmark_graph()
+        graph, _, _ = time_graph(FARM_LAT, FARM_LON, 10 ** 6, labour_nodes, landmarks)
+        full = shortest_distances(graph, graph.index['origin'])
+        for minutes in (10, 25, 45):
+            bounded = distances_within(graph, graph.index['origin'], minutes)
+            self.assertEqual(set(bounded), {u for u, d in enumerate(full) if d <= minutes})
+            result = compute_isochrone(FARM_LAT, FARM_LON, minutes, labour_nodes, landmarks)
+            expected = {n['id'] for n in labour_nodes if full[graph.index[n['id']]] <= minutes}
+            self.assertEqual({e['id'] for e in result['labours']}, expected)
+            self.assertEqual(len(result['polygon']), 36)
+
+    def test_endpoint_and_labour_prefilter(self):
+        response = self.client.get('/api/jobs/isochrone/', {'lat': FARM_LAT, 'lon': FARM_LON, 'minutes': 45})
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual([e['label'] for e in response.data['labours']], ['L5', 'L10'])
+        self.assertEqual([e['label'] for e in response.data['landmarks']], ['Near mandi', 'Far mandi'])
+        self.assertAlmostEqual(response.data['landmarks'][1]['time_min'], 34, delta=1)
+        self.assertEqual(response.data['algorithm_used'], 'dijkstra')
+        # The polygon reaches out along the highway to the far mandi
+        self.assertGreater(max(p['lat'] for p in response.data['polygon']), FARM_LAT + 0.9)
+        for bad in ({'lat': FARM_LAT, 'lon': FARM_LON, 'minutes': 0}, {'lat': 'x', 'lon': FARM_LON},
+                    {'lat': FARM_LAT, 'lon': FARM_LON, 'minutes': 10 ** 4}):
+            self.assertEqual(self.client.get('/api/jobs/isochrone/', bad).status_code, 400)
+
+        labours, _ = find_available_labours(FARM_LAT, FARM_LON, 50, 10)
+        self.assertEqual(len(labours), 3)
+        # One query: the candidates are ranked as fetched, not re-queried by id
+        with self.assertNumQueries(1):
+            labours, _ = find_available_labours(FARM_LAT, FARM_LON, 50, 10, max_travel_min=25)
+        self.assertEqual([(l['labour'].first_name, round(l['travel_min'])) for l in labours], [('L5', 10), ('L10', 20)])
+
+        params = {'latitude': FARM_LAT, 'longitude': FARM_LON, 'radius': 50}
+        response = self.client.get('/api/jobs/labour_count/', dict(params, max_travel_min=15))
+        self.assertEqual([(l['name'], round(l['travel_min'])) for l in response.data['labours']], [('L5', 10)])
+        response = self.client.get('/api/jobs/labour_count/', dict(params, max_travel_min=5))
+        self.assertEqual(response.data['available_labours_count'], 0)
+        self.assertEqual(self.client.get('/api/jobs/labour_count/', dict(params, max_travel_min='x')).status_code, 400)
+
+
+@override_settings(LANDMARK_HIERARCHY_PATH=None, LANDMARK_TABLE_PATH=None, LANDMARK_GRAPH_VERSION_PATH=None,
+                   ROAD_NETWORK_PATH=None)
+class GenerateLandmarkDistancesTests(TestCase):
+    def setUp(self):
+        clear_landmark_graph()
+        rng = random.Random(37)
+        self.landmarks = [
+            Landmark.objects.create(name=f'M{i}', location_type='mandi',
+                                    latitude=round(rng.uniform(18, 19), 6), longitude=round(rng.uniform(73, 74), 6))
+            for i in range(7)
+        ]
+
+    def _generate(self, **options):
+        call_command('generate_landmark_distances', stdout=io.StringIO(), **options)
+        return {(d.from_landmark_id, d.to_landmark_id): d for d in LandmarkDistance.objects.all()}
+
+    def test_all_pairs_keep_stored_distances(self):
+        a, b = self.landmarks[:2]
+        # Entered by hand in the other direction
+        LandmarkDistance.objects.create(from_landmark=b, to_landmark=a, distance_km=1, travel_time_min=1)
+        rows = self._generate(all_pairs=True, workers=1)
+        self.assertEqual(len(rows), 21)
+        self.assertEqual((rows[b.id, a.id].distance_km, rows[b.id, a.id].travel_time_min), (1, 1))
+        for (from_id, to_id), row in rows.items():
+            if (from_id, to_id) == (b.id, a.id):
+                continue
+            p, q = Landmark.objects.get(pk=from_id), Landmark.objects.get(pk=to_id)
+            km = haversine_km(p.latitude, p.longitude, q.latitude, q.longitude)
+            self.assertAlmostEqual(float(row.distance_km), km, places=2)
+            self.assertEqual(row.travel_time_min, travel_time_min(km))
+        # Bulk writes bypass the signals; the command reloads the graph itself
+        graph = get_landmark_graph()
+        self.assertEqual(graph.csr.edge_count, 42)
+
+        # Without a road network there is nothing better than the stored value to write
+        rows = self._generate(all_pairs=True, overwrite=True, workers=1)
+        self.assertEqual((rows[b.id, a.id].distance_km, rows[b.id, a.id].travel_time_min), (1, 1))
+
+    def test_overwrite_replaces_stored_distances_with_road_distances(self):
+        import json
+
+        with tempfile.TemporaryDirectory() as tmp:
+            source, path = os.path.join(tmp, 'roads.geojson'), os.path.join(tmp, 'roads.bin')
+            with open(source, 'w') as f:
+                json.dump(ROAD_GEOJSON, f)
+            builder = RoadNetworkBuilder()
+            import_geojson(source, builder)
+            builder.write(path)
+            LandmarkDistance.objects.all().delete()
+            Landmark.objects.exclude(pk__in=[lm.pk for lm in self.landmarks[:2]]).delete()
+            a, b = self.landmarks[:2]
+            a.latitude, a.longitude = ROAD_A
+            b.latitude, b.longitude = ROAD_C
+            a.save()
+            b.save()
+            LandmarkDistance.objects.create(from_landmark=a, to_landmark=b, distance_km=1, travel_time_min=1)
+            road_km = haversine_km(*ROAD_A, *ROAD_B) + haversine_km(*ROAD_B, *ROAD_C)
+            with override_settings(ROAD_NETWORK_PATH=path):
+                row = self._generate(workers=1)[a.id, b.id]
+                self.assertEqual((row.distance_km, row.travel_time_min), (1, 1))
+                row = self._generate(overwrite=True, workers=1)[a.id, b.id]
+        self.assertAlmostEqual(float(row.distance_km), road_km, places=1)
+
+    def test_warns_about_precomputed_files_it_made_stale(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            hierarchy, table = os.path.join(tmp, 'ch.bin'), os.path.join(tmp, 'table.bin')
+            for path in (hierarchy, table):
+                open(path, 'wb').close()
+            with override_settings(LANDMARK_HIERARCHY_PATH=hierarchy, LANDMARK_TABLE_PATH=table,
+                                   LANDMARK_HIERARCHY_AUTO_REBUILD=False):
+                out = io.StringIO()
+                call_command('generate_landmark_distances', k=2, workers=1, stdout=out)
+                self.assertIn('`manage.py build_landmark_hierarchy` and `manage.py build_landmark_table`',
+                              out.getvalue())
+                # Nothing new written: nothing went stale
+                out = io.StringIO()
+                call_command('generate_landmark_distances', k=2, workers=1, stdout=out)
+                self.assertNotIn('build_landmark', out.getvalue())
+
+    def test_nearest_neighbours_and_incremental(self):
+        rows = self._generate(k=2, workers=1)
+        lats = [float(lm.latitude) for lm in self.landmarks]
+        lons = [float(lm.longitude) for lm in self.landmarks]
+        expected = set()
+        for i in range(7):
+            nearest = sorted(range(7), key=lambda j: haversine_km(lats[i], lons[i], lats[j], lons[j]))[1:3]
+            expected.update((self.landmarks[min(i, j)].id, self.landmarks[max(i, j)].id) for j in nearest)
+        self.assertEqual(set(rows), expected)
+
+        new = Landmark.objects.create(name='New', location_type='mandi', latitude=18.5, longitude=73.5)
+        rows_after = self._generate(k=2, incremental=True, workers=2)
+        added = set(rows_after) - set(rows)
+        self.assertTrue(added)
+        self.assertTrue(all(new.id in pair for pair in added))
+        self.assertEqual(set(self._generate(k=2, incremental=True)), set(rows_after))
+
+
+# An L-shaped road A -> B -> C (with shape points) and a side road B -> D,
+# plus a footway straight from A to C that vehicles cannot use
+ROAD_A, ROAD_B, ROAD_C, ROAD_D = (18.50, 73.80), (18.50, 73.85), (18.55, 73.85), (18.45, 73.85)
+ROAD_GEOJSON = {
+    'type': 'FeatureCollection',
+    'features': [
+        {'type': 'Feature', 'properties': {'highway': 'secondary'}, 'geometry': {
+            'type': 'LineString',
+            'coordinates': [[73.80, 18.50], [73.82, 18.50], [73.85, 18.50], [73.85, 18.52], [73.85, 18.55]],
+        }},
+        {'type': 'Feature', 'properties': {'highway': 'residential'}, 'geometry': {
+            'type': 'LineString', 'coordinates': [[73.85, 18.50], [73.85, 18.45]],
+        }},
+        {'type': 'Feature', 'properties': {'highway': 'footway'}, 'geometry': {
+            'type': 'LineString', 'coordinates': [[73.80, 18.50], [73.85, 18.55]],
+        }},
+    ],
+}
+ROAD_OSM = """<?xml version="1.0" encoding="UTF-8"?>
+<osm version="0.6">
+  <node id="1" lat="18.50" lon="73.80"/>
+  <node id="2" lat="18.50" lon="73.82"/>
+  <node id="3" lat="18.50" lon="73.85"/>
+  <node id="4" lat="18.52" lon="73.85"/>
+  <node id="5" lat="18.55" lon="73.85"/>
+  <node id="6" lat="18.45" lon="73.85"/>
+  <way id="10"><nd ref="1"/><nd ref="2"/><nd ref="3"/><nd ref="4"/><nd ref="5"/><tag k="highway" v="secondary"/></way>
+  <way id="11"><nd ref="3"/><nd ref="6"/><tag k="highway" v="residential"/></way>
+  <way id="12"><nd ref="1"/><nd ref="5"/><tag k="highway" v="footway"/></way>
+</osm>
+"""
+
+
+class RoadNetworkTests(SimpleTestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = tmp.name
+
+    def _import(self, reader, name, content):
+        source = os.path.join(self.dir, name)
+        with open(source, 'w') as f:
+            f.write(content)
+        path = os.path.join(self.dir, name + '.bin')
+        builder = RoadNetworkBuilder()
+        reader(source, builder)
+        counts = builder.write(path)
+        return RoadNetwork.load(path), counts
+
+    def test_import_contracts_shape_points(self):
+        import json
+
+        for reader, name, content in ((import_geojson, 'roads.geojson', json.dumps(ROAD_GEOJSON)),
+                                      (import_osm_xml, 'roads.osm', ROAD_OSM)):
+            network, counts = self._import(reader, name, content)
+            self.assertEqual(counts['ways'], 2)
+            # A, B, C and D are junctions or road ends; the two shape points are folded into edges
+            self.assertEqual((len(network), counts['road_segments'], network.edge_count), (4, 3, 6))
+            lengths = sorted(round(float(x), 3) for x in network.lengths)
+            expected = sorted([haversine_km(*ROAD_A, *ROAD_B), haversine_km(*ROAD_B, *ROAD_C),
+                               haversine_km(*ROAD_B, *ROAD_D)])
+            for got, want in zip(lengths[::2], expected):
+                self.assertAlmostEqual(got, want, places=2)
+
+            node, km = network.nearest_node(18.501, 73.801)
+            self.assertEqual((network.lats[node], network.lons[node]), ROAD_A)
+            self.assertLess(km, 0.2)
+            self.assertIsNone(network.nearest_node(19.5, 74.5, max_km=5))
+
+    def test_import_without_numpy_merges_sorted_runs(self):
+        import json
+
+        def arrays(network):
+            return [bytes(values) for values in (network.lats, network.lons, network.offsets, network.cell_keys,
+                                                 network.cell_offsets, network.weights, network.targets,
+                                                 network.lengths, network.classes)]
+
+        expected, counts = self._import(import_geojson, 'roads.geojson', json.dumps(ROAD_GEOJSON))
+        with mock.patch('api.road_network.np', None), mock.patch('api.road_network.SORT_RUN', 2):
+            network, runs_counts = self._import(import_geojson, 'runs.geojson', json.dumps(ROAD_GEOJSON))
+        self.assertEqual(runs_counts, counts)
+        self.assertEqual(arrays(network), arrays(expected))
+
+    def test_feature_collection_is_streamed_in_chunks(self):
+        import json
+
+        def arrays(network):
+            return [bytes(values) for values in (network.offsets, network.weights, network.targets)]
+
+        expected, counts = self._import(import_geojson, 'roads.geojson', json.dumps(ROAD_GEOJSON))
+        with mock.patch('api.road_network.GEOJSON_CHUNK', 5):
+            network, chunked_counts = self._import(import_geojson, 'chunked.geojson',
+                                                   json.dumps(ROAD_GEOJSON, indent=2))
+        self.assertEqual(chunked_counts, counts)
+        self.assertEqual(arrays(network), arrays(expected))
+        with self.assertRaises(ValueError):
+            self._import(import_geojson, 'cut.geojson', json.dumps(ROAD_GEOJSON)[:-40])
+
+    def test_profile_avoids_excluded_roads(self):
+        import json
+
+        roads = {'type': 'FeatureCollection', 'features': ROAD_GEOJSON['features'][:2] + [
+            {'type': 'Feature', 'properties': {'highway': 'motorway'}, 'geometry': {
+                'type': 'LineString', 'coordinates': [[73.80, 18.50], [73.85, 18.55]],
+            }},
+        ]}
+        network, _ = self._import(import_geojson, 'roads.geojson', json.dumps(roads))
+        origin = {'lat': ROAD_A[0], 'lon': ROAD_A[1], 'label': 'Farm'}
+        dest = {'lat': ROAD_C[0], 'lon': ROAD_C[1], 'label': 'Mandi'}
+        tractor = network.with_profile(get_profile('tractor_offpeak'))
+        self.assertIs(network.with_profile(get_profile()), network)
+        self.assertIs(tractor.targets, network.targets)
+        self.assertIs(network.with_profile(get_profile('tractor_offpeak')), tractor)
+
+        truck_route = network.route(origin, dest)
+        tractor_route = tractor.route(origin, dest)
+        self.assertAlmostEqual(truck_route['total_distance_km'], haversine_km(*ROAD_A, *ROAD_C), places=1)
+        self.assertEqual(len(tractor_route['waypoints']), 5)
+        self.assertAlmostEqual(tractor_route['total_distance_km'],
+                               haversine_km(*ROAD_A, *ROAD_B) + haversine_km(*ROAD_B, *ROAD_C), places=1)
+        # Secondary roads at the tractor's 25 km/h
+        self.assertAlmostEqual(tractor_route['total_time_min'], tractor_route['total_distance_km'] / 25 * 60, delta=1)
+        self.assertEqual(tractor.route_many(origin, [dest]), [tractor_route])
+
+    @override_settings(LANDMARK_HIERARCHY_PATH=None, LANDMARK_TABLE_PATH=None, LANDMARK_GRAPH_VERSION_PATH=None)
+    def test_routes_follow_roads(self):
+        import json
+
+        network, _ = self._import(import_geojson, 'roads.geojson', json.dumps(ROAD_GEOJSON))
+        landmarks = LandmarkGraph({}, {}, version='test')
+        road_km = haversine_km(*ROAD_A, *ROAD_B) + haversine_km(*ROAD_B, *ROAD_C)
+        with override_settings(ROAD_NETWORK_PATH=os.path.join(self.dir, 'roads.geojson.bin')):
+            route = compute_optimal_route(*ROAD_A, *ROAD_C, [{'id': 'dest', 'lat': ROAD_C[0], 'lon': ROAD_C[1],
+                                                               'label': 'Mandi'}], landmarks)
+            self.assertEqual(route['algorithm_used'], 'road')
+            self.assertAlmostEqual(route['total_distance_km'], road_km, places=1)
+            self.assertGreater(route['total_distance_km'], haversine_km(*ROAD_A, *ROAD_C) * 1.3)
+            self.assertEqual([w['label'] for w in route['waypoints']][-1], 'Mandi')
+            self.assertEqual((route['waypoints'][2]['lat'], route['waypoints'][2]['lon']), ROAD_B)
+
+            matrix = compute_route_matrix([{'lat': ROAD_A[0], 'lon': ROAD_A[1]}],
+                                          [{'lat': ROAD_C[0], 'lon': ROAD_C[1]}, {'lat': 19.5, 'lon': 74.5}],
+                                          [], landmarks)
+            self.assertEqual(matrix['algorithm_used'][0], ['road', 'direct'])
+            self.assertEqual(matrix['distance_km'][0][0], route['total_distance_km'])
+
+            # Off the network: the previous graph routing still answers
+            far = compute_optimal_route(19.5, 74.5, 19.6, 74.5, [], landmarks)
+            self.assertEqual(far['algorithm_used'], 'dijkstra')
+
+    def test_road_isochrone_snaps_only_candidates_in_range(self):
+        import json
+
+        network, _ = self._import(import_geojson, 'roads.geojson', json.dumps(ROAD_GEOJSON))
+        landmarks = LandmarkGraph(
+            {'landmark_1': {'lat': ROAD_C[0], 'lon': ROAD_C[1], 'label': 'Mandi', 'type': 'landmark'},
+             'landmark_2': {'lat': 20.5, 'lon': 73.85, 'label': 'Far mandi', 'type': 'landmark'}},
+            {}, version='test',
+        )
+        labours = [{'id': 'labour_1', 'lat': ROAD_D[0], 'lon': ROAD_D[1], 'label': 'L1'},
+                   {'id': 'labour_2', 'lat': 20.5, 'lon': 73.80, 'label': 'L2'}]
+        with override_settings(ROAD_NETWORK_PATH=os.path.join(self.dir, 'roads.geojson.bin')), \
+                mock.patch.object(RoadNetwork, 'nearest_node', autospec=True,
+                                  side_effect=RoadNetwork.nearest_node) as nearest_node:
+            result = compute_isochrone(*ROAD_A, 30, labours, landmarks)
+        self.assertEqual(result['algorithm_used'], 'road')
+        self.assertEqual([e['label'] for e in result['landmarks']], ['Mandi'])
+        self.assertEqual([e['label'] for e in result['labours']], ['L1'])
+        # The origin, the mandi and L1; nothing 220 km away is snapped for a 30 minute budget
+        self.assertEqual(sorted(call.args[1] for call in nearest_node.call_args_list),
+                         sorted([ROAD_A[0], ROAD_C[0], ROAD_D[0]]))
@@ -18,10 +18,10 @@ class LabourEarningViewSet(viewsets.ModelViewSet):
         user = self.request.user
         if user.role == 'labour':
             # Labours can see their own earnings
-            return LabourEarning.objects.filter(labour=user)
+            return LabourEarning.objects.filter(labour=user).select_related('labour')
         elif user.role == 'farmer':
             # Farmers can see earnings for their jobs
-            return LabourEarning.objects.filter(job_application__job__farmer=user)
+            return LabourEarning.objects.filter(job_application__job__farmer=user).select_related('labour')
         return LabourEarning.objects.none()
 
     def create(self, request, *args, **kwargs):
@@ -70,7 +70,7 @@ class LabourEarningViewSet(viewsets.ModelViewSet):
             })
         
         # Recent earnings (last 10)
-        recent_earnings = earnings.order_by('-created_at')[:10]
+        recent_earnings = earnings.select_related('labour').order_by('-created_at')[:10]
         recent_serializer = self.get_serializer(recent_earnings, many=True)
         
         return Response({
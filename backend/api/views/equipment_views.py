@@ -11,7 +11,7 @@ class EquipmentViewSet(viewsets.ModelViewSet):
     """
     API endpoint that allows equipment listings to be viewed or edited.
     """
-    queryset = Equipment.objects.all()
+    queryset = Equipment.objects.select_related('seller')
     serializer_class = EquipmentSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
     filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
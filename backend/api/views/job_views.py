@@ -2,80 +2,26 @@ from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
-from django.db.models import Q, Count
 from django.utils import timezone
 from decimal import Decimal
+import logging
 import math
 
-from ..models import Job, JobApplication, CustomUser, Notification, LabourEarning, Landmark, LandmarkDistance
-from ..serializers import JobSerializer, JobApplicationSerializer
-from ..routing_service import compute_optimal_route
+from ..models import Job, JobApplication, JobMatch, CustomUser, Notification, LabourEarning
+from ..serializers import JobSerializer, JobApplicationSerializer, with_application_details, with_job_counts
+from ..routing_service import ROUTE_MATRIX_MAX_PAIRS, compute_optimal_route, compute_route_matrix, road_network
+from ..landmark_graph import get_landmark_graph
+from ..route_cache import cached_route
+from ..routing_profiles import PROFILES, get_profile
+from ..pickup_route import plan_pickup_route
+from ..isochrone import ISOCHRONE_MAX_MINUTES, compute_isochrone, isochrone_radius_km
+from ..matching import find_available_labours, jobs_matched_to, open_jobs_covering
+from ..pagination import paginate_by_distance, parse_page_size
+from ..spatial_index import annotate_distance, within_bounding_box
+from ..sharding import regions_within_radius
+from ..geometry import haversine_km as calculate_distance
 
-
-def calculate_distance(lat1, lon1, lat2, lon2):
-    """Calculate distance between two points using Haversine formula"""
-    R = 6371  # Earth's radius in kilometers
-    
-    lat1_rad = math.radians(float(lat1))
-    lat2_rad = math.radians(float(lat2))
-    delta_lat = math.radians(float(lat2) - float(lat1))
-    delta_lon = math.radians(float(lon2) - float(lon1))
-    
-    a = (math.sin(delta_lat / 2) ** 2 + 
-         math.cos(lat1_rad) * math.cos(lat2_rad) * 
-         math.sin(delta_lon / 2) ** 2)
-    c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
-    
-    return R * c
-
-
-def find_available_labours(job_lat, job_lon, radius_km, required_workers):
-    """Find available labours within radius, expanding if needed (Uber-like)"""
-    max_radius = 50  # Maximum search radius in km
-    current_radius = float(radius_km)
-    available_labours = []  # Initialize the list
-    
-    print(f"Searching for labours at {job_lat}, {job_lon} with radius {radius_km}km")
-    
-    while current_radius <= max_radius:
-        # Get all available labours
-        labours = CustomUser.objects.filter(
-            role='labour',
-            is_available=True,
-            latitude__isnull=False,
-            longitude__isnull=False
-        )
-        
-        print(f"Found {labours.count()} total labours in database")
-        
-        # Filter by distance for current radius
-        current_radius_labours = []
-        for labour in labours:
-            distance = calculate_distance(
-                job_lat, job_lon, 
-                labour.latitude, labour.longitude
-            )
-            if distance <= current_radius:
-                current_radius_labours.append({
-                    'labour': labour,
-                    'distance': distance
-                })
-        
-        print(f"Found {len(current_radius_labours)} labours within {current_radius}km")
-        
-        # Update the main list with current radius results
-        available_labours = current_radius_labours
-        
-        # If we have enough labours, return them
-        if len(available_labours) >= required_workers:
-            return available_labours[:required_workers], current_radius
-        
-        # Expand radius by 5km
-        current_radius += 5
-    
-    # Return all available labours if we can't find enough
-    print(f"Final result: {len(available_labours)} labours within {current_radius}km")
-    return available_labours, current_radius
+logger = logging.getLogger(__name__)
 
 
 class JobViewSet(viewsets.ModelViewSet):
@@ -88,20 +34,11 @@ class JobViewSet(viewsets.ModelViewSet):
             
         user = self.request.user
         if user.role == 'farmer':
-            return Job.objects.filter(farmer=user)
+            return with_job_counts(Job.objects.filter(farmer=user))
         elif user.role == 'labour':
             # Return jobs that labour can see (within their area)
             if user.latitude and user.longitude:
-                jobs = Job.objects.filter(status='open')
-                nearby_jobs = []
-                for job in jobs:
-                    distance = calculate_distance(
-                        user.latitude, user.longitude,
-                        job.latitude, job.longitude
-                    )
-                    if distance <= float(job.radius_km):
-                        nearby_jobs.append(job.id)
-                return Job.objects.filter(id__in=nearby_jobs)
+                return with_job_counts(jobs_matched_to(user))
             return Job.objects.none()
         return Job.objects.none()
     
@@ -174,14 +111,15 @@ class JobViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Check distance (only if user has location set)
+        # Check the labour is within the job's radius (only if user has location set)
         if request.user.latitude and request.user.longitude:
             try:
-                distance = calculate_distance(
-                    float(request.user.latitude), float(request.user.longitude),
-                    float(job.latitude), float(job.longitude)
-                )
-                if distance > float(job.radius_km):
+                in_range = JobMatch.objects.filter(job=job, labour=request.user).exists()
+                if not in_range:
+                    distance = calculate_distance(
+                        float(request.user.latitude), float(request.user.longitude),
+                        float(job.latitude), float(job.longitude)
+                    )
                     return Response(
                         {'error': f'You are too far from this job location ({distance:.1f}km > {job.radius_km}km). Please update your location or find jobs closer to you.'}, 
                         status=status.HTTP_400_BAD_REQUEST
@@ -259,10 +197,111 @@ class JobViewSet(viewsets.ModelViewSet):
             )
         
         job = self.get_object()
-        applications = JobApplication.objects.filter(job=job)
+        applications = with_application_details(JobApplication.objects.filter(job=job))
         serializer = JobApplicationSerializer(applications, many=True)
         return Response(serializer.data)
     
+    @action(detail=True, methods=['get'], url_path='pickup_route')
+    def pickup_route(self, request, pk=None):
+        """
+        Vehicle route that picks up every accepted labour of the job and ends at the farm (farmer only).
+        Optional query params start_lat, start_lon: where the vehicle sets off
+        (default: at the first pickup); profile: routing profile "<vehicle>_<window>"
+        (default truck_offpeak); optimize: time (default) or distance.
+        """
+        if request.user.role != 'farmer':
+            return Response(
+                {'error': 'Only farmers can plan pickup routes'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        job = self.get_object()
+        try:
+            profile = get_profile(request.query_params.get('profile'))
+        except ValueError:
+            return Response(
+                {'error': f"profile must be one of: {', '.join(PROFILES)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        metric = PICKUP_OPTIMIZE.get(request.query_params.get('optimize', 'time'))
+        if metric is None:
+            return Response(
+                {'error': f"optimize must be one of: {', '.join(PICKUP_OPTIMIZE)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        start = None
+        if request.query_params.get('start_lat') or request.query_params.get('start_lon'):
+            try:
+                start = _route_point({
+                    'lat': request.query_params.get('start_lat'),
+                    'lon': request.query_params.get('start_lon'),
+                    'label': 'Start',
+                })
+            except (ValueError, TypeError):
+                return Response(
+                    {'error': 'Invalid start_lat/start_lon values'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
+        applications = JobApplication.objects.filter(job=job, status='accepted').select_related('labour')
+        pickups, skipped = [], []
+        for application in applications:
+            labour = application.labour
+            if labour.latitude is None or labour.longitude is None:
+                skipped.append({'application_id': application.id, 'labour_id': labour.id,
+                                'name': labour.first_name, 'reason': 'no location'})
+                continue
+            pickups.append({
+                'lat': float(labour.latitude),
+                'lon': float(labour.longitude),
+                'label': labour.first_name or labour.email,
+                'application': application,
+            })
+        if not pickups:
+            return Response(
+                {'error': 'No accepted labours with a location to pick up', 'skipped': skipped},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if len(pickups) > MAX_PICKUP_STOPS:
+            return Response(
+                {'error': f'At most {MAX_PICKUP_STOPS} pickups per route'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        farm = {'lat': float(job.latitude), 'lon': float(job.longitude), 'label': job.title or 'Farm'}
+        plan = plan_pickup_route(
+            farm, pickups,
+            route_labour_nodes([(farm['lat'], farm['lon'])]),
+            get_landmark_graph(),
+            start=start,
+            profile=profile,
+            metric=metric,
+        )
+        stops = []
+        for position, (index, leg) in enumerate(zip(plan['order'], plan['legs_to_stops']), start=1):
+            pickup = pickups[index]
+            labour = pickup['application'].labour
+            stops.append({
+                'order': position,
+                'application_id': pickup['application'].id,
+                'labour_id': labour.id,
+                'name': labour.first_name,
+                'phone': pickup['application'].contact_phone or labour.phone,
+                'lat': pickup['lat'],
+                'lon': pickup['lon'],
+                'leg_distance_km': leg['distance_km'],
+                'leg_time_min': leg['time_min'],
+            })
+        return Response({
+            'job_id': job.id,
+            'stops': stops,
+            'leg_to_farm': plan['leg_to_farm'],
+            'waypoints': plan['waypoints'],
+            'total_distance_km': plan['total_distance_km'],
+            'total_time_min': plan['total_time_min'],
+            'skipped': skipped,
+            'optimizer': plan['optimizer'],
+        })
+
     @action(detail=True, methods=['post'])
     def respond_to_application(self, request, pk=None):
         """Accept or reject an application (farmer only)"""
@@ -336,9 +375,10 @@ class JobViewSet(viewsets.ModelViewSet):
     
     @action(detail=False, methods=['get'])
     def nearby(self, request):
-        """Get nearby jobs for labours"""
-        print(f"Nearby jobs request from user: {request.user.email}, role: {request.user.role}")
-        
+        """
+        Get nearby jobs for labours, nearest first.
+        Query params: page_size (default 20, max 100), cursor (next_cursor of the previous page).
+        """
         if not request.user.is_authenticated:
             return Response(
                 {'error': 'Authentication required'}, 
@@ -366,33 +406,43 @@ class JobViewSet(viewsets.ModelViewSet):
                     status=status.HTTP_400_BAD_REQUEST
                 )
         
-        print(f"Searching for jobs near user location: {user_lat}, {user_lon}")
-        
-        # Get open jobs
-        jobs = Job.objects.filter(status='open')
-        print(f"Found {jobs.count()} open jobs in database")
+        logger.debug("Searching for jobs near %s, %s for user %s", user_lat, user_lon, request.user.pk)
         
-        nearby_jobs = []
+        # Open jobs whose radius reaches the user, one page at a time, nearest first
+        if request.user.latitude and request.user.longitude:
+            jobs = jobs_matched_to(request.user)
+        else:
+            jobs = open_jobs_covering(user_lat, user_lon)
+        jobs = with_job_counts(jobs)
         
-        for job in jobs:
-            distance = calculate_distance(
-                user_lat, user_lon,
-                job.latitude, job.longitude
+        try:
+            page_size = parse_page_size(request.query_params.get('page_size'))
+            page, next_cursor = paginate_by_distance(
+                jobs, request.query_params.get('cursor'), page_size
             )
-            print(f"Job {job.id} ({job.title}) is {distance:.1f}km away (radius: {job.radius_km}km)")
-            
-            if distance <= float(job.radius_km):
-                job_data = JobSerializer(job).data
-                job_data['distance_from_user'] = round(distance, 1)
-                nearby_jobs.append(job_data)
-                print(f"Added job {job.id} to nearby jobs")
+        except ValueError:
+            return Response(
+                {'error': 'Invalid cursor or page_size'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        results = JobSerializer(page, many=True).data
+        for job, job_data in zip(page, results):
+            job_data['distance_from_user'] = round(job.distance_km, 1)
         
-        print(f"Found {len(nearby_jobs)} nearby jobs")
+        next_url = None
+        if next_cursor:
+            params = request.query_params.copy()
+            params['cursor'] = next_cursor
+            next_url = request.build_absolute_uri(f"{request.path}?{params.urlencode()}")
         
-        # Sort by distance
-        nearby_jobs.sort(key=lambda x: x['distance_from_user'])
+        logger.debug("Returning %d nearby jobs", len(results))
         
-        return Response(nearby_jobs)
+        return Response({
+            'results': results,
+            'next_cursor': next_cursor,
+            'next': next_url,
+        })
     
     @action(detail=False, methods=['get'])
     def labour_count(self, request):
@@ -423,9 +473,20 @@ class JobViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
+        # Optional travel-time prefilter: only labours reachable within this many minutes
+        max_travel_min = request.query_params.get('max_travel_min')
+        try:
+            max_travel_min = _isochrone_minutes(max_travel_min) if max_travel_min else None
+        except ValueError:
+            return Response(
+                {'error': f'max_travel_min must be between 1 and {ISOCHRONE_MAX_MINUTES}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
         try:
             available_labours, final_radius = find_available_labours(
-                lat, lon, radius, 1  # Just checking availability, not specific count
+                lat, lon, radius, 1,  # Just checking availability, not specific count
+                max_travel_min=max_travel_min,
             )
             
             return Response({
@@ -438,7 +499,8 @@ class JobViewSet(viewsets.ModelViewSet):
                         'phone': labour['labour'].phone,
                         'distance': round(labour['distance'], 1),
                         'latitude': float(labour['labour'].latitude),
-                        'longitude': float(labour['labour'].longitude)
+                        'longitude': float(labour['labour'].longitude),
+                        **({'travel_min': labour['travel_min']} if 'travel_min' in labour else {}),
                     }
                     for labour in available_labours
                 ]
@@ -454,7 +516,8 @@ class JobViewSet(viewsets.ModelViewSet):
         """
         Compute optimal route between farmer/job location and destination (labour, mandi, warehouse).
         Uses Dijkstra for local routing and Spatial Landmark Model (SLM) for long-distance.
-        Query params: from_lat, from_lon, to_lat, to_lon; optional to_type, to_id, to_label.
+        Query params: from_lat, from_lon, to_lat, to_lon; optional to_type, to_id, to_label,
+        profile (routing profile "<vehicle>_<window>", e.g. tractor_morning; default truck_offpeak).
         """
         if not request.user.is_authenticated:
             return Response(
@@ -483,39 +546,165 @@ class JobViewSet(viewsets.ModelViewSet):
                 {'error': 'Invalid latitude/longitude values'},
                 status=status.HTTP_400_BAD_REQUEST
             )
-        # Labour nodes: destination plus nearby labours (for graph connectivity)
-        labour_nodes = [
-            {
-                'id': 'dest',
-                'lat': to_lat,
-                'lon': to_lon,
-                'label': to_label or 'Destination',
-            }
-        ]
-        radius_km = 80
-        labours = CustomUser.objects.filter(
-            role='labour',
-            latitude__isnull=False,
-            longitude__isnull=False,
+        try:
+            profile = get_profile(request.query_params.get('profile'))
+        except ValueError:
+            return Response(
+                {'error': f"profile must be one of: {', '.join(PROFILES)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        landmark_graph = get_landmark_graph()
+
+        def compute():
+            # Labour nodes: destination plus nearby labours (for graph connectivity)
+            labour_nodes = [
+                {
+                    'id': 'dest',
+                    'lat': to_lat,
+                    'lon': to_lon,
+                    'label': to_label or 'Destination',
+                }
+            ]
+            labour_nodes.extend(route_labour_nodes([(from_lat, from_lon)]))
+            return compute_optimal_route(
+                from_lat, from_lon, to_lat, to_lon,
+                labour_nodes,
+                landmark_graph,
+                profile,
+            )
+
+        # A new road network import must not serve routes cached from the old one
+        network = road_network()
+        version = f"{landmark_graph.version}:{network.version}" if network is not None else landmark_graph.version
+        if not profile.is_default:
+            version = f"{version}:{profile.name}"
+        result, hit = cached_route(
+            from_lat, from_lon, to_lat, to_lon, to_label or 'Destination', version, compute,
+            # ...nor routes through labours that have since moved or left
+            regions=regions_within_radius(from_lat, from_lon, ROUTE_LABOUR_RADIUS_KM),
         )
-        for labour in labours:
-            d = calculate_distance(from_lat, from_lon, float(labour.latitude), float(labour.longitude))
-            if d <= radius_km:
-                labour_nodes.append({
-                    'id': f'labour_{labour.id}',
-                    'lat': float(labour.latitude),
-                    'lon': float(labour.longitude),
-                    'label': labour.first_name or labour.email,
-                })
-        result = compute_optimal_route(
-            from_lat, from_lon, to_lat, to_lon,
-            labour_nodes,
-            Landmark.objects.all(),
-            LandmarkDistance.objects.all(),
+        response = Response(result)
+        response['X-Route-Cache'] = 'hit' if hit else 'miss'
+        return response
+
+    @action(detail=False, methods=['get'], url_path='isochrone')
+    def isochrone(self, request):
+        """
+        Everything reachable from a point within a travel-time budget, from one
+        bounded search. Query: lat, lon, minutes (default 45).
+        Returns reachable labours and landmarks with their travel minutes
+        (fastest first) and an approximate polygon of the reachable area.
+        """
+        if not request.user.is_authenticated:
+            return Response(
+                {'error': 'Authentication required'},
+                status=status.HTTP_401_UNAUTHORIZED
+            )
+        try:
+            origin = _route_point({'lat': request.query_params.get('lat'), 'lon': request.query_params.get('lon')})
+        except (ValueError, TypeError):
+            return Response(
+                {'error': 'lat and lon are required'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            minutes = _isochrone_minutes(request.query_params.get('minutes', 45))
+        except ValueError:
+            return Response(
+                {'error': f'minutes must be between 1 and {ISOCHRONE_MAX_MINUTES}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        labour_nodes = route_labour_nodes([(origin['lat'], origin['lon'])], isochrone_radius_km(minutes))
+        result = compute_isochrone(origin['lat'], origin['lon'], minutes, labour_nodes, get_landmark_graph())
+        for labour in result['labours']:
+            labour['labour_id'] = int(labour['id'][len('labour_'):])
+        return Response(result)
+
+    @action(detail=False, methods=['post'], url_path='route_matrix')
+    def route_matrix(self, request):
+        """
+        Routes or a cost matrix from M origins to N destinations in one request,
+        from one graph build and one search tree per origin.
+        Body: origins and destinations as lists of {lat, lon, label?};
+        include_routes (default false) adds the waypoints of every route.
+        Returns M x N lists distance_km, time_min, algorithm_used (and routes).
+        """
+        if not request.user.is_authenticated:
+            return Response(
+                {'error': 'Authentication required'},
+                status=status.HTTP_401_UNAUTHORIZED
+            )
+        try:
+            origins = [_route_point(p) for p in request.data.get('origins') or []]
+            destinations = [_route_point(p) for p in request.data.get('destinations') or []]
+        except (ValueError, TypeError, KeyError, AttributeError):
+            return Response(
+                {'error': 'origins and destinations must be lists of {lat, lon, label}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if not origins or not destinations:
+            return Response(
+                {'error': 'origins and destinations are required'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if len(origins) * len(destinations) > ROUTE_MATRIX_MAX_PAIRS:
+            return Response(
+                {'error': f'At most {ROUTE_MATRIX_MAX_PAIRS} origin/destination pairs per request'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        result = compute_route_matrix(
+            origins, destinations,
+            route_labour_nodes([(o['lat'], o['lon']) for o in origins]),
+            get_landmark_graph(),
+            include_routes=bool(request.data.get('include_routes')),
         )
         return Response(result)
 
 
+# Labours within this distance of a route's origin join its graph as waypoints
+ROUTE_LABOUR_RADIUS_KM = 80
+
+# Largest number of labours one pickup route collects
+MAX_PICKUP_STOPS = 25
+
+# pickup_route ?optimize= values and the route matrix entry each minimises
+PICKUP_OPTIMIZE = {'time': 'time_min', 'distance': 'distance_km'}
+
+
+def route_labour_nodes(centres, radius_km=ROUTE_LABOUR_RADIUS_KM):
+    """Labour graph nodes within radius_km of any of the (lat, lon) centres."""
+    nodes = {}
+    for lat, lon in centres:
+        labours = annotate_distance(
+            within_bounding_box(CustomUser.objects.filter(role='labour'), lat, lon, radius_km),
+            lat, lon
+        ).filter(distance_km__lte=radius_km)
+        for labour_id, l_lat, l_lon, first_name, email in labours.values_list(
+            'id', 'latitude', 'longitude', 'first_name', 'email'
+        ):
+            nodes[labour_id] = {
+                'id': f'labour_{labour_id}',
+                'lat': float(l_lat),
+                'lon': float(l_lon),
+                'label': first_name or email,
+            }
+    return list(nodes.values())
+
+
+def _isochrone_minutes(value):
+    minutes = float(value)
+    if math.isnan(minutes) or not 1 <= minutes <= ISOCHRONE_MAX_MINUTES:
+        raise ValueError('Travel time out of range')
+    return minutes
+
+
+def _route_point(point):
+    lat, lon = float(point['lat']), float(point['lon'])
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180) or math.isnan(lat) or math.isnan(lon):
+        raise ValueError('Coordinates out of range')
+    return {'lat': lat, 'lon': lon, 'label': str(point.get('label') or '')}
+
+
 class JobApplicationViewSet(viewsets.ModelViewSet):
     serializer_class = JobApplicationSerializer
     permission_classes = [IsAuthenticated]
@@ -527,10 +716,10 @@ class JobApplicationViewSet(viewsets.ModelViewSet):
         user = self.request.user
         if user.role == 'farmer':
             # Farmers can see applications for their jobs
-            return JobApplication.objects.filter(job__farmer=user)
+            return with_application_details(JobApplication.objects.filter(job__farmer=user))
         elif user.role == 'labour':
             # Labours can see their own applications
-            return JobApplication.objects.filter(labour=user)
+            return with_application_details(JobApplication.objects.filter(labour=user))
         return JobApplication.objects.none()
 
     def update(self, request, *args, **kwargs):
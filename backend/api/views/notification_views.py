@@ -11,7 +11,7 @@ class NotificationViewSet(viewsets.ModelViewSet):
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
-        return Notification.objects.filter(user=self.request.user).select_related('equipment', 'inquiry')
+        return Notification.objects.filter(user=self.request.user).select_related('equipment', 'inquiry', 'job')
 
     @action(detail=False, methods=['post'])
     def mark_all_read(self, request):
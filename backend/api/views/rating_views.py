@@ -16,10 +16,10 @@ class LabourRatingViewSet(viewsets.ModelViewSet):
         user = self.request.user
         if user.role == 'farmer':
             # Farmers can see ratings they've given
-            return LabourRating.objects.filter(farmer=user)
+            return LabourRating.objects.filter(farmer=user).select_related('farmer', 'labour', 'job_application__job')
         elif user.role == 'labour':
             # Labours can see ratings they've received
-            return LabourRating.objects.filter(labour=user)
+            return LabourRating.objects.filter(labour=user).select_related('farmer', 'labour', 'job_application__job')
         return LabourRating.objects.none()
 
     def create(self, request, *args, **kwargs):
@@ -82,7 +82,7 @@ class LabourRatingViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        ratings = LabourRating.objects.filter(labour_id=labour_id)
+        ratings = LabourRating.objects.filter(labour_id=labour_id).select_related('farmer', 'labour', 'job_application__job')
         serializer = self.get_serializer(ratings, many=True)
         
         # Calculate average rating
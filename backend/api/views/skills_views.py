@@ -16,13 +16,13 @@ class LabourSkillViewSet(viewsets.ModelViewSet):
         user = self.request.user
         if user.role == 'labour':
             # Labours can see their own skills
-            return LabourSkill.objects.filter(labour=user)
+            return LabourSkill.objects.filter(labour=user).select_related('labour')
         elif user.role == 'farmer':
             # Farmers can see skills of all labours (for hiring purposes)
             labour_id = self.request.query_params.get('labour_id')
             if labour_id:
-                return LabourSkill.objects.filter(labour_id=labour_id)
-            return LabourSkill.objects.all()
+                return LabourSkill.objects.filter(labour_id=labour_id).select_related('labour')
+            return LabourSkill.objects.select_related('labour')
         return LabourSkill.objects.none()
 
     def create(self, request, *args, **kwargs):
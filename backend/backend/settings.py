@@ -60,6 +60,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',  # Add this line at the top
+    'api.middleware.QueryCountMiddleware',  # Per-request SQL query count/time
     'django.middleware.common.CommonMiddleware',  # This should be after CorsMiddleware
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -67,6 +68,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'api.middleware.RegionShardMiddleware',
 ]
 
 ROOT_URLCONF = 'backend.urls'
@@ -161,12 +163,85 @@ CORS_ALLOWED_ORIGINS = [
     "http://localhost:5173",  # Vite default
     "http://127.0.0.1:5173",  # Vite alternative
 ]
+# Region sharding for job matching and routing (see api/sharding.py).
+# The country is cut into REGION_TILE_DEG x REGION_TILE_DEG degree tiles; each shard owns
+# the tiles whose centers fall in its bounds, and the shard with bounds '*' owns the rest.
+# A shard with a 'url' is served by other workers: requests for its regions are forwarded there.
+# Example: 'west': {'bounds': [(15.0, 23.0, 72.0, 81.0)], 'url': 'https://west.krishiment.example'}
+REGION_TILE_DEG = 2.0
+MATCHING_SHARDS = {
+    'default': {'bounds': '*', 'url': ''},
+}
+LOCAL_SHARD = os.environ.get('KRISHIMENT_SHARD', 'default')
+# 'proxy': relay other shards' requests to them (clients see one origin).
+# 'redirect': answer 307 to the shard's URL; clients must re-send Authorization there.
+SHARD_FORWARDING = 'proxy'
+SHARD_PROXY_TIMEOUT_S = 30
+
+# Current landmark graph version (api/landmark_graph.py). Every worker and management
+# command on the host reads it, so a landmark change or rebuild reaches all of them.
+LANDMARK_GRAPH_VERSION_PATH = os.path.join(BASE_DIR, 'routing_data', 'landmark_graph.version')
+
+# Contraction hierarchy of the landmark network (manage.py build_landmark_hierarchy).
+# SLM uses ALT while it is stale. With auto rebuild on, each landmark change starts a rebuild
+# on a background thread of one worker (one process at a time); off, rebuild it by hand.
+LANDMARK_HIERARCHY_PATH = os.path.join(BASE_DIR, 'routing_data', 'landmark_hierarchy.bin')
+LANDMARK_HIERARCHY_AUTO_REBUILD = True
+
+# All-pairs landmark table (manage.py build_landmark_table), memory-mapped by each worker.
+# Used instead of the hierarchy when it was built from the current landmarks.
+LANDMARK_TABLE_PATH = os.path.join(BASE_DIR, 'routing_data', 'landmark_table.bin')
+
+# Road network imported from an OSM/GeoJSON extract (manage.py import_road_network).
+# Routes snap their endpoints to road nodes within ROAD_SNAP_MAX_KM; farther points
+# are routed over the landmark graph as before.
+ROAD_NETWORK_PATH = os.path.join(BASE_DIR, 'routing_data', 'road_network.bin')
+ROAD_SNAP_MAX_KM = 5.0
+
+# Caches. 'routes' is per worker (LocMemCache) unless KRISHIMENT_ROUTE_CACHE_URL names a
+# Redis server (redis://host:6379/1, needs the redis package); with several workers set it,
+# so they share cached routes and every worker sees a labour change (api/route_cache.py).
+ROUTE_CACHE_URL = os.environ.get('KRISHIMENT_ROUTE_CACHE_URL', '')
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    # compute_optimal_route results: TTL of TIMEOUT seconds; LocMemCache drops the least
+    # recently used entries beyond MAX_ENTRIES, Redis follows its maxmemory-policy
+    'routes': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': ROUTE_CACHE_URL,
+        'TIMEOUT': 6 * 60 * 60,
+    } if ROUTE_CACHE_URL else {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'krishiment-routes',
+        'TIMEOUT': 6 * 60 * 60,
+        'OPTIONS': {'MAX_ENTRIES': 20000},
+    },
+}
+ROUTE_CACHE_ALIAS = 'routes'
+# Routes are cached per grid cell pair: 0.001 degree is about 110 m
+ROUTE_CACHE_GRID_DEG = 0.001
+
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
         'rest_framework_simplejwt.authentication.JWTAuthentication',
     ),
 }
 
+# Per-request SQL query counts from api.middleware.QueryCountMiddleware
+# (response headers when DEBUG, these log lines otherwise)
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'api.middleware': {'handlers': ['console'], 'level': 'INFO'},
+    },
+}
+
 # Email backend (development)
 # EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
 # AUTH_USER_MODEL = 'api.CustomUser'
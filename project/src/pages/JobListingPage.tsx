@@ -13,6 +13,8 @@ const JobListingPage = () => {
   
   const [jobs, setJobs] = useState([]);
   const [loading, setLoading] = useState(true);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [applyingJob, setApplyingJob] = useState(null);
   const [userLocation, setUserLocation] = useState<{ lat: number; lng: number } | null>(null);
   const [filters, setFilters] = useState({
@@ -63,7 +65,8 @@ const JobListingPage = () => {
       const response = (typeof lat === 'number' && typeof lon === 'number')
         ? await jobService.getNearbyJobs(lat, lon)
         : await jobService.getNearbyJobs();
-      setJobs(response.data);
+      setJobs(response.data.results);
+      setNextCursor(response.data.next_cursor);
       setLoading(false);
     } catch (error) {
       console.error('Error loading jobs:', error);
@@ -71,6 +74,20 @@ const JobListingPage = () => {
     }
   };
 
+  const loadMoreJobs = async () => {
+    if (!nextCursor) return;
+    try {
+      setLoadingMore(true);
+      const response = await jobService.getNearbyJobs(userLocation?.lat, userLocation?.lng, nextCursor);
+      setJobs((prev) => [...prev, ...response.data.results]);
+      setNextCursor(response.data.next_cursor);
+    } catch (error) {
+      console.error('Error loading more jobs:', error);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const applyForJob = async (jobId, message = '') => {
     try {
       setApplyingJob(jobId);
@@ -380,6 +397,17 @@ const JobListingPage = () => {
               </div>
             ))
           )}
+          {nextCursor && (
+            <div className="text-center">
+              <button
+                onClick={loadMoreJobs}
+                disabled={loadingMore}
+                className="px-6 py-2 bg-indigo-600 text-white rounded-lg hover:bg-indigo-700 disabled:opacity-50"
+              >
+                {loadingMore ? t('Loading...') : t('Load more jobs')}
+              </button>
+            </div>
+          )}
         </div>
       </div>
     </div>
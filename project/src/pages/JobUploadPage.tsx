@@ -29,6 +29,8 @@ interface Labour {
   distance: number;
   latitude?: number;
   longitude?: number;
+  roadDistanceKm?: number;
+  roadTimeMin?: number;
 }
 
 interface Errors {
@@ -194,6 +196,7 @@ const JobUploadPage = () => {
       
       setLabourCount(response.data.available_labours_count);
       setAvailableLabours(response.data.labours);
+      loadRoadDistances(response.data.labours);
       setSearchRadius(response.data.search_radius_used);
       
       // Update form data with the actual radius used
@@ -211,6 +214,25 @@ const JobUploadPage = () => {
     }
   };
 
+  // Road distance to the listed labours, from a single route matrix request
+  const loadRoadDistances = async (labours: Labour[]) => {
+    const shown = labours
+      .slice(0, 5)
+      .filter(l => typeof l.latitude === 'number' && typeof l.longitude === 'number');
+    if (!formData.latitude || !formData.longitude || shown.length === 0) return;
+    try {
+      const response = await jobService.getRouteMatrix(
+        [{ lat: parseFloat(formData.latitude), lon: parseFloat(formData.longitude) }],
+        shown.map(l => ({ lat: l.latitude as number, lon: l.longitude as number, label: l.name }))
+      );
+      const { distance_km, time_min } = response.data as { distance_km: number[][]; time_min: number[][] };
+      const byId = new Map(shown.map((l, j) => [l.id, { roadDistanceKm: distance_km[0][j], roadTimeMin: time_min[0][j] }]));
+      setAvailableLabours(prev => prev.map(l => (byId.has(l.id) ? { ...l, ...byId.get(l.id) } : l)));
+    } catch (error) {
+      console.error('Error loading road distances:', error);
+    }
+  };
+
   const getOptimalRoute = async (labour: Labour) => {
     if (!formData.latitude || !formData.longitude || typeof labour.latitude !== 'number' || typeof labour.longitude !== 'number') {
       setRouteError(t('Location and labour coordinates are required'));
@@ -604,6 +626,11 @@ const JobUploadPage = () => {
                             </div>
                             <div className="flex items-center gap-2">
                               <span className="text-sm text-blue-600">{labour.distance}km</span>
+                              {labour.roadDistanceKm !== undefined && (
+                                <span className="text-xs text-gray-500">
+                                  {labour.roadDistanceKm}km {t('by road')}, ~{labour.roadTimeMin} min
+                                </span>
+                              )}
                               {typeof labour.latitude === 'number' && typeof labour.longitude === 'number' && (
                                 <button
                                   type="button"
@@ -4,7 +4,7 @@ import { useAuth } from '../contexts/AuthContext';
 import { useNavigate } from 'react-router-dom';
 import jobService from '../services/jobService';
 import RatingModal from '../components/Common/RatingModal';
-import { Users, Clock, Calendar, MapPin, CheckCircle, XCircle, MessageSquare, Phone, Star, CheckCircle2 } from 'lucide-react';
+import { Users, Clock, Calendar, MapPin, CheckCircle, XCircle, MessageSquare, Phone, Star, CheckCircle2, Navigation } from 'lucide-react';
 
 const WorkerApplications = () => {
   const { t } = useTranslation();
@@ -17,6 +17,9 @@ const WorkerApplications = () => {
   const [processing, setProcessing] = useState(null);
   const [ratingModalOpen, setRatingModalOpen] = useState(false);
   const [selectedApplication, setSelectedApplication] = useState(null);
+  const [pickupRoute, setPickupRoute] = useState(null);
+  const [pickupLoading, setPickupLoading] = useState(false);
+  const [pickupError, setPickupError] = useState(null);
 
   useEffect(() => {
     if (!user || user.role !== 'farmer') {
@@ -43,8 +46,25 @@ const WorkerApplications = () => {
 
   useEffect(() => {
     if (selectedJob) loadApplications(selectedJob);
+    setPickupRoute(null);
+    setPickupError(null);
   }, [selectedJob]);
 
+  const planPickupRoute = async () => {
+    if (!selectedJob) return;
+    setPickupLoading(true);
+    setPickupError(null);
+    try {
+      const res = await jobService.getPickupRoute(selectedJob);
+      setPickupRoute(res.data);
+    } catch (e) {
+      setPickupRoute(null);
+      setPickupError(e.response?.data?.error || t('Failed to plan pickup route'));
+    } finally {
+      setPickupLoading(false);
+    }
+  };
+
   const loadApplications = async (jobId) => {
     try {
       const res = await jobService.getJobApplications(jobId);
@@ -165,7 +185,40 @@ const WorkerApplications = () => {
             {/* Applications list */}
             <div className="lg:col-span-2">
               <div className="bg-white rounded-xl shadow-lg p-6">
-                <h2 className="text-lg font-semibold text-gray-900 mb-4">{t('Applications')}</h2>
+                <div className="flex items-center justify-between mb-4">
+                  <h2 className="text-lg font-semibold text-gray-900">{t('Applications')}</h2>
+                  {applications.some(app => app.status === 'accepted') && (
+                    <button
+                      onClick={planPickupRoute}
+                      disabled={pickupLoading}
+                      className="px-3 py-1.5 text-sm font-medium bg-green-600 text-white rounded-lg hover:bg-green-700 disabled:opacity-50 flex items-center gap-1"
+                    >
+                      <Navigation className="h-4 w-4" />
+                      {pickupLoading ? t('Planning...') : t('Plan pickup route')}
+                    </button>
+                  )}
+                </div>
+                {pickupError && <p className="text-sm text-red-600 mb-4">{pickupError}</p>}
+                {pickupRoute && (
+                  <div className="mb-6 p-4 bg-green-50 border border-green-200 rounded-lg">
+                    <div className="font-semibold text-gray-900 mb-2">
+                      {t('Pickup route')}: {pickupRoute.total_distance_km} km, ~{pickupRoute.total_time_min} min
+                    </div>
+                    <ol className="list-decimal list-inside space-y-1 text-sm text-gray-700">
+                      {pickupRoute.stops.map(stop => (
+                        <li key={stop.application_id}>
+                          {stop.name} ({stop.phone}) - {stop.leg_distance_km} km
+                        </li>
+                      ))}
+                      <li>{t('Farm')} - {pickupRoute.leg_to_farm.distance_km} km</li>
+                    </ol>
+                    {pickupRoute.skipped.length > 0 && (
+                      <p className="text-xs text-gray-500 mt-2">
+                        {t('Not included (no location)')}: {pickupRoute.skipped.map(s => s.name).join(', ')}
+                      </p>
+                    )}
+                  </div>
+                )}
                 {applications.length === 0 ? (
                   <p className="text-gray-600">{t('No applications yet for this job.')}</p>
                 ) : (
@@ -8,13 +8,16 @@ export const jobService = {
   // Get all jobs for farmer (their posted jobs)
   getMyJobs: () => API.get('/jobs/'),
   
-  // Get nearby jobs for labour
-  getNearbyJobs: (latitude?: number, longitude?: number) => {
+  // Get nearby jobs for labour (one page, nearest first; pass next_cursor for the next page)
+  getNearbyJobs: (latitude?: number, longitude?: number, cursor?: string) => {
     const params = new URLSearchParams();
     if (latitude && longitude) {
       params.append('latitude', latitude.toString());
       params.append('longitude', longitude.toString());
     }
+    if (cursor) {
+      params.append('cursor', cursor);
+    }
     return API.get(`/jobs/nearby/?${params.toString()}`);
   },
   
@@ -45,24 +48,60 @@ export const jobService = {
       status: status
     }),
   
-  // Get labour count in area
-  getLabourCount: (latitude, longitude, radius = 5) => 
+  // Get labour count in area (optionally only labours within maxTravelMin minutes by road)
+  getLabourCount: (latitude, longitude, radius = 5, maxTravelMin?: number) => 
     API.get('/jobs/labour_count/', {
-      params: { latitude, longitude, radius }
+      params: maxTravelMin !== undefined
+        ? { latitude, longitude, radius, max_travel_min: maxTravelMin }
+        : { latitude, longitude, radius }
     }),
 
-  // Get optimal route (Dijkstra local / SLM long-distance)
-  getOptimalRoute: (fromLat: number, fromLon: number, toLat: number, toLon: number, toLabel?: string) =>
+  // Get optimal route (Dijkstra local / SLM long-distance); profile is "<vehicle>_<window>", e.g. tractor_morning
+  getOptimalRoute: (
+    fromLat: number,
+    fromLon: number,
+    toLat: number,
+    toLon: number,
+    toLabel?: string,
+    profile?: string
+  ) =>
     API.get('/jobs/route/', {
       params: {
         from_lat: fromLat,
         from_lon: fromLon,
         to_lat: toLat,
         to_lon: toLon,
-        to_label: toLabel || 'Destination'
+        to_label: toLabel || 'Destination',
+        ...(profile ? { profile } : {})
       }
     }),
   
+  // Road distance/time from one or more origins to many destinations in one request
+  getRouteMatrix: (
+    origins: { lat: number; lon: number; label?: string }[],
+    destinations: { lat: number; lon: number; label?: string }[],
+    includeRoutes = false
+  ) =>
+    API.post('/jobs/route_matrix/', {
+      origins,
+      destinations,
+      include_routes: includeRoutes
+    }),
+  
+  // Labours and mandis reachable within a travel-time budget, with an approximate area polygon
+  getIsochrone: (lat: number, lon: number, minutes = 45) =>
+    API.get('/jobs/isochrone/', {
+      params: { lat, lon, minutes }
+    }),
+  
+  // Pickup route collecting every accepted labour of a job, ending at the farm (farmer only)
+  getPickupRoute: (jobId, startLat?: number, startLon?: number) =>
+    API.get(`/jobs/${jobId}/pickup_route/`, {
+      params: startLat !== undefined && startLon !== undefined
+        ? { start_lat: startLat, start_lon: startLon }
+        : {}
+    }),
+  
   // Get job applications for labour
   getMyApplications: () => API.get('/job-applications/'),
   